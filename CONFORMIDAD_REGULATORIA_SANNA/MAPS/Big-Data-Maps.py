@@ -1,11 +1,41 @@
-from playwright.sync_api import sync_playwright
 import re
+import sys
 import json
 import time
 import os
+import argparse
+import threading
 import pyodbc
 from datetime import datetime
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from snapshot_store import SnapshotStore, SnapshotReader, disponible as snapshots_disponibles
+from replay_loader import replay_json, replay_parquet, rutas_json
+from write_queue import DatabaseWriter
+from job_queue import JobStore
+from metrics import METRICS
+
+# normalizacion.py es compartido con NORMAS y está en la carpeta superior
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from normalizacion import limpiar_review
+from relative_dates import parse_relative_date, backfill_review_dates
+from opening_hours import week_intervals, rebuild_intervals
+from records import Branch, Hours, Review, parse_int, parse_float
+from near_duplicates import NearDuplicateIndex, branch_index, fuller, dedup_reviews
+from review_search import search_reviews
+from rating_history import record_rating, rating_trend
+from plus_codes import decode_reference, rebuild_locations, BranchLocationIndex
+from place_links import PlaceCache, dedupe_by_place
+from job_leases import LeaseQueue
+from spanish_lexicon import SpanishLexiconScorer
+from lexicon_versions import (lexicon_content, lexicon_version, register_version,
+                              index_review_tokens, rescore_changed)
+
+# Playwright solo hace falta para scrapear (no para recargar snapshots)
+try:
+    from playwright.sync_api import sync_playwright
+except ImportError:
+    sync_playwright = None
 
 try:
     import nltk
@@ -67,6 +97,7 @@ class DatabaseManager:
             self.connection.close()
             print("🔌 Conexión a SQL Server cerrada")
     
+    @METRICS.timed('db.insert_sucursal')
     def insert_sucursal(self, data):
         """Insertar datos de sucursal y retornar el ID"""
         try:
@@ -74,7 +105,7 @@ class DatabaseManager:
             
             # Primero verificar si ya existe
             check_query = "SELECT id FROM Sucursales WHERE url = ?"
-            cursor.execute(check_query, (data['url'],))
+            cursor.execute(check_query, (data.url,))
             existing = cursor.fetchone()
             
             if existing:
@@ -83,18 +114,21 @@ class DatabaseManager:
             
             # Insertar nueva sucursal
             query = """
-            INSERT INTO Sucursales (url, nombre, ubicacion, sitio_web, telefono, referencia)
+            INSERT INTO Sucursales (url, nombre, ubicacion, sitio_web, telefono, referencia, latitud, longitud)
             OUTPUT INSERTED.id
-            VALUES (?, ?, ?, ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """
             
+            latitud, longitud = decode_reference(data.referencia, data.ubicacion) or (None, None)
             cursor.execute(query, (
-                data['url'],
-                data['nombre'],
-                data['ubicacion'],
-                data['info_adicional']['sitio_web'],
-                data['info_adicional']['telefono'],
-                data['info_adicional']['referencia']
+                data.url,
+                data.nombre,
+                data.ubicacion,
+                data.sitio_web,
+                data.telefono,
+                data.referencia,
+                latitud,
+                longitud
             ))
             
             sucursal_id = cursor.fetchone()[0]
@@ -118,37 +152,50 @@ class DatabaseManager:
             print(f"❌ Error obteniendo ID de sucursal: {str(e)}")
             return None
     
+    def get_saved_since(self, url, desde):
+        """(sucursal_id, reviews) si la URL tiene un guardado confirmado desde `desde` (ISO), o None"""
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("""
+            SELECT s.id,
+                   (SELECT COUNT(*) FROM Reviews r WHERE r.sucursal_id = s.id AND r.fecha_extraccion >= ?)
+            FROM Sucursales s
+            WHERE s.url = ?
+              AND EXISTS (SELECT 1 FROM HistorialCalificaciones h
+                          WHERE h.sucursal_id = s.id AND h.ultima_verificacion >= ?)
+            """, (desde, url, desde))
+            result = cursor.fetchone()
+            return (result[0], result[1]) if result else None
+        except Exception as e:
+            print(f"❌ Error consultando guardado de {url}: {str(e)}")
+            return None
+    
+    @METRICS.timed('db.insert_calificacion')
     def insert_calificacion(self, sucursal_id, data):
-        """Insertar calificación global"""
+        """Registrar calificación global (solo se inserta si cambió)"""
         try:
             cursor = self.connection.cursor()
             
-            rating_global = float(data['rating_global']) if data['rating_global'] else None
-            total_reviews = int(data['total_reviews']) if data['total_reviews'].isdigit() else 0
-            
-            query = """
-            INSERT INTO Calificaciones (sucursal_id, rating_global, total_reviews)
-            VALUES (?, ?, ?)
-            """
-            
-            cursor.execute(query, (sucursal_id, rating_global, total_reviews))
+            cambio = record_rating(cursor, sucursal_id, data.rating_global, data.total_reviews, data.fecha_extraccion)
             self.connection.commit()
             
-            print(f"✅ Calificación insertada para sucursal {sucursal_id}")
+            if cambio:
+                print(f"✅ Calificación insertada para sucursal {sucursal_id}")
+            else:
+                print(f"⏭️ Calificación sin cambios para sucursal {sucursal_id}")
             return True
             
         except Exception as e:
             print(f"❌ Error insertando calificación: {str(e)}")
             return False
     
+    @METRICS.timed('db.insert_horarios')
     def insert_horarios(self, sucursal_id, horarios):
         """Insertar horarios de atención"""
         try:
             cursor = self.connection.cursor()
             
             for horario in horarios:
-                esta_cerrado = 1 if 'cerrado' in horario['horas'].lower() else 0
-                
                 query = """
                 INSERT INTO Horarios (sucursal_id, dia_semana, horas, esta_cerrado)
                 VALUES (?, ?, ?, ?)
@@ -156,11 +203,12 @@ class DatabaseManager:
                 
                 cursor.execute(query, (
                     sucursal_id,
-                    horario['dia'],
-                    horario['horas'],
-                    esta_cerrado
+                    horario.dia,
+                    horario.horas,
+                    1 if horario.esta_cerrado else 0
                 ))
             
+            self._replace_intervals(cursor, sucursal_id, horarios)
             self.connection.commit()
             print(f"✅ {len(horarios)} horarios insertados para sucursal {sucursal_id}")
             return True
@@ -169,30 +217,36 @@ class DatabaseManager:
             print(f"❌ Error insertando horarios: {str(e)}")
             return False
     
+    @METRICS.timed('db.insert_reviews')
     def insert_reviews(self, sucursal_id, reviews):
         """Insertar reseñas"""
         try:
             cursor = self.connection.cursor()
             inserted_count = 0
+            fecha_extraccion = datetime.now().replace(microsecond=0)
             
             for review in reviews:
                 try:
-                    rating = int(review['rating']) if review['rating'].isdigit() else None
-                    likes = int(review['likes']) if review['likes'].isdigit() else 0
+                    fecha_aprox, precision = parse_relative_date(review.date, fecha_extraccion)
                     
                     query = """
-                    INSERT INTO Reviews (sucursal_id, autor, rating, fecha_review, texto, cantidad_fotos, likes)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    INSERT INTO Reviews (sucursal_id, autor, rating, fecha_review, texto, cantidad_fotos, likes,
+                                         fecha_extraccion, fecha_review_aprox, fecha_review_precision, texto_normalizado)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                     """
                     
                     cursor.execute(query, (
                         sucursal_id,
-                        review['author'],
-                        rating,
-                        review['date'],
-                        review['text'],
-                        review['photos'],
-                        likes
+                        review.author,
+                        review.rating,
+                        review.date,
+                        review.text,
+                        review.photos,
+                        review.likes,
+                        fecha_extraccion,
+                        fecha_aprox,
+                        precision,
+                        limpiar_review(review.text)
                     ))
                     inserted_count += 1
                     
@@ -201,6 +255,7 @@ class DatabaseManager:
                     continue
             
             self.connection.commit()
+            METRICS.incr('filas.reviews', inserted_count)
             print(f"✅ {inserted_count} reviews insertados para sucursal {sucursal_id}")
             return True
             
@@ -208,6 +263,200 @@ class DatabaseManager:
             print(f"❌ Error insertando reviews: {str(e)}")
             return False
     
+    @METRICS.timed('db.save_complete_data_bulk')
+    def save_complete_data_bulk(self, data, reviews=None, chunk_size=1000):
+        """Guardar una sucursal completa en una sola transacción con inserts masivos.
+
+        data: Branch; reviews: iterable opcional de Review (p. ej. un stream desde JSON)
+        que reemplaza a data.reviews; se inserta en bloques de chunk_size filas.
+        """
+        cursor = self.connection.cursor()
+        cursor.fast_executemany = True
+        try:
+            sucursal_id, review_count = self._write_bulk(cursor, data, reviews, chunk_size)
+            self.connection.commit()
+            print(f"🎉 Sucursal {sucursal_id} guardada en bloque ({review_count} reviews)")
+            return sucursal_id
+
+        except Exception as e:
+            self.connection.rollback()
+            print(f"❌ Error en guardado masivo de {data.url}: {str(e)}")
+            return None
+
+    @METRICS.timed('db.save_many_bulk')
+    def save_many_bulk(self, lista, chunk_size=1000):
+        """Guardar varias sucursales en una sola transacción; retorna sus IDs en orden.
+
+        Si el lote falla se reintenta sucursal por sucursal para no perder las válidas.
+        """
+        cursor = self.connection.cursor()
+        cursor.fast_executemany = True
+        try:
+            ids = [self._write_bulk(cursor, data, None, chunk_size)[0] for data in lista]
+            self.connection.commit()
+            return ids
+        except Exception as e:
+            self.connection.rollback()
+            if len(lista) == 1:
+                print(f"❌ Error en guardado masivo de {lista[0].url}: {str(e)}")
+                return [None]
+            print(f"⚠️ Lote de {len(lista)} sucursales falló ({str(e)}), guardando una por una")
+            return [self.save_complete_data_bulk(data, chunk_size=chunk_size) for data in lista]
+
+    def _write_bulk(self, cursor, data, reviews, chunk_size):
+        """Inserts de una sucursal sin commit; retorna (sucursal_id, reviews insertados)"""
+        cursor.execute("SELECT id FROM Sucursales WHERE url = ?", (data.url,))
+        existing = cursor.fetchone()
+        if existing:
+            sucursal_id = existing[0]
+        else:
+            latitud, longitud = decode_reference(data.referencia, data.ubicacion) or (None, None)
+            cursor.execute("""
+            INSERT INTO Sucursales (url, nombre, ubicacion, sitio_web, telefono, referencia, latitud, longitud)
+            OUTPUT INSERTED.id
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (data.url, data.nombre, data.ubicacion, data.sitio_web, data.telefono, data.referencia, latitud, longitud))
+            sucursal_id = cursor.fetchone()[0]
+            METRICS.incr('filas.sucursales')
+
+        if record_rating(cursor, sucursal_id, data.rating_global, data.total_reviews, data.fecha_extraccion):
+            METRICS.incr('filas.calificaciones')
+        else:
+            METRICS.incr('filas.calificaciones_sin_cambio')
+
+        if data.horarios:
+            cursor.executemany("""
+            INSERT INTO Horarios (sucursal_id, dia_semana, horas, esta_cerrado)
+            VALUES (?, ?, ?, ?)
+            """, [(sucursal_id, h.dia, h.horas, 1 if h.esta_cerrado else 0) for h in data.horarios])
+            METRICS.incr('filas.horarios', len(data.horarios))
+            self._replace_intervals(cursor, sucursal_id, data.horarios)
+
+        # Las fechas relativas ("Hace 7 meses") se resuelven contra la fecha de extracción:
+        # la del snapshot al recargar, la actual al scrapear
+        fecha_extraccion = (data.fecha_extraccion or datetime.now()).replace(microsecond=0)
+        # Una reseña ya guardada (aunque antes viniera cortada con "…") se actualiza en vez de duplicarse
+        indice, textos = branch_index(cursor, sucursal_id) if existing else (NearDuplicateIndex(), {})
+        review_count = 0
+        chunk = []
+        refrescos = []
+        completados = []
+        # Reseñas nuevas de esta carga: posición en el chunk sin insertar, o texto si ya se insertó
+        en_chunk = {}
+        insertadas = {}
+        completadas_nuevas = []
+        for n, review in enumerate(data.reviews if reviews is None else reviews):
+            row = self._review_row(sucursal_id, review, fecha_extraccion)
+            duplicada = indice.find_or_add(('nueva', n), row[1], row[2], row[4], row[10])
+            if duplicada is None:
+                en_chunk[n] = len(chunk)
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    self._insert_review_rows(cursor, chunk)
+                    review_count += len(chunk)
+                    insertadas.update((m, chunk[i][4]) for m, i in en_chunk.items())
+                    chunk = []
+                    en_chunk = {}
+                continue
+            METRICS.incr('filas.reviews_duplicadas')
+            if duplicada in textos:
+                refrescos.append(row[2:4] + row[5:10] + (duplicada,))
+                if fuller(row[4], textos[duplicada]):
+                    completados.append((row[4], row[10], duplicada))
+                    textos[duplicada] = row[4]
+                continue
+            # Duplicada de otra reseña de esta misma carga: también queda el texto más completo
+            m = duplicada[1]
+            if m in en_chunk:
+                previa = chunk[en_chunk[m]]
+                if fuller(row[4], previa[4]):
+                    chunk[en_chunk[m]] = previa[:4] + (row[4],) + previa[5:10] + (row[10],)
+            elif fuller(row[4], insertadas[m]):
+                completadas_nuevas.append((row[4], row[10], sucursal_id, fecha_extraccion, insertadas[m]))
+                insertadas[m] = row[4]
+        if chunk:
+            self._insert_review_rows(cursor, chunk)
+            review_count += len(chunk)
+        if completadas_nuevas:
+            # Ya insertadas en un chunk anterior de esta carga (todavía sin análisis ni tokens)
+            cursor.executemany("""
+            UPDATE Reviews SET texto = ?, texto_normalizado = ?
+            WHERE sucursal_id = ? AND fecha_extraccion = ? AND texto = ?
+            """, completadas_nuevas)
+        if refrescos:
+            self._merge_review_rows(cursor, refrescos, completados)
+
+        return sucursal_id, review_count
+
+    @staticmethod
+    def _replace_intervals(cursor, sucursal_id, horarios):
+        """Reemplazar los intervalos de atención (minutos de la semana) de la sucursal"""
+        intervalos = week_intervals(horarios)
+        cursor.execute("DELETE FROM HorariosIntervalos WHERE sucursal_id = ?", (sucursal_id,))
+        if intervalos:
+            cursor.executemany("""
+            INSERT INTO HorariosIntervalos (sucursal_id, minuto_inicio, minuto_fin)
+            VALUES (?, ?, ?)
+            """, [(sucursal_id, inicio, fin) for inicio, fin in intervalos])
+        METRICS.incr('filas.horarios_intervalos', len(intervalos))
+
+    @staticmethod
+    def _review_row(sucursal_id, review, fecha_extraccion):
+        fecha_aprox, precision = parse_relative_date(review.date, fecha_extraccion)
+        return (sucursal_id, review.author, review.rating, review.date, review.text, review.photos, review.likes,
+                fecha_extraccion, fecha_aprox, precision, limpiar_review(review.text))
+
+    @staticmethod
+    def _insert_review_rows(cursor, rows):
+        cursor.executemany("""
+        INSERT INTO Reviews (sucursal_id, autor, rating, fecha_review, texto, cantidad_fotos, likes,
+                             fecha_extraccion, fecha_review_aprox, fecha_review_precision, texto_normalizado)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        METRICS.incr('filas.reviews', len(rows))
+        METRICS.incr('bytes.reviews_texto', sum(len((row[4] or '').encode('utf-8')) for row in rows))
+
+    @staticmethod
+    def _merge_review_rows(cursor, refrescos, completados):
+        """Actualizar reseñas ya guardadas con los datos de su duplicado recién extraído.
+
+        refrescos: (rating, fecha_review, fotos, likes, fecha_extraccion, fecha_aprox, precision, id);
+        completados: (texto, texto_normalizado, id) cuando el nuevo texto es más completo,
+        y entonces su análisis se borra para que se vuelva a analizar.
+        """
+        cursor.executemany("""
+        UPDATE Reviews SET rating = ?, fecha_review = ?, cantidad_fotos = ?, likes = ?,
+                           fecha_extraccion = ?, fecha_review_aprox = ?, fecha_review_precision = ?
+        WHERE id = ?
+        """, refrescos)
+        if completados:
+            cursor.executemany("UPDATE Reviews SET texto = ?, texto_normalizado = ? WHERE id = ?", completados)
+            ids = [(fila[2],) for fila in completados]
+            cursor.executemany("DELETE FROM ReviewTokens WHERE review_id = ?", ids)
+            cursor.executemany("DELETE FROM AnalisisSentimientos WHERE review_id = ?", ids)
+        METRICS.incr('filas.reviews_actualizadas', len(refrescos))
+
+    @METRICS.timed('db.compact_columnstore')
+    def compact_columnstore(self, tablas=('Reviews', 'AnalisisSentimientos')):
+        """Comprimir los rowgroups abiertos de los índices columnstore después de una carga"""
+        # REORGANIZE se ejecuta fuera de una transacción explícita
+        self.connection.autocommit = True
+        try:
+            cursor = self.connection.cursor()
+            for tabla in tablas:
+                indice = f"NCCI_{tabla}_Analitica"
+                cursor.execute(f"""
+                IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = '{indice}' AND object_id = OBJECT_ID('{tabla}'))
+                    ALTER INDEX {indice} ON {tabla} REORGANIZE WITH (COMPRESS_ALL_ROW_GROUPS = ON)
+                """)
+            return True
+        except Exception as e:
+            print(f"⚠️ No se pudieron compactar los índices columnstore: {str(e)}")
+            return False
+        finally:
+            self.connection.autocommit = False
+
+    @METRICS.timed('db.save_complete_data')
     def save_complete_data(self, data):
         """Guardar todos los datos de una sucursal"""
         try:
@@ -220,12 +469,12 @@ class DatabaseManager:
             self.insert_calificacion(sucursal_id, data)
             
             # 3. Insertar horarios
-            if data['info_adicional']['horarios']:
-                self.insert_horarios(sucursal_id, data['info_adicional']['horarios'])
+            if data.horarios:
+                self.insert_horarios(sucursal_id, data.horarios)
             
             # 4. Insertar reviews
-            if data['reviews']:
-                self.insert_reviews(sucursal_id, data['reviews'])
+            if data.reviews:
+                self.insert_reviews(sucursal_id, data.reviews)
             
             print(f"🎉 Datos completos guardados en BD para sucursal {sucursal_id}")
             return True
@@ -234,8 +483,12 @@ class DatabaseManager:
             print(f"❌ Error guardando datos completos: {str(e)}")
             return False
 
-def scrape_google_maps(url):
-    """Función de scraping de Google Maps con scroll completo para todas las reseñas"""
+def scrape_google_maps(url, destino=None):
+    """Función de scraping de Google Maps con scroll completo para todas las reseñas.
+
+    destino: URL canónica del lugar (PlaceCache) para no pasar por la redirección del
+    enlace corto; el resultado conserva `url` como identificador de la sucursal.
+    """
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=False)
         context = browser.new_context(
@@ -243,17 +496,20 @@ def scrape_google_maps(url):
             viewport={"width": 1200, "height": 800}
         )
         page = context.new_page()
+        cronometro = METRICS.stopwatch('scrape')
         
         try:
             # Navegar a la URL
-            page.goto(url, timeout=60000)
+            page.goto(destino or url, timeout=60000)
             page.wait_for_selector('h1', timeout=30000)
+            cronometro.lap('navegacion')
             
             # Aceptar cookies
             accept_button = page.query_selector('button:has-text("Aceptar todo"), button:has-text("Accept all")')
             if accept_button:
                 accept_button.click()
                 page.wait_for_timeout(1000)
+            cronometro.lap('cookies')
             
             # Extraer nombre completo con selector mejorado
             nombre = ""
@@ -342,10 +598,7 @@ def scrape_google_maps(url):
                         if dia_element and horas_element:
                             nombre_dia = dia_element.inner_text().strip()
                             horas = horas_element.inner_text().strip()
-                            info_adicional['horarios'].append({
-                                'dia': nombre_dia,
-                                'horas': horas
-                            })
+                            info_adicional['horarios'].append(Hours(nombre_dia, horas, 'cerrado' in horas.lower()))
                     except:
                         continue
             
@@ -370,6 +623,8 @@ def scrape_google_maps(url):
                 if referencia_text:
                     info_adicional['referencia'] = referencia_text.inner_text().strip()
             
+            cronometro.lap('ficha')
+            
             # ========================================================================
             # SECCIÓN DE EXTRACCIÓN DE RESEÑAS CON SCROLL COMPLETO
             # ========================================================================
@@ -460,6 +715,8 @@ def scrape_google_maps(url):
                     print(f"⚠️ Límite de seguridad alcanzado: {current_count} reviews")
                     break
             
+            cronometro.lap('scroll')
+            
             # Extraer todos los reviews visibles
             review_elements = page.query_selector_all('.jftiEf')
             print(f"🎉 Total de reseñas encontradas: {len(review_elements)}")
@@ -475,7 +732,7 @@ def scrape_google_maps(url):
                     author = author_element.inner_text() if author_element else "Anónimo"
                     
                     stars = review.query_selector_all('.hCCjke.NhBTye')
-                    rating = str(len(stars)) if stars else "0"
+                    rating = len(stars)
                     
                     date_element = review.query_selector('.rsqaWe')
                     date = date_element.inner_text() if date_element else None
@@ -492,35 +749,30 @@ def scrape_google_maps(url):
                             photo_count = int(photos_match.group(1))
                     
                     likes_element = review.query_selector('button[aria-label*="útil"] .znYl0 > span')
-                    likes = likes_element.inner_text() if likes_element else "0"
+                    likes = parse_int(likes_element.inner_text(), 0) if likes_element else 0
                     
-                    reviews.append({
-                        'author': author,
-                        'rating': rating,
-                        'date': date,
-                        'text': text,
-                        'photos': photo_count,
-                        'likes': likes
-                    })
+                    reviews.append(Review(author, rating, date, text, photo_count, likes))
                     
                 except Exception as e:
                     print(f"⚠️ Error procesando review {i + 1}: {str(e)}")
                     continue
             
             print(f"✅ Se procesaron exitosamente {len(reviews)} reseñas")
-            
-            return {
-                'url': url,
-                'nombre': nombre,
-                'ubicacion': ubicacion,
-                'rating_global': rating_global,
-                'total_reviews': total_reviews,
-                'info_adicional': info_adicional,
-                'reviews': reviews
-            }
+            cronometro.lap('extraccion')
+            METRICS.incr('scrape.sucursales')
+            METRICS.incr('scrape.reviews', len(reviews))
+            METRICS.incr('bytes.scrape_texto', sum(len(r.text.encode('utf-8')) for r in reviews))
+            
+            # Los valores se convierten aquí una sola vez; BD y snapshots usan el Branch tal cual
+            return Branch(
+                url, nombre, ubicacion, parse_float(rating_global), parse_int(total_reviews, 0),
+                info_adicional['sitio_web'], info_adicional['telefono'], info_adicional['referencia'],
+                info_adicional['horarios'], reviews, None
+            )
         
         except Exception as e:
             print(f"❌ Error general en scraping: {str(e)}")
+            METRICS.incr('scrape.errores')
             return None
         finally:
             browser.close()
@@ -543,34 +795,45 @@ def save_result_to_json(resultado, index):
     filename = f'info-{index}.json'
     try:
         with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(resultado, f, indent=2, ensure_ascii=False)
+            json.dump(resultado.as_dict(), f, indent=2, ensure_ascii=False)
         print(f"✅ Backup JSON guardado en {filename}")
         return True
     except Exception as e:
         print(f"❌ Error guardando {filename}: {str(e)}")
         return False
 
+SENTIMENT_MODES = ('ensemble', 'lexico')
+
+
 class SentimentAnalyzer:
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, modo='ensemble'):
+        """modo: 'ensemble' (VADER + TextBlob + palabras clave) o 'lexico' (léxico en español, una pasada)"""
+        if modo not in SENTIMENT_MODES:
+            raise ValueError(f"Modo de sentimiento desconocido: {modo}")
         self.db = db_manager
+        self.modo = modo
+        self.vader_analyzer = None
+        self.nlp = None
         
-        try:
-            self.vader_analyzer = SentimentIntensityAnalyzer()
-        except:
-            print("⚠️ VADER no disponible")
-            self.vader_analyzer = None
-        
-        # Cargar modelo de spaCy para español
-        try:
-            self.nlp = spacy.load("es_core_news_sm")
-        except OSError:
-            print("⚠️ Modelo de spaCy no encontrado. Instalando...")
-            os.system("python -m spacy download es_core_news_sm")
+        # El modo léxico no usa VADER, TextBlob ni spaCy: no se cargan
+        if modo == 'ensemble':
             try:
-                self.nlp = spacy.load("es_core_news_sm")
+                self.vader_analyzer = SentimentIntensityAnalyzer()
             except:
-                print("❌ No se pudo cargar spaCy")
-                self.nlp = None
+                print("⚠️ VADER no disponible")
+                self.vader_analyzer = None
+            
+            # Cargar modelo de spaCy para español
+            try:
+                self.nlp = spacy.load("es_core_news_sm")
+            except OSError:
+                print("⚠️ Modelo de spaCy no encontrado. Instalando...")
+                os.system("python -m spacy download es_core_news_sm")
+                try:
+                    self.nlp = spacy.load("es_core_news_sm")
+                except:
+                    print("❌ No se pudo cargar spaCy")
+                    self.nlp = None
         
         # Palabras de parada en español
         self.stop_words = {
@@ -579,6 +842,15 @@ class SentimentAnalyzer:
         
         # Cargar palabras clave desde la base de datos
         self.palabras_clave = self.load_palabras_clave()
+        self.lexicon = SpanishLexiconScorer(self.palabras_clave)
+        
+        # Cada análisis guarda la versión del léxico con que se calculó
+        self.lexicon_content = lexicon_content(modo, self.palabras_clave, self.lexicon)
+        self.lexicon_version = lexicon_version(self.lexicon_content)
+        try:
+            register_version(self.db.connection, self.lexicon_version, self.lexicon_content)
+        except Exception as e:
+            print(f"⚠️ No se pudo registrar la versión del léxico: {str(e)}")
     
     def load_palabras_clave(self):
         """Cargar palabras clave desde la base de datos"""
@@ -607,21 +879,10 @@ class SentimentAnalyzer:
             return {}
     
     def clean_text(self, text):
-        """Limpiar y normalizar texto"""
-        if not text:
-            return ""
-        
-        # Convertir a minúsculas
-        text = text.lower()
-        
-        # Remover caracteres especiales pero mantener espacios y puntuación básica
-        text = re.sub(r'[^\w\s\.\,\!\?\;]', ' ', text)
-        
-        # Remover espacios múltiples
-        text = re.sub(r'\s+', ' ', text)
-        
-        return text.strip()
+        """Limpiar y normalizar texto (Reviews.texto_normalizado guarda este resultado)"""
+        return limpiar_review(text)
     
+    @METRICS.timed('sentimiento.vader')
     def analyze_sentiment_vader(self, text):
         """Análisis de sentimiento con VADER"""
         if not self.vader_analyzer:
@@ -635,6 +896,7 @@ class SentimentAnalyzer:
             'neutral': scores['neu']
         }
     
+    @METRICS.timed('sentimiento.textblob')
     def analyze_sentiment_textblob(self, text):
         """Análisis de sentimiento con TextBlob"""
         try:
@@ -646,6 +908,7 @@ class SentimentAnalyzer:
         except:
             return {'polarity': 0.0, 'subjectivity': 0.0}
     
+    @METRICS.timed('sentimiento.palabras_clave')
     def analyze_custom_keywords(self, text):
         """Análisis basado en palabras clave personalizadas"""
         if not text or not self.palabras_clave:
@@ -706,13 +969,21 @@ class SentimentAnalyzer:
         else:
             return 5  # Muy Negativo
     
-    def analyze_review_sentiment(self, review_text, review_id):
-        """Análisis completo de sentimiento para una reseña"""
+    @METRICS.timed('sentimiento.review')
+    def analyze_review_sentiment(self, review_text, review_id, clean_text=None):
+        """Análisis completo de sentimiento para una reseña.
+
+        clean_text: texto ya normalizado (Reviews.texto_normalizado); si falta se calcula.
+        """
         if not review_text:
             return None
         
         # Limpiar texto
-        clean_text = self.clean_text(review_text)
+        if clean_text is None:
+            clean_text = self.clean_text(review_text)
+        
+        if self.modo == 'lexico':
+            return self.analyze_review_lexicon(clean_text, review_id)
         
         # Análisis con diferentes métodos
         vader_result = self.analyze_sentiment_vader(clean_text)
@@ -741,19 +1012,40 @@ class SentimentAnalyzer:
             'confianza': confidence,
             'palabras_positivas': ', '.join(custom_result['positive_words'][:10]),
             'palabras_negativas': ', '.join(custom_result['negative_words'][:10]),
-            'palabras_clave_detectadas': json.dumps(custom_result['detected_keywords'][:15])
+            'palabras_clave_detectadas': json.dumps(custom_result['detected_keywords'][:15]),
+            'version_lexico': self.lexicon_version
         }
     
-    def save_sentiment_analysis(self, analysis_result):
-        """Guardar análisis de sentimiento en la base de datos"""
+    @METRICS.timed('sentimiento.lexico')
+    def analyze_review_lexicon(self, review_text, review_id):
+        """Puntaje con el léxico en español: tokeniza una vez, sin VADER ni TextBlob"""
+        result = self.lexicon.score(review_text)
+        return {
+            'review_id': review_id,
+            'categoria_emocional_id': self.determine_emotion_category(result['score']),
+            'puntuacion_sentimiento': result['score'],
+            'confianza': result['confidence'],
+            'palabras_positivas': ', '.join(result['positive_words'][:10]),
+            'palabras_negativas': ', '.join(result['negative_words'][:10]),
+            'palabras_clave_detectadas': json.dumps(result['detected_keywords'][:15]),
+            'version_lexico': self.lexicon_version
+        }
+    
+    @METRICS.timed('db.save_sentiment_analysis')
+    def save_sentiment_analysis(self, analysis_result, texto=None):
+        """Guardar análisis de sentimiento en la base de datos.
+
+        Con `texto` también se indexan sus tokens (ReviewTokens) para re-puntuar la
+        reseña si cambian las palabras clave que contiene.
+        """
         try:
             cursor = self.db.connection.cursor()
             
             query = """
             INSERT INTO AnalisisSentimientos 
             (review_id, categoria_emocional_id, puntuacion_sentimiento, confianza, 
-             palabras_positivas, palabras_negativas, palabras_clave_detectadas)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
+             palabras_positivas, palabras_negativas, palabras_clave_detectadas, version_lexico)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """
             
             cursor.execute(query, (
@@ -763,10 +1055,14 @@ class SentimentAnalyzer:
                 analysis_result['confianza'],
                 analysis_result['palabras_positivas'],
                 analysis_result['palabras_negativas'],
-                analysis_result['palabras_clave_detectadas']
+                analysis_result['palabras_clave_detectadas'],
+                analysis_result.get('version_lexico')
             ))
+            if texto:
+                index_review_tokens(cursor, [(analysis_result['review_id'], texto)])
             
             self.db.connection.commit()
+            METRICS.incr('filas.analisis_sentimientos')
             return True
             
         except Exception as e:
@@ -780,7 +1076,7 @@ class SentimentAnalyzer:
             
             # CONSULTA CORREGIDA para NVARCHAR(MAX)
             query = """
-            SELECT r.id, r.texto 
+            SELECT r.id, r.texto, r.texto_normalizado
             FROM Reviews r 
             LEFT JOIN AnalisisSentimientos a ON r.id = a.review_id
             WHERE r.sucursal_id = ? 
@@ -797,13 +1093,13 @@ class SentimentAnalyzer:
             print(f"📝 Encontrados {len(reviews)} reviews para analizar en sucursal {sucursal_id}")
             
             for review in reviews:
-                review_id, texto = review
+                review_id, texto, texto_normalizado = review
                 
                 if texto and texto.strip():  # Verificar que no esté vacío
-                    # Analizar sentimiento
-                    analysis = self.analyze_review_sentiment(texto, review_id)
+                    # Analizar sentimiento (reseñas cargadas antes de texto_normalizado se limpian aquí)
+                    analysis = self.analyze_review_sentiment(texto, review_id, texto_normalizado)
                     
-                    if analysis and self.save_sentiment_analysis(analysis):
+                    if analysis and self.save_sentiment_analysis(analysis, texto):
                         analyzed_count += 1
                         print(f"✅ Review {review_id} analizado")
                     else:
@@ -819,22 +1115,29 @@ class SentimentAnalyzer:
             return 0
         
         
+    @METRICS.timed('sentimiento.metricas_emocionales')
     def calculate_emotional_metrics(self, sucursal_id):
         """Calcular métricas emocionales para una sucursal"""
         try:
             cursor = self.db.connection.cursor()
             
-            # Obtener estadísticas de sentimientos
+            # Obtener estadísticas de sentimientos: se agrega sobre los índices columnstore
+            # y recién después se une con el catálogo de categorías (5 filas)
             query = """
             SELECT 
                 ce.nombre,
-                COUNT(a.id) as cantidad,
-                AVG(a.puntuacion_sentimiento) as promedio_puntuacion
-            FROM AnalisisSentimientos a
-            INNER JOIN Reviews r ON a.review_id = r.id
-            INNER JOIN CategoriasEmocionales ce ON a.categoria_emocional_id = ce.id
-            WHERE r.sucursal_id = ?
-            GROUP BY ce.id, ce.nombre
+                x.cantidad,
+                x.promedio_puntuacion
+            FROM (
+                SELECT a.categoria_emocional_id,
+                       COUNT(*) as cantidad,
+                       AVG(a.puntuacion_sentimiento) as promedio_puntuacion
+                FROM AnalisisSentimientos a
+                INNER JOIN Reviews r ON a.review_id = r.id
+                WHERE r.sucursal_id = ?
+                GROUP BY a.categoria_emocional_id
+            ) x
+            INNER JOIN CategoriasEmocionales ce ON x.categoria_emocional_id = ce.id
             """
             
             cursor.execute(query, (sucursal_id,))
@@ -925,6 +1228,32 @@ class SentimentAnalyzer:
             print(f"❌ Error calculando métricas emocionales: {str(e)}")
             return None
 
+    def sentiment_by_month(self, sucursal_id, desde, hasta):
+        """Puntaje promedio por mes según la fecha aproximada de la reseña.
+
+        El filtro por (sucursal_id, fecha_review_aprox) es una búsqueda por rango en
+        IX_Reviews_Sucursal_FechaAprox; retorna [(mes, cantidad, promedio)].
+        """
+        try:
+            cursor = self.db.connection.cursor()
+            cursor.execute("""
+            SELECT DATEFROMPARTS(YEAR(r.fecha_review_aprox), MONTH(r.fecha_review_aprox), 1) as mes,
+                   COUNT(*) as cantidad,
+                   AVG(a.puntuacion_sentimiento) as promedio_puntuacion
+            FROM Reviews r
+            INNER JOIN AnalisisSentimientos a ON a.review_id = r.id
+            WHERE r.sucursal_id = ?
+            AND r.fecha_review_aprox >= ? AND r.fecha_review_aprox < ?
+            GROUP BY DATEFROMPARTS(YEAR(r.fecha_review_aprox), MONTH(r.fecha_review_aprox), 1)
+            ORDER BY mes
+            """, (sucursal_id, desde, hasta))
+            return [(row.mes, row.cantidad, float(row.promedio_puntuacion)) for row in cursor.fetchall()]
+
+        except Exception as e:
+            print(f"❌ Error calculando sentimiento por mes: {str(e)}")
+            return []
+
+    @METRICS.timed('db.save_emotional_metrics')
     def save_emotional_metrics(self, sucursal_id, metrics):
         """Guardar métricas emocionales en la base de datos"""
         try:
@@ -998,9 +1327,9 @@ class SentimentAnalyzer:
 
 
 # Función para analizar sentimientos de todas las sucursales
-def analyze_all_sentiments(db_manager):
+def analyze_all_sentiments(db_manager, modo='ensemble'):
     """Analizar sentimientos de todas las sucursales"""
-    analyzer = SentimentAnalyzer(db_manager)
+    analyzer = SentimentAnalyzer(db_manager, modo)
     
     try:
         cursor = db_manager.connection.cursor()
@@ -1100,76 +1429,168 @@ def read_urls_from_file(filename):
         return []
 
 
-def main():
-    """Función principal que procesa todas las URLs y analiza sentimientos"""
+def main(scrapers=1, queue_size=4, batch_size=5, resume=False, max_attempts=5,
+         metrics_json=None, metrics_prom=None, sentiment_mode='ensemble'):
+    """Función principal que procesa todas las URLs y analiza sentimientos.
+
+    Los scrapers (hilos con su propio navegador) entregan cada resultado a un
+    hilo escritor que guarda en SQL Server por lotes mientras se sigue scrapeando.
+    El avance queda en la cola de trabajos (scrape_jobs.db): con resume=True solo
+    se procesan las URLs pendientes o fallidas de la ejecución anterior.
+    Al terminar se escribe el reporte de métricas (JSON y, opcional, Prometheus).
+    Retorna True solo si todas las URLs quedaron guardadas (el código de salida del
+    script, que ejecutar_etl.py usa para decidir si la etapa terminó bien).
+    """
     urls_file = 'urls.txt'
     
+    if sync_playwright is None:
+        print("❌ Playwright no está instalado (pip install playwright). Para cargar datos guardados usa --replay")
+        return False
+    
     # Conectar a la base de datos
     db = DatabaseManager(DB_CONFIG)
     if not db.connect():
         print("❌ No se pudo conectar a la base de datos. Verifica la configuración.")
-        return
+        return False
     
+    # Snapshot columnar de la ejecución (Parquet), escrito por tramos de sucursales;
+    # sin pyarrow se usa el JSON por sucursal
+    store = SnapshotStore() if snapshots_disponibles() else None
+    if store is None:
+        print("⚠️ pyarrow no disponible, los backups se guardarán como info-N.json")
+    store_lock = threading.Lock()
+
+    # Cola persistente de trabajos: el escritor marca cada URL al confirmar su guardado
+    jobs = JobStore(max_attempts=max_attempts)
+
+    def on_saved(resultado, sucursal_id):
+        if sucursal_id:
+            jobs.mark_done(resultado.url, sucursal_id)
+        else:
+            jobs.mark_failed(resultado.url, "error guardando en la base de datos")
+
+    # Escritor de BD en segundo plano con cola acotada
+    writer = DatabaseWriter(lambda: DatabaseManager(DB_CONFIG), maxsize=queue_size,
+                            batch_size=batch_size, on_saved=on_saved)
+    writer.start()
+
     try:
         # Leer URLs del archivo (ya limpia duplicados automáticamente)
         urls = read_urls_from_file(urls_file)
         
         if not urls:
             print(f"No se encontraron URLs en {urls_file}")
-            return
+            return False
+        
+        # Enlaces cortos resueltos una vez (caché local): se navega directo a la URL
+        # canónica y dos enlaces al mismo lugar se scrapean una sola vez
+        lugares = PlaceCache()
+        with METRICS.timer('enlaces.resolver'):
+            resueltos = lugares.resolve_all(urls)
+        lugares.close()
+        urls, duplicadas = dedupe_by_place(urls, resueltos)
+        for url, conservada in duplicadas:
+            print(f"⚠️ {url} es el mismo lugar que {conservada}, se omite")
+        
+        jobs.add_urls(urls)
+        if resume:
+            interrumpidos = jobs.recover(db)
+            if interrumpidos:
+                print(f"♻️ {interrumpidos} URLs quedaron a medias en la ejecución anterior")
+        else:
+            jobs.start_cycle(urls)
+        posiciones = {url: i for i, url in enumerate(urls, 1)}
         
         print(f"📋 Se encontraron {len(urls)} URLs únicas para procesar")
+        if resume:
+            print(f"♻️ Reanudando: {len(jobs.ready(urls))} URLs pendientes o fallidas")
         print("=" * 50)
         
         # Procesar cada URL
-        successful_extractions = 0
-        failed_extractions = 0
-        successful_db_saves = 0
+        contadores = {'successful_extractions': 0, 'failed_extractions': 0}
+        contadores_lock = threading.Lock()
         
-        for i, url in enumerate(urls, 1):
+        def procesar(url):
+            i = posiciones[url]
             print(f"\n🔄 Procesando URL {i}/{len(urls)}")
             print(f"URL: {url}")
             print("-" * 30)
             
+            jobs.mark_started(url)
             try:
-                resultado = scrape_google_maps(url)
+                with METRICS.branch(url), METRICS.timer('scrape.total'):
+                    lugar = resueltos.get(url)
+                    resultado = scrape_google_maps(url, lugar['url_canonica'] if lugar else None)
                 
                 if resultado:
-                    # Guardar en base de datos
-                    if db.save_complete_data(resultado):
-                        successful_db_saves += 1
-                        print("💾 Datos guardados en SQL Server exitosamente")
+                    # Guardar en base de datos (bloquea si el escritor va atrasado)
+                    writer.submit(resultado)
                     
-                    # Guardar backup en JSON (opcional)
-                    save_result_to_json(resultado, i)
-                    successful_extractions += 1
+                    # Guardar backup (snapshot Parquet o JSON)
+                    if store is not None:
+                        with store_lock:
+                            store.add(resultado)
+                    else:
+                        save_result_to_json(resultado, i)
+                    with contadores_lock:
+                        contadores['successful_extractions'] += 1
                     
                     # Mostrar resumen
-                    print(f"📍 Nombre: {resultado['nombre']}")
-                    print(f"📍 Ubicación: {resultado['ubicacion']}")
-                    print(f"⭐ Rating global: {resultado['rating_global']}")
-                    print(f"💬 Total reviews: {resultado['total_reviews']}")
-                    print(f"📝 Reviews extraídos: {len(resultado['reviews'])}")
+                    print(f"📍 Nombre: {resultado.nombre}")
+                    print(f"📍 Ubicación: {resultado.ubicacion}")
+                    print(f"⭐ Rating global: {resultado.rating_global}")
+                    print(f"💬 Total reviews: {resultado.total_reviews}")
+                    print(f"📝 Reviews extraídos: {len(resultado.reviews)}")
                 else:
                     print(f"❌ No se pudieron extraer los datos de la URL {i}")
-                    failed_extractions += 1
+                    jobs.mark_failed(url, "no se pudieron extraer los datos")
+                    with contadores_lock:
+                        contadores['failed_extractions'] += 1
                     
             except Exception as e:
                 print(f"❌ Error procesando URL {i}: {str(e)}")
-                failed_extractions += 1
+                jobs.mark_failed(url, e)
+                with contadores_lock:
+                    contadores['failed_extractions'] += 1
             
             # Pausa entre extracciones
             if i < len(urls):
                 print("⏳ Esperando 3 segundos antes de la siguiente extracción...")
                 time.sleep(3)
         
+        # Rondas hasta que no queden URLs listas; las fallidas esperan su backoff
+        while True:
+            pendientes = jobs.ready(urls)
+            if not pendientes:
+                espera = jobs.next_retry_in(urls)
+                if espera is None:
+                    break
+                print(f"⏳ Próximo reintento en {espera:.0f}s...")
+                time.sleep(espera)
+                continue
+            with ThreadPoolExecutor(max_workers=scrapers) as executor:
+                list(executor.map(procesar, pendientes))
+            # Los fallos de guardado se conocen cuando el escritor termina la ronda
+            writer.wait_idle()
+        
+        # Esperar a que se escriba todo lo pendiente
+        writer.close()
+        successful_db_saves = writer.saved
+        if successful_db_saves > 0:
+            db.compact_columnstore(('Reviews',))
+        
         # Mostrar resumen de extracción
         print("\n" + "=" * 50)
         print("📊 RESUMEN DE EXTRACCIÓN")
         print("=" * 50)
-        print(f"✅ Extracciones exitosas: {successful_extractions}")
+        print(f"✅ Extracciones exitosas: {contadores['successful_extractions']}")
         print(f"💾 Guardados en BD exitosos: {successful_db_saves}")
-        print(f"❌ Extracciones fallidas: {failed_extractions}")
+        print(f"❌ Extracciones fallidas: {contadores['failed_extractions']}")
+        print(f"⏸️ Tiempo esperando a la BD: {writer.blocked_seconds:.1f}s")
+        print(f"📋 Estado de la cola de trabajos: {jobs.summary()}")
+        sin_guardar = [url for url in urls if (jobs.get(url) or {}).get('estado') != 'completado']
+        if sin_guardar:
+            print(f"⚠️ {len(sin_guardar)} URLs no quedaron guardadas (se reintentan con --resume)")
         
         # ANÁLISIS DE SENTIMIENTOS
         if successful_db_saves > 0:
@@ -1180,7 +1601,8 @@ def main():
             response = input("¿Deseas realizar análisis de sentimientos? (s/n): ").lower().strip()
             
             if response in ['s', 'si', 'sí', 'y', 'yes']:
-                analyze_all_sentiments(db)
+                analyze_all_sentiments(db, sentiment_mode)
+                db.compact_columnstore(('AnalisisSentimientos',))
                 
                 # Mostrar estadísticas finales
                 print_final_statistics(db)
@@ -1188,12 +1610,21 @@ def main():
                 print("⏭️ Análisis de sentimientos omitido")
         
         print(f"\n🎉 Proceso completado!")
+        return not sin_guardar
         
     except Exception as e:
         print(f"❌ Error en función main: {str(e)}")
+        return False
         
     finally:
+        writer.close()
+        jobs.close()
+        if store is not None:
+            # Solo las sucursales del último tramo (las anteriores ya están en disco)
+            with METRICS.timer('snapshot.flush'):
+                store.flush()
         db.disconnect()
+        write_metrics(metrics_json, metrics_prom)
 
 def print_final_statistics(db_manager):
     """Mostrar estadísticas finales del análisis"""
@@ -1203,15 +1634,13 @@ def print_final_statistics(db_manager):
         print(f"\n📈 ESTADÍSTICAS FINALES")
         print("=" * 50)
         
-        # Estadísticas generales
+        # Estadísticas generales: conteos independientes (las FK garantizan que toda
+        # reseña tiene sucursal y todo análisis tiene reseña), sin COUNT DISTINCT sobre el join
         stats_query = """
         SELECT 
-            COUNT(DISTINCT s.id) as total_sucursales,
-            COUNT(DISTINCT r.id) as total_reviews,
-            COUNT(DISTINCT a.id) as total_reviews_analizados
-        FROM Sucursales s
-        LEFT JOIN Reviews r ON s.id = r.sucursal_id
-        LEFT JOIN AnalisisSentimientos a ON r.id = a.review_id
+            (SELECT COUNT(*) FROM Sucursales) as total_sucursales,
+            (SELECT COUNT(*) FROM Reviews) as total_reviews,
+            (SELECT COUNT(DISTINCT review_id) FROM AnalisisSentimientos) as total_reviews_analizados
         """
         
         cursor.execute(stats_query)
@@ -1225,11 +1654,14 @@ def print_final_statistics(db_manager):
         emotion_query = """
         SELECT 
             ce.nombre,
-            COUNT(a.id) as cantidad,
-            CAST(COUNT(a.id) * 100.0 / SUM(COUNT(a.id)) OVER() AS DECIMAL(5,2)) as porcentaje
-        FROM AnalisisSentimientos a
-        INNER JOIN CategoriasEmocionales ce ON a.categoria_emocional_id = ce.id
-        GROUP BY ce.id, ce.nombre
+            x.cantidad,
+            CAST(x.cantidad * 100.0 / SUM(x.cantidad) OVER() AS DECIMAL(5,2)) as porcentaje
+        FROM (
+            SELECT categoria_emocional_id, COUNT(*) as cantidad
+            FROM AnalisisSentimientos
+            GROUP BY categoria_emocional_id
+        ) x
+        INNER JOIN CategoriasEmocionales ce ON x.categoria_emocional_id = ce.id
         ORDER BY ce.id
         """
         
@@ -1277,9 +1709,9 @@ def create_example_urls_file():
             return False
     return False
 
-def analyze_single_sucursal(db_manager, sucursal_id):
+def analyze_single_sucursal(db_manager, sucursal_id, modo='ensemble'):
     """Analizar sentimientos de una sucursal específica"""
-    analyzer = SentimentAnalyzer(db_manager)
+    analyzer = SentimentAnalyzer(db_manager, modo)
     
     try:
         cursor = db_manager.connection.cursor()
@@ -1304,15 +1736,388 @@ def analyze_single_sucursal(db_manager, sucursal_id):
     except Exception as e:
         print(f"❌ Error analizando sucursal {sucursal_id}: {str(e)}")
 
+def replay(patron=None, workers=4, metrics_json=None, metrics_prom=None):
+    """Recargar la BD desde snapshots guardados (sin navegador ni red)"""
+    db_factory = lambda: DatabaseManager(DB_CONFIG)
+    if patron:
+        rutas = rutas_json(patron)
+        if not rutas:
+            print(f"No se encontraron archivos para {patron}")
+            return
+        replay_json(db_factory, rutas, workers=workers)
+    elif snapshots_disponibles():
+        replay_parquet(db_factory, SnapshotReader(), workers=workers)
+    else:
+        replay_json(db_factory, rutas_json(), workers=workers)
+    write_metrics(metrics_json, metrics_prom)
+
+def write_metrics(metrics_json=None, metrics_prom=None):
+    """Guardar el reporte de métricas de la ejecución"""
+    try:
+        METRICS.write_json(metrics_json)
+        if metrics_prom:
+            METRICS.write_prometheus(metrics_prom)
+    except Exception as e:
+        print(f"⚠️ No se pudieron guardar las métricas: {str(e)}")
+
+def abrir_cola_compartida(db, jobs_sqlite=None, **kwargs):
+    """LeaseQueue sobre TrabajosScraping de SQL Server, o sobre un archivo SQLite de prueba"""
+    if jobs_sqlite:
+        return LeaseQueue.sqlite(jobs_sqlite, **kwargs)
+    return LeaseQueue(db.connection, **kwargs)
+
+def encolar(jobs_sqlite=None, urls_file='urls.txt'):
+    """Cargar las URLs de urls.txt en la cola compartida y empezar una ronda nueva"""
+    urls = read_urls_from_file(urls_file)
+    if not urls:
+        print(f"No se encontraron URLs en {urls_file}")
+        return
+    lugares = PlaceCache()
+    try:
+        urls, duplicadas = dedupe_by_place(urls, lugares.resolve_all(urls))
+    finally:
+        lugares.close()
+    for url, conservada in duplicadas:
+        print(f"⚠️ {url} es el mismo lugar que {conservada}, se omite")
+
+    db = DatabaseManager(DB_CONFIG)
+    if not jobs_sqlite and not db.connect():
+        return
+    try:
+        cola = abrir_cola_compartida(db, jobs_sqlite)
+        cola.add_urls(urls)
+        cola.start_cycle(urls)
+        print(f"📋 {len(urls)} URLs encoladas: {cola.summary()}")
+        cola.close()
+    except Exception as e:
+        print(f"❌ Error encolando URLs (¿migración 0010 aplicada?): {str(e)}")
+    finally:
+        if not jobs_sqlite:
+            db.disconnect()
+
+def trabajador(scrapers=1, queue_size=4, batch_size=5, lease_segundos=300, max_attempts=5,
+               jobs_sqlite=None, metrics_json=None, metrics_prom=None):
+    """Modo distribuido: tomar URLs de la cola compartida hasta que no queden.
+
+    Se pueden correr tantos trabajadores como se quiera, en esta u otras máquinas: cada
+    URL tomada queda a nombre del trabajador con un lease que se renueva mientras se
+    scrapea y hasta que el escritor masivo confirma su guardado. Si el proceso muere, el
+    lease vence y otro trabajador la retoma; recargar una sucursal ya guardada es seguro
+    (reseñas deduplicadas, calificación solo si cambió).
+    """
+    if sync_playwright is None:
+        print("❌ Playwright no está instalado (pip install playwright)")
+        return
+    db = DatabaseManager(DB_CONFIG)
+    if not db.connect():
+        return
+    try:
+        cola = abrir_cola_compartida(db, jobs_sqlite, lease_segundos=lease_segundos, max_attempts=max_attempts)
+    except Exception as e:
+        print(f"❌ Error abriendo la cola compartida (¿migración 0010 aplicada?): {str(e)}")
+        db.disconnect()
+        return
+    print(f"👷 Trabajador {cola.trabajador}: {cola.remaining()} URLs por procesar")
+
+    def on_saved(resultado, sucursal_id):
+        if sucursal_id:
+            cola.complete(resultado.url, sucursal_id)
+        else:
+            cola.fail(resultado.url, "error guardando en la base de datos")
+
+    writer = DatabaseWriter(lambda: DatabaseManager(DB_CONFIG), maxsize=queue_size,
+                            batch_size=batch_size, on_saved=on_saved)
+    writer.start()
+    cola.start_heartbeat()
+    lugares = PlaceCache()
+    espera = min(30, lease_segundos / 2)
+
+    def scrapear():
+        while True:
+            tomadas = cola.lease()
+            if not tomadas:
+                # Sin URLs disponibles: se espera si quedan en proceso (pueden fallar o vencer) o con reintentos
+                if not cola.remaining():
+                    return
+                time.sleep(espera)
+                continue
+            url = tomadas[0]
+            print(f"\n🔄 {url}")
+            try:
+                with METRICS.branch(url), METRICS.timer('scrape.total'):
+                    lugar = lugares.resolve(url)
+                    resultado = scrape_google_maps(url, lugar['url_canonica'] if lugar else None)
+                if resultado:
+                    writer.submit(resultado)
+                    print(f"📍 {resultado.nombre}: {len(resultado.reviews)} reviews extraídos")
+                else:
+                    cola.fail(url, "no se pudieron extraer los datos")
+            except Exception as e:
+                print(f"❌ Error procesando {url}: {str(e)}")
+                cola.fail(url, e)
+
+    try:
+        with ThreadPoolExecutor(max_workers=scrapers) as executor:
+            for futuro in [executor.submit(scrapear) for _ in range(scrapers)]:
+                futuro.result()
+    except KeyboardInterrupt:
+        print("\n⏹️ Deteniendo trabajador...")
+    finally:
+        writer.close()
+        cola.stop_heartbeat()
+        devueltas = cola.release()
+        if devueltas:
+            print(f"↩️ {devueltas} URLs devueltas a la cola")
+        print(f"📋 Estado de la cola compartida: {cola.summary()}")
+        cola.close()
+        lugares.close()
+        db.disconnect()
+        write_metrics(metrics_json, metrics_prom)
+
+def reanalizar_cambios(modo='ensemble'):
+    """Aplicar los cambios del léxico a los análisis ya guardados sin re-puntuar todo"""
+    db = DatabaseManager(DB_CONFIG)
+    if not db.connect():
+        return
+    try:
+        with METRICS.timer('sentimiento.reanalizar_cambios'):
+            rescore_changed(SentimentAnalyzer(db, modo))
+    except Exception as e:
+        print(f"❌ Error re-puntuando reseñas: {str(e)}")
+    finally:
+        db.disconnect()
+
+def backfill_fechas(chunk_size=5000):
+    """Resolver las fechas relativas de las reseñas cargadas antes de fecha_review_aprox"""
+    db = DatabaseManager(DB_CONFIG)
+    if not db.connect():
+        return
+    try:
+        with METRICS.timer('db.backfill_fechas'):
+            backfill_review_dates(db.connection, chunk_size)
+    except Exception as e:
+        print(f"❌ Error completando fechas de reseñas: {str(e)}")
+    finally:
+        db.disconnect()
+
+def rebuild_horarios():
+    """Generar los intervalos de atención de las sucursales cargadas antes de HorariosIntervalos"""
+    db = DatabaseManager(DB_CONFIG)
+    if not db.connect():
+        return
+    try:
+        rebuild_intervals(db.connection)
+    except Exception as e:
+        print(f"❌ Error regenerando intervalos de atención: {str(e)}")
+    finally:
+        db.disconnect()
+
+def resolver_enlaces(urls_file='urls.txt'):
+    """Resolver los enlaces de urls.txt en la caché local y mostrar los que repiten lugar"""
+    urls = read_urls_from_file(urls_file)
+    lugares = PlaceCache()
+    try:
+        resueltos = lugares.resolve_all(urls)
+        for url in urls:
+            lugar = resueltos.get(url)
+            if lugar is None:
+                print(f"❌ {url}: sin resolver")
+            else:
+                print(f"🔗 {url} -> {lugar['id_lugar']} ({lugar['latitud']}, {lugar['longitud']})")
+        unicas, duplicadas = dedupe_by_place(urls, resueltos)
+        for url, conservada in duplicadas:
+            print(f"⚠️ {url} es el mismo lugar que {conservada}")
+        print(f"✅ {len(unicas)} lugares distintos en {len(urls)} URLs")
+    finally:
+        lugares.close()
+
+def rebuild_ubicaciones():
+    """Decodificar el Plus Code de las sucursales cargadas antes de la migración 0009"""
+    db = DatabaseManager(DB_CONFIG)
+    if not db.connect():
+        return
+    try:
+        rebuild_locations(db.connection)
+    except Exception as e:
+        print(f"❌ Error completando ubicaciones: {str(e)}")
+    finally:
+        db.disconnect()
+
+def cercanas(punto, limite=5, radio_km=None):
+    """Sucursales más cercanas a 'LAT,LON' (o a menos de radio_km) con el índice en memoria"""
+    db = DatabaseManager(DB_CONFIG)
+    if not db.connect():
+        return
+    try:
+        lat, lon = (float(v) for v in punto.split(','))
+        indice = BranchLocationIndex.from_db(db.connection)
+        with METRICS.timer('geo.consulta'):
+            resultados = indice.within(lat, lon, radio_km) if radio_km is not None else indice.nearest(lat, lon, limite)
+        cursor = db.connection.cursor()
+        cursor.execute("SELECT id, nombre FROM Sucursales WHERE latitud IS NOT NULL")
+        nombres = {row[0]: row[1] for row in cursor.fetchall()}
+        print(f"📍 {len(resultados)} sucursales cerca de {lat}, {lon} (de {len(indice)} ubicadas)")
+        for sucursal_id, km in resultados:
+            print(f"  {km:7.2f} km  {nombres.get(sucursal_id)} (ID {sucursal_id})")
+    except Exception as e:
+        print(f"❌ Error buscando sucursales cercanas (¿migración 0009 aplicada?): {str(e)}")
+    finally:
+        db.disconnect()
+
+def deduplicar(modo='ensemble'):
+    """Unir las reseñas casi-duplicadas ya cargadas y refrescar las métricas de sus sucursales"""
+    db = DatabaseManager(DB_CONFIG)
+    if not db.connect():
+        return
+    try:
+        with METRICS.timer('db.deduplicar'):
+            eliminadas = dedup_reviews(db.connection)
+        if eliminadas:
+            analyzer = SentimentAnalyzer(db, modo)
+            for sucursal_id in sorted(eliminadas):
+                # Las reseñas cuyo texto se completó perdieron su análisis
+                analyzer.analyze_all_reviews_for_sucursal(sucursal_id)
+                metrics = analyzer.calculate_emotional_metrics(sucursal_id)
+                if metrics:
+                    analyzer.save_emotional_metrics(sucursal_id, metrics)
+                else:
+                    # Sin reseñas analizadas que queden: las métricas guardadas contaban las borradas
+                    cursor = db.connection.cursor()
+                    cursor.execute("DELETE FROM MetricasEmocionales WHERE sucursal_id = ?", (sucursal_id,))
+                    db.connection.commit()
+    except Exception as e:
+        print(f"❌ Error deduplicando reseñas: {str(e)}")
+    finally:
+        db.disconnect()
+
+def buscar(consulta, sucursal_id=None, limite=20):
+    """Buscar reseñas por palabras, frases o prefijos en el índice de texto completo"""
+    db = DatabaseManager(DB_CONFIG)
+    if not db.connect():
+        return
+    try:
+        with METRICS.timer('db.buscar_reviews'):
+            resultados = search_reviews(db.connection, consulta, sucursal_id, limite)
+        print(f"🔎 {len(resultados)} reseñas para: {consulta}")
+        for r in resultados:
+            print(f"  [{r['rank']}] #{r['id']} {r['sucursal']} - {r['autor']} ({r['rating']}⭐): {(r['texto'] or '')[:150]}")
+    except Exception as e:
+        print(f"❌ Error buscando reseñas (¿migración 0007 aplicada?): {str(e)}")
+    finally:
+        db.disconnect()
+
+def tendencia(sucursal_id=None, desde=None):
+    """Mostrar la serie compacta de calificaciones y sus cambios por sucursal"""
+    db = DatabaseManager(DB_CONFIG)
+    if not db.connect():
+        return
+    try:
+        desde = datetime.fromisoformat(desde) if desde else None
+        series = rating_trend(db.connection, sucursal_id, desde)
+        print(f"📈 Calificaciones de {len(series)} sucursales")
+        for sucursal, serie in series.items():
+            cambio = ''
+            if serie['delta_rating'] is not None:
+                cambio = f" ({serie['delta_rating']:+.2f}⭐, {serie['delta_total']:+d} reseñas)"
+            print(f"\n🏥 {serie['nombre']} (ID {sucursal}){cambio}")
+            for tramo in serie['tramos']:
+                hasta = tramo['valid_to'] or 'hoy'
+                delta = ''
+                if tramo['delta_rating'] is not None:
+                    delta = f" [{tramo['delta_rating']:+.2f}⭐, {tramo['delta_total']:+d}]"
+                print(f"  {tramo['valid_from']} → {hasta}: {tramo['rating']}⭐ / {tramo['total']} reseñas{delta}")
+    except Exception as e:
+        print(f"❌ Error consultando tendencias (¿migración 0008 aplicada?): {str(e)}")
+    finally:
+        db.disconnect()
+
 # Ejemplo de uso
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extractor de reseñas de Google Maps con análisis de sentimientos")
+    parser.add_argument('--replay', nargs='?', const='', default=None, metavar='PATRON',
+                        help="Cargar la BD desde snapshots guardados sin scrapear (snapshots Parquet, o los JSON que coincidan con PATRON, p. ej. 'info-*.json')")
+    parser.add_argument('--workers', type=int, default=4, help="Hilos para --replay")
+    parser.add_argument('--scrapers', type=int, default=1, help="Navegadores scrapeando en paralelo")
+    parser.add_argument('--queue-size', type=int, default=4, help="Resultados que pueden esperar al escritor de BD antes de frenar a los scrapers")
+    parser.add_argument('--batch-size', type=int, default=5, help="Sucursales por transacción del escritor de BD")
+    parser.add_argument('--resume', action='store_true',
+                        help="Reanudar la ejecución anterior: solo URLs pendientes o fallidas de scrape_jobs.db")
+    parser.add_argument('--max-intentos', type=int, default=5, help="Intentos por URL antes de darla por fallida")
+    parser.add_argument('--metrics-json', default=None, metavar='RUTA',
+                        help="Reporte de tiempos y contadores de la ejecución (por defecto metricas/run-<fecha>.json)")
+    parser.add_argument('--metrics-prom', default=None, metavar='RUTA',
+                        help="Además escribir las métricas en formato de texto de Prometheus")
+    parser.add_argument('--sentimiento', choices=SENTIMENT_MODES, default='ensemble',
+                        help="Analizador de sentimientos: 'ensemble' (VADER + TextBlob + palabras clave) o 'lexico' (léxico en español, más rápido)")
+    parser.add_argument('--reanalizar-cambios', action='store_true',
+                        help="Re-puntuar solo las reseñas afectadas por cambios en PalabrasClave y salir")
+    parser.add_argument('--backfill-fechas', action='store_true',
+                        help="Calcular fecha_review_aprox de las reseñas ya cargadas y salir")
+    parser.add_argument('--rebuild-horarios', action='store_true',
+                        help="Regenerar HorariosIntervalos desde los horarios ya cargados y salir")
+    parser.add_argument('--deduplicar', action='store_true',
+                        help="Unir las reseñas casi-duplicadas ya cargadas (incluye las cortadas con '…') y salir")
+    parser.add_argument('--buscar', default=None, metavar='CONSULTA',
+                        help='Buscar reseñas (palabras, "frases" entre comillas, prefijo*) y salir')
+    parser.add_argument('--sucursal', type=int, default=None, metavar='ID', help="Limitar --buscar o --tendencia a una sucursal")
+    parser.add_argument('--limite', type=int, default=20, help="Resultados de --buscar o --cercanas")
+    parser.add_argument('--encolar', action='store_true',
+                        help="Cargar urls.txt en la cola compartida TrabajosScraping (nueva ronda) y salir")
+    parser.add_argument('--trabajador', action='store_true',
+                        help="Tomar URLs de la cola compartida hasta que no queden (se pueden correr varios, en varias máquinas)")
+    parser.add_argument('--lease', type=int, default=300, metavar='SEGUNDOS',
+                        help="Duración del lease de cada URL en --trabajador (se renueva cada tercio)")
+    parser.add_argument('--jobs-sqlite', default=None, metavar='RUTA',
+                        help="Usar un archivo SQLite como cola compartida en lugar de SQL Server (pruebas locales)")
+    parser.add_argument('--resolver-enlaces', action='store_true',
+                        help="Resolver los enlaces cortos de urls.txt (caché local) y listar los que apuntan al mismo lugar")
+    parser.add_argument('--rebuild-ubicaciones', action='store_true',
+                        help="Decodificar latitud/longitud desde el Plus Code de las sucursales ya cargadas")
+    parser.add_argument('--cercanas', default=None, metavar='LAT,LON',
+                        help="Sucursales más cercanas a un punto (usa --limite, o --radio en km)")
+    parser.add_argument('--radio', type=float, default=None, metavar='KM', help="Radio en km para --cercanas")
+    parser.add_argument('--tendencia', action='store_true',
+                        help="Mostrar la evolución del rating y del total de reseñas por sucursal (usa --sucursal y --desde)")
+    parser.add_argument('--desde', default=None, metavar='FECHA', help="Fecha ISO desde la que mostrar --tendencia")
+    args = parser.parse_args()
+
     print("🗺️  EXTRACTOR DE RESEÑAS DE GOOGLE MAPS CON ANÁLISIS DE SENTIMIENTOS")
     print("=" * 70)
     
+    if args.reanalizar_cambios:
+        reanalizar_cambios(args.sentimiento)
+    elif args.backfill_fechas:
+        backfill_fechas()
+    elif args.rebuild_horarios:
+        rebuild_horarios()
+    elif args.encolar:
+        encolar(args.jobs_sqlite)
+    elif args.trabajador:
+        trabajador(scrapers=args.scrapers, queue_size=args.queue_size, batch_size=args.batch_size,
+                   lease_segundos=args.lease, max_attempts=args.max_intentos, jobs_sqlite=args.jobs_sqlite,
+                   metrics_json=args.metrics_json, metrics_prom=args.metrics_prom)
+    elif args.resolver_enlaces:
+        resolver_enlaces()
+    elif args.rebuild_ubicaciones:
+        rebuild_ubicaciones()
+    elif args.deduplicar:
+        deduplicar(args.sentimiento)
+    elif args.buscar is not None:
+        buscar(args.buscar, args.sucursal, args.limite)
+    elif args.cercanas is not None:
+        cercanas(args.cercanas, args.limite, args.radio)
+    elif args.tendencia:
+        tendencia(args.sucursal, args.desde)
+    elif args.replay is not None:
+        replay(args.replay, args.workers, args.metrics_json, args.metrics_prom)
     # Crear archivo de ejemplo si no existe
-    if create_example_urls_file():
+    elif create_example_urls_file():
         print("Por favor, edita el archivo urls.txt con tus URLs y ejecuta el script nuevamente.")
         print("También configura los datos de conexión a SQL Server en DB_CONFIG.")
     else:
-        # Ejecutar el proceso principal
-        main()
+        # Ejecutar el proceso principal (código de salida 1 si quedaron URLs sin guardar)
+        exito = main(scrapers=args.scrapers, queue_size=args.queue_size, batch_size=args.batch_size,
+                     resume=args.resume, max_attempts=args.max_intentos,
+                     metrics_json=args.metrics_json, metrics_prom=args.metrics_prom,
+                     sentiment_mode=args.sentimiento)
+        sys.exit(0 if exito else 1)
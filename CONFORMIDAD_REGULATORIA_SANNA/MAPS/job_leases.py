@@ -0,0 +1,278 @@
+import os
+import socket
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+# Cola de URLs compartida entre procesos y máquinas (TrabajosScraping, migración 0010).
+# Cada trabajador toma URLs con un lease que renueva con latidos; si muere, el lease vence y
+# otro trabajador la retoma. Las horas salen del reloj de la BD, no del de cada máquina.
+# Con SQLite (un archivo compartido por procesos de la misma máquina) se prueba sin SQL Server.
+ESQUEMA_SQLITE = """
+CREATE TABLE IF NOT EXISTS TrabajosScraping (
+    url TEXT PRIMARY KEY,
+    estado TEXT NOT NULL DEFAULT 'pendiente',
+    intentos INTEGER NOT NULL DEFAULT 0,
+    proximo_intento TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    trabajador TEXT,
+    lease_hasta TEXT,
+    ultimo_latido TEXT,
+    ultimo_exito TEXT,
+    ultimo_error TEXT,
+    sucursal_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS IX_TrabajosScraping_Estado ON TrabajosScraping(estado, proximo_intento);
+"""
+
+SQL_AHORA = {'sqlserver': "SELECT GETDATE()", 'sqlite': "SELECT CURRENT_TIMESTAMP"}
+
+# Disponibles: pendientes, fallidas con backoff cumplido y en_proceso con el lease vencido.
+# UPDLOCK + READPAST: dos trabajadores que buscan a la vez se saltan las filas que el otro está
+# tomando en lugar de esperarlo; en SQLite el UPDATE ya es atómico (un escritor por archivo).
+SQL_TOMAR = {
+    'sqlserver': """
+    WITH siguientes AS (
+        SELECT TOP (?) url, estado, intentos, trabajador, lease_hasta, ultimo_latido
+        FROM TrabajosScraping WITH (UPDLOCK, READPAST, ROWLOCK)
+        WHERE intentos < ? AND proximo_intento <= ?
+          AND (estado IN ('pendiente', 'fallido') OR (estado = 'en_proceso' AND lease_hasta < ?))
+        ORDER BY proximo_intento
+    )
+    UPDATE siguientes
+    SET estado = 'en_proceso', trabajador = ?, intentos = intentos + 1, lease_hasta = ?, ultimo_latido = ?
+    OUTPUT INSERTED.url
+    """,
+    'sqlite': """
+    UPDATE TrabajosScraping
+    SET estado = 'en_proceso', trabajador = ?, intentos = intentos + 1, lease_hasta = ?, ultimo_latido = ?
+    WHERE url IN (
+        SELECT url FROM TrabajosScraping
+        WHERE intentos < ? AND proximo_intento <= ?
+          AND (estado IN ('pendiente', 'fallido') OR (estado = 'en_proceso' AND lease_hasta < ?))
+        ORDER BY proximo_intento
+        LIMIT ?
+    )
+    RETURNING url
+    """,
+}
+
+
+class LeaseQueue:
+    """Cola de trabajos con leases sobre la tabla TrabajosScraping.
+
+    lease() marca URLs como en_proceso a nombre de este trabajador hasta lease_hasta;
+    un hilo de latidos las renueva mientras siguen activas (scrapeando o esperando al
+    escritor de BD). complete() y fail() solo cambian filas que siguen a su nombre: si el
+    lease venció y otro trabajador la tomó, se informa y no se pisa su estado.
+    """
+
+    def __init__(self, connection, trabajador=None, dialecto='sqlserver', lease_segundos=300,
+                 max_attempts=5, backoff_base=30, backoff_max=900):
+        self.connection = connection
+        self.trabajador = trabajador or f"{socket.gethostname()}:{os.getpid()}"
+        self.dialecto = dialecto
+        self.duracion_lease = timedelta(seconds=lease_segundos)
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.activas = set()
+        self._lock = threading.RLock()
+        self._parar = threading.Event()
+        self._latidos = None
+
+    @classmethod
+    def sqlite(cls, path, **kwargs):
+        """Cola sobre un archivo SQLite (varios procesos de la misma máquina)"""
+        connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(ESQUEMA_SQLITE)
+        return cls(connection, dialecto='sqlite', **kwargs)
+
+    def _execute(self, query, params=()):
+        """(filas, filas afectadas) con commit; la conexión se comparte entre hilos con el lock"""
+        with self._lock:
+            cursor = self.connection.cursor()
+            try:
+                cursor.execute(query, params)
+                filas = cursor.fetchall() if cursor.description else []
+                afectadas = cursor.rowcount
+                self.connection.commit()
+            except Exception:
+                self.connection.rollback()
+                raise
+            return filas, afectadas
+
+    def _ahora(self):
+        filas, _ = self._execute(SQL_AHORA[self.dialecto])
+        ahora = filas[0][0]
+        return datetime.fromisoformat(ahora) if isinstance(ahora, str) else ahora.replace(microsecond=0)
+
+    def _fecha(self, fecha):
+        # SQLite guarda texto con el mismo formato que CURRENT_TIMESTAMP (comparable como cadena)
+        return fecha.isoformat(sep=' ', timespec='seconds') if self.dialecto == 'sqlite' else fecha
+
+    def add_urls(self, urls):
+        with self._lock:
+            cursor = self.connection.cursor()
+            try:
+                cursor.executemany("""
+                INSERT INTO TrabajosScraping (url)
+                SELECT ? WHERE NOT EXISTS (SELECT 1 FROM TrabajosScraping WHERE url = ?)
+                """, [(url, url) for url in urls])
+                self.connection.commit()
+            except Exception:
+                self.connection.rollback()
+                raise
+
+    def start_cycle(self, urls):
+        """Nueva ronda completa: las URLs vuelven a pendiente (también las completadas)"""
+        ahora = self._fecha(self._ahora())
+        with self._lock:
+            cursor = self.connection.cursor()
+            try:
+                cursor.executemany("""
+                UPDATE TrabajosScraping
+                SET estado = 'pendiente', intentos = 0, proximo_intento = ?, trabajador = NULL,
+                    lease_hasta = NULL, ultimo_error = NULL
+                WHERE url = ?
+                """, [(ahora, url) for url in urls])
+                self.connection.commit()
+            except Exception:
+                self.connection.rollback()
+                raise
+
+    def _expire_exhausted(self, ahora):
+        """Pasar a fallido las URLs con el lease vencido que ya agotaron sus intentos.
+
+        Su trabajador murió o perdió el lease en el último intento: ningún otro puede
+        tomarlas (intentos < max_attempts) y, si quedaran en_proceso, remaining() las
+        seguiría contando y los trabajadores esperarían para siempre.
+        """
+        _, afectadas = self._execute("""
+        UPDATE TrabajosScraping
+        SET estado = 'fallido', ultimo_error = 'lease vencido en el último intento', lease_hasta = NULL
+        WHERE estado = 'en_proceso' AND lease_hasta < ? AND intentos >= ?
+        """, (ahora, self.max_attempts))
+        if afectadas > 0:
+            print(f"🛑 {afectadas} URLs vencieron en su último intento y quedan como fallidas")
+        return afectadas
+
+    def lease(self, n=1):
+        """Tomar hasta n URLs disponibles; retorna la lista (vacía si no hay)"""
+        ahora = self._ahora()
+        hasta = self._fecha(ahora + self.duracion_lease)
+        ahora = self._fecha(ahora)
+        self._expire_exhausted(ahora)
+        if self.dialecto == 'sqlite':
+            params = (self.trabajador, hasta, ahora, self.max_attempts, ahora, ahora, n)
+        else:
+            params = (n, self.max_attempts, ahora, ahora, self.trabajador, hasta, ahora)
+        filas, _ = self._execute(SQL_TOMAR[self.dialecto], params)
+        urls = [fila[0] for fila in filas]
+        with self._lock:
+            self.activas.update(urls)
+        return urls
+
+    def renew(self):
+        """Extender el lease de las URLs activas; retorna las que ya no son de este trabajador"""
+        ahora = self._ahora()
+        hasta, ahora = self._fecha(ahora + self.duracion_lease), self._fecha(ahora)
+        perdidas = []
+        for url in list(self.activas):
+            _, afectadas = self._execute("""
+            UPDATE TrabajosScraping SET lease_hasta = ?, ultimo_latido = ?
+            WHERE url = ? AND trabajador = ? AND estado = 'en_proceso'
+            """, (hasta, ahora, url, self.trabajador))
+            if afectadas == 0:
+                perdidas.append(url)
+        with self._lock:
+            # Las que se completaron o fallaron mientras tanto no se perdieron
+            perdidas = [url for url in perdidas if url in self.activas]
+            self.activas.difference_update(perdidas)
+        for url in perdidas:
+            print(f"⚠️ Se perdió el lease de {url} (venció y la tomó otro trabajador)")
+        return perdidas
+
+    def complete(self, url, sucursal_id):
+        """Marcar la URL como completada; False si el lease ya no era de este trabajador"""
+        with self._lock:
+            self.activas.discard(url)
+        _, afectadas = self._execute("""
+        UPDATE TrabajosScraping
+        SET estado = 'completado', ultimo_exito = ?, ultimo_error = NULL, sucursal_id = ?, lease_hasta = NULL
+        WHERE url = ? AND trabajador = ? AND estado = 'en_proceso'
+        """, (self._fecha(self._ahora()), sucursal_id, url, self.trabajador))
+        if afectadas == 0:
+            print(f"⚠️ {url} se guardó, pero su lease ya lo tenía otro trabajador")
+        return afectadas > 0
+
+    def fail(self, url, error):
+        """Fallo: se libera la URL con backoff exponencial según sus intentos"""
+        with self._lock:
+            self.activas.discard(url)
+        filas, _ = self._execute("SELECT intentos FROM TrabajosScraping WHERE url = ?", (url,))
+        intentos = max(1, filas[0][0] if filas else 1)
+        espera = min(self.backoff_max, self.backoff_base * 2 ** (intentos - 1))
+        _, afectadas = self._execute("""
+        UPDATE TrabajosScraping
+        SET estado = 'fallido', ultimo_error = ?, proximo_intento = ?, lease_hasta = NULL
+        WHERE url = ? AND trabajador = ? AND estado = 'en_proceso'
+        """, (str(error)[:500], self._fecha(self._ahora() + timedelta(seconds=espera)), url, self.trabajador))
+        if afectadas == 0:
+            print(f"⚠️ {url} falló, pero su lease ya lo tenía otro trabajador")
+        elif intentos >= self.max_attempts:
+            print(f"🛑 {url} agotó sus {self.max_attempts} intentos: {error}")
+        else:
+            print(f"🔁 {url} se reintentará en {espera:.0f}s (intento {intentos}/{self.max_attempts})")
+
+    def release(self):
+        """Devolver a pendiente las URLs activas de este trabajador (al detenerse sin terminarlas)"""
+        with self._lock:
+            activas = list(self.activas)
+            self.activas.clear()
+        for url in activas:
+            self._execute("""
+            UPDATE TrabajosScraping SET estado = 'pendiente', intentos = intentos - 1, lease_hasta = NULL
+            WHERE url = ? AND trabajador = ? AND estado = 'en_proceso'
+            """, (url, self.trabajador))
+        return len(activas)
+
+    def remaining(self):
+        """URLs que todavía pueden procesarse: pendientes, en proceso o fallidas con reintentos"""
+        self._expire_exhausted(self._fecha(self._ahora()))
+        filas, _ = self._execute("""
+        SELECT COUNT(*) FROM TrabajosScraping
+        WHERE estado IN ('pendiente', 'en_proceso') OR (estado = 'fallido' AND intentos < ?)
+        """, (self.max_attempts,))
+        return filas[0][0]
+
+    def summary(self):
+        filas, _ = self._execute("SELECT estado, COUNT(*) FROM TrabajosScraping GROUP BY estado")
+        return {fila[0]: fila[1] for fila in filas}
+
+    def start_heartbeat(self):
+        """Hilo que renueva los leases activos cada tercio de la duración del lease"""
+        intervalo = self.duracion_lease.total_seconds() / 3
+
+        def latir():
+            while not self._parar.wait(intervalo):
+                try:
+                    self.renew()
+                except Exception as e:
+                    print(f"⚠️ Error renovando leases: {str(e)}")
+
+        self._parar.clear()
+        self._latidos = threading.Thread(target=latir, name='LeaseHeartbeat', daemon=True)
+        self._latidos.start()
+
+    def stop_heartbeat(self):
+        self._parar.set()
+        if self._latidos is not None:
+            self._latidos.join()
+            self._latidos = None
+
+    def close(self):
+        """Detener los latidos; la conexión de SQL Server es del DatabaseManager y no se cierra"""
+        self.stop_heartbeat()
+        if self.dialecto == 'sqlite':
+            self.connection.close()
@@ -0,0 +1,141 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+JOBS_DB = 'scrape_jobs.db'
+
+PENDIENTE = 'pendiente'
+EN_PROCESO = 'en_proceso'
+COMPLETADO = 'completado'
+FALLIDO = 'fallido'
+
+
+class JobStore:
+    """Cola persistente de URLs a scrapear (SQLite local).
+
+    Guarda por URL el estado, los intentos, el último éxito y el próximo
+    reintento (backoff exponencial). La unidad de trabajo es la URL completa:
+    una sucursal se guarda en una sola transacción, así que al reanudar las URLs
+    que no llegaron a guardarse se vuelven a scrapear desde el principio.
+    """
+
+    def __init__(self, path=JOBS_DB, max_attempts=5, backoff_base=30, backoff_max=900):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                url TEXT PRIMARY KEY,
+                estado TEXT NOT NULL DEFAULT 'pendiente',
+                intentos INTEGER NOT NULL DEFAULT 0,
+                proximo_intento REAL NOT NULL DEFAULT 0,
+                ultimo_intento TEXT,
+                ultimo_exito TEXT,
+                ultimo_error TEXT,
+                sucursal_id INTEGER
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_estado ON jobs(estado, proximo_intento)")
+
+    def _execute(self, query, params=()):
+        with self._lock:
+            return self.conn.execute(query, params).fetchall()
+
+    def add_urls(self, urls):
+        with self._lock:
+            self.conn.executemany("INSERT OR IGNORE INTO jobs (url) VALUES (?)", [(url,) for url in urls])
+
+    def start_cycle(self, urls):
+        """Nueva ejecución completa: todas las URLs vuelven a pendiente"""
+        with self._lock:
+            self.conn.executemany("""
+                UPDATE jobs SET estado = 'pendiente', intentos = 0, proximo_intento = 0,
+                                ultimo_error = NULL
+                WHERE url = ?
+            """, [(url,) for url in urls])
+
+    def recover(self, db=None):
+        """Reconciliar los trabajos que quedaron en_proceso (proceso caído).
+
+        Si el guardado en la BD alcanzó a confirmarse (db.get_saved_since) el
+        trabajo se da por completado; si no, vuelve a pendiente.
+        """
+        interrumpidos = self._execute("SELECT url, ultimo_intento FROM jobs WHERE estado = 'en_proceso'")
+        for job in interrumpidos:
+            guardado = db.get_saved_since(job['url'], job['ultimo_intento']) if db and job['ultimo_intento'] else None
+            if guardado:
+                sucursal_id, reviews = guardado
+                self.mark_done(job['url'], sucursal_id)
+                print(f"♻️ {job['url']} ya estaba guardada ({reviews} reviews), se marca como completada")
+            else:
+                self._execute("UPDATE jobs SET estado = 'pendiente' WHERE url = ?", (job['url'],))
+        return len(interrumpidos)
+
+    def ready(self, urls=None, now=None):
+        """URLs pendientes o fallidas con reintentos disponibles y backoff cumplido"""
+        now = time.time() if now is None else now
+        rows = self._execute("""
+            SELECT url FROM jobs
+            WHERE estado IN ('pendiente', 'fallido') AND intentos < ? AND proximo_intento <= ?
+            ORDER BY proximo_intento, rowid
+        """, (self.max_attempts, now))
+        listas = [row['url'] for row in rows]
+        if urls is not None:
+            orden = {url: i for i, url in enumerate(urls)}
+            listas = sorted((url for url in listas if url in orden), key=orden.get)
+        return listas
+
+    def next_retry_in(self, urls=None, now=None):
+        """Segundos hasta el próximo reintento pendiente, o None si no queda ninguno"""
+        now = time.time() if now is None else now
+        rows = self._execute("""
+            SELECT url, proximo_intento FROM jobs
+            WHERE estado = 'fallido' AND intentos < ?
+        """, (self.max_attempts,))
+        tiempos = [row['proximo_intento'] for row in rows if urls is None or row['url'] in urls]
+        if not tiempos:
+            return None
+        return max(0.0, min(tiempos) - now)
+
+    def get(self, url):
+        rows = self._execute("SELECT * FROM jobs WHERE url = ?", (url,))
+        return dict(rows[0]) if rows else None
+
+    def mark_started(self, url):
+        self._execute("""
+            UPDATE jobs SET estado = 'en_proceso', intentos = intentos + 1, ultimo_intento = ?
+            WHERE url = ?
+        """, (datetime.now().isoformat(timespec='seconds'), url))
+
+    def mark_done(self, url, sucursal_id):
+        self._execute("""
+            UPDATE jobs SET estado = 'completado', ultimo_exito = ?, ultimo_error = NULL, sucursal_id = ?
+            WHERE url = ?
+        """, (datetime.now().isoformat(timespec='seconds'), sucursal_id, url))
+
+    def mark_failed(self, url, error):
+        """Fallo: se programa el reintento con backoff exponencial según los intentos"""
+        job = self.get(url)
+        intentos = max(1, job['intentos'] if job else 1)
+        espera = min(self.backoff_max, self.backoff_base * 2 ** (intentos - 1))
+        self._execute("""
+            UPDATE jobs SET estado = 'fallido', ultimo_error = ?, proximo_intento = ?
+            WHERE url = ?
+        """, (str(error)[:500], time.time() + espera, url))
+        if intentos >= self.max_attempts:
+            print(f"🛑 {url} agotó sus {self.max_attempts} intentos: {error}")
+        else:
+            print(f"🔁 {url} se reintentará en {espera:.0f}s (intento {intentos}/{self.max_attempts})")
+
+    def summary(self):
+        rows = self._execute("SELECT estado, COUNT(*) AS n FROM jobs GROUP BY estado")
+        return {row['estado']: row['n'] for row in rows}
+
+    def close(self):
+        self.conn.close()
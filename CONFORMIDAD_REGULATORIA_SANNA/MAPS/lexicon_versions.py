@@ -0,0 +1,199 @@
+import json
+import hashlib
+
+from spanish_lexicon import (RE_TOKEN, SIN_TILDES, NEGADORES, INTENSIFICADORES, CONTRASTES,
+                             VENTANA_NEGACION, FACTOR_NEGACION, ALFA)
+
+LARGO_TOKEN = 100
+
+
+def tokens(texto):
+    """Tokens distintos de un texto, en minúsculas y sin tildes (claves del índice invertido)"""
+    if not texto:
+        return set()
+    return {t.translate(SIN_TILDES)[:LARGO_TOKEN] for t in RE_TOKEN.findall(texto.lower())}
+
+
+def lexicon_content(modo, palabras_clave, scorer=None):
+    """Todo lo que determina el puntaje de una reseña, en una forma comparable entre versiones.
+
+    'palabras' va de palabra a [peso, categoría]; 'reglas' cubre lo que no se puede
+    atribuir a una palabra (negación, intensificadores, ponderación del ensemble).
+    """
+    if modo == 'lexico':
+        categorias = {p.lower().translate(SIN_TILDES): d['categoria'] for p, d in palabras_clave.items()}
+        palabras = {p: [round(float(v), 4), categorias.get(p)] for p, v in scorer.valencias.items()}
+        reglas = {
+            'negadores': sorted(NEGADORES),
+            'intensificadores': INTENSIFICADORES,
+            'contrastes': sorted(CONTRASTES),
+            'ventana_negacion': VENTANA_NEGACION,
+            'factor_negacion': FACTOR_NEGACION,
+            'alfa': ALFA,
+        }
+    else:
+        palabras = {p: [round(float(d['peso']), 4), d['categoria']] for p, d in palabras_clave.items()}
+        reglas = {'ponderacion': [0.4, 0.3, 0.3]}
+    return {'modo': modo, 'palabras': palabras, 'reglas': reglas}
+
+
+def lexicon_version(contenido):
+    texto = json.dumps(contenido, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()[:16]
+
+
+def changed_tokens(anterior, actual):
+    """Tokens de las palabras agregadas, quitadas o con otro peso/categoría.
+
+    None si cambió algo que afecta a todas las reseñas (modo o reglas).
+    """
+    if anterior is None or anterior['modo'] != actual['modo'] or anterior['reglas'] != actual['reglas']:
+        return None
+    antes = anterior['palabras']
+    ahora = actual['palabras']
+    cambiadas = {p for p in antes.keys() | ahora.keys() if antes.get(p) != ahora.get(p)}
+    return set().union(*(tokens(p) for p in cambiadas)) if cambiadas else set()
+
+
+def register_version(connection, version, contenido):
+    cursor = connection.cursor()
+    cursor.execute("SELECT 1 FROM VersionesLexico WHERE version = ?", (version,))
+    if cursor.fetchone() is None:
+        cursor.execute(
+            "INSERT INTO VersionesLexico (version, modo, contenido) VALUES (?, ?, ?)",
+            (version, contenido['modo'], json.dumps(contenido, ensure_ascii=False))
+        )
+        connection.commit()
+
+
+def load_version(cursor, version):
+    cursor.execute("SELECT contenido FROM VersionesLexico WHERE version = ?", (version,))
+    fila = cursor.fetchone()
+    return json.loads(fila[0]) if fila else None
+
+
+def index_review_tokens(cursor, reviews):
+    """Agregar al índice invertido los tokens de [(review_id, texto)]; sin commit"""
+    filas = [(review_id, token) for review_id, texto in reviews for token in tokens(texto)]
+    if filas:
+        cursor.executemany("INSERT INTO ReviewTokens (review_id, token) VALUES (?, ?)", filas)
+    return len(filas)
+
+
+def _condicion_version(version):
+    # version_lexico NULL: análisis anteriores al versionado del léxico
+    return ("a.version_lexico IS NULL", ()) if version is None else ("a.version_lexico = ?", (version,))
+
+
+def rescore_changed(analyzer, chunk_size=1000):
+    """Re-puntuar solo las reseñas afectadas por los cambios del léxico y refrescar sus sucursales.
+
+    Para cada versión anterior presente en AnalisisSentimientos se calculan las palabras
+    cambiadas y, con ReviewTokens, las reseñas que las contienen; el resto solo se
+    re-etiqueta con la versión actual (su puntaje no cambia). Retorna las reseñas re-puntuadas.
+    """
+    connection = analyzer.db.connection
+    actual = analyzer.lexicon_version
+    cursor = connection.cursor()
+    cursor.fast_executemany = True
+
+    cursor.execute("""
+    SELECT version_lexico, COUNT(*) as cantidad
+    FROM AnalisisSentimientos
+    WHERE version_lexico IS NULL OR version_lexico <> ?
+    GROUP BY version_lexico
+    """, (actual,))
+    versiones = cursor.fetchall()
+    if not versiones:
+        print("✅ Todos los análisis usan la versión actual del léxico")
+        return 0
+
+    rescored = 0
+    sucursales = set()
+    try:
+        for version, cantidad in versiones:
+            condicion, parametros = _condicion_version(version)
+            anterior = load_version(cursor, version) if version else None
+            cambios = changed_tokens(anterior, analyzer.lexicon_content)
+
+            # Las reseñas analizadas antes del índice invertido se indexan una vez
+            cursor.execute(f"""
+            SELECT r.id, r.texto
+            FROM AnalisisSentimientos a
+            INNER JOIN Reviews r ON r.id = a.review_id
+            WHERE {condicion}
+            AND NOT EXISTS (SELECT 1 FROM ReviewTokens rt WHERE rt.review_id = r.id)
+            """, parametros)
+            index_review_tokens(cursor, [(row[0], row[1]) for row in cursor.fetchall()])
+
+            if cambios is None:
+                print(f"🔁 Versión {version or 'sin versión'}: reglas o modo distintos, se re-puntúan {cantidad} reseñas")
+                cursor.execute(f"""
+                SELECT r.id, r.texto, r.sucursal_id, r.texto_normalizado
+                FROM AnalisisSentimientos a
+                INNER JOIN Reviews r ON r.id = a.review_id
+                WHERE {condicion}
+                """, parametros)
+                afectadas = cursor.fetchall()
+            elif cambios:
+                cursor.execute("CREATE TABLE #TokensCambiados (token NVARCHAR(100) PRIMARY KEY)")
+                cursor.executemany("INSERT INTO #TokensCambiados (token) VALUES (?)", [(t,) for t in cambios])
+                cursor.execute(f"""
+                SELECT r.id, r.texto, r.sucursal_id, r.texto_normalizado
+                FROM Reviews r
+                INNER JOIN AnalisisSentimientos a ON a.review_id = r.id
+                WHERE {condicion}
+                AND EXISTS (
+                    SELECT 1 FROM ReviewTokens rt
+                    INNER JOIN #TokensCambiados t ON t.token = rt.token
+                    WHERE rt.review_id = r.id
+                )
+                """, parametros)
+                afectadas = cursor.fetchall()
+                cursor.execute("DROP TABLE #TokensCambiados")
+                print(f"🔁 Versión {version}: {len(cambios)} palabras cambiadas, {len(afectadas)} de {cantidad} reseñas afectadas")
+            else:
+                afectadas = []
+
+            for inicio in range(0, len(afectadas), chunk_size):
+                filas = []
+                for review_id, texto, sucursal_id, texto_normalizado in afectadas[inicio:inicio + chunk_size]:
+                    analisis = analyzer.analyze_review_sentiment(texto, review_id, texto_normalizado)
+                    if analisis is None:
+                        continue
+                    sucursales.add(sucursal_id)
+                    filas.append((
+                        analisis['categoria_emocional_id'],
+                        analisis['puntuacion_sentimiento'],
+                        analisis['confianza'],
+                        analisis['palabras_positivas'],
+                        analisis['palabras_negativas'],
+                        analisis['palabras_clave_detectadas'],
+                        actual,
+                        review_id
+                    ))
+                if filas:
+                    cursor.executemany("""
+                    UPDATE AnalisisSentimientos SET
+                        categoria_emocional_id = ?, puntuacion_sentimiento = ?, confianza = ?,
+                        palabras_positivas = ?, palabras_negativas = ?, palabras_clave_detectadas = ?,
+                        version_lexico = ?, fecha_analisis = GETDATE()
+                    WHERE review_id = ?
+                    """, filas)
+                    rescored += len(filas)
+
+            # Las no afectadas conservan su puntaje: solo cambia la versión
+            cursor.execute(f"UPDATE a SET a.version_lexico = ? FROM AnalisisSentimientos a WHERE {condicion}",
+                           (actual,) + parametros)
+            connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+
+    for sucursal_id in sorted(sucursales):
+        metrics = analyzer.calculate_emotional_metrics(sucursal_id)
+        if metrics:
+            analyzer.save_emotional_metrics(sucursal_id, metrics)
+
+    print(f"✅ {rescored} reseñas re-puntuadas; métricas actualizadas en {len(sucursales)} sucursales")
+    return rescored
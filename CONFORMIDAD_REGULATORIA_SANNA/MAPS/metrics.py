@@ -0,0 +1,161 @@
+import os
+import json
+import time
+import threading
+import functools
+from contextlib import contextmanager
+from datetime import datetime
+
+METRICAS_DIR = 'metricas'
+
+
+class _Cronometro:
+    """Mide etapas consecutivas: cada lap() registra el tiempo desde el anterior"""
+
+    def __init__(self, metrics, prefijo):
+        self.metrics = metrics
+        self.prefijo = prefijo
+        self.ultimo = time.perf_counter()
+
+    def lap(self, etapa):
+        ahora = time.perf_counter()
+        self.metrics.observe(f"{self.prefijo}.{etapa}", ahora - self.ultimo)
+        self.ultimo = ahora
+
+
+class Metrics:
+    """Tiempos por etapa y contadores de una ejecución (seguro entre hilos).
+
+    Cada tiempo se acumula en total y, si el hilo está dentro de branch(url),
+    también en el desglose de esa sucursal.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.inicio = datetime.now()
+            self._inicio_perf = time.perf_counter()
+            self.etapas = {}
+            self.contadores = {}
+            self.sucursales = {}
+
+    def observe(self, nombre, segundos):
+        sucursal = getattr(self._local, 'sucursal', None)
+        with self._lock:
+            etapa = self.etapas.get(nombre)
+            if etapa is None:
+                etapa = self.etapas[nombre] = {'count': 0, 'total_s': 0.0, 'max_s': 0.0}
+            etapa['count'] += 1
+            etapa['total_s'] += segundos
+            etapa['max_s'] = max(etapa['max_s'], segundos)
+            if sucursal is not None:
+                desglose = self.sucursales.setdefault(sucursal, {})
+                desglose[nombre] = desglose.get(nombre, 0.0) + segundos
+
+    def incr(self, nombre, n=1):
+        with self._lock:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + n
+
+    @contextmanager
+    def timer(self, nombre):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(nombre, time.perf_counter() - inicio)
+
+    def timed(self, nombre):
+        """Decorador: registra la duración de cada llamada como la etapa `nombre`"""
+        def decorador(funcion):
+            @functools.wraps(funcion)
+            def envoltura(*args, **kwargs):
+                with self.timer(nombre):
+                    return funcion(*args, **kwargs)
+            return envoltura
+        return decorador
+
+    def stopwatch(self, prefijo):
+        return _Cronometro(self, prefijo)
+
+    @contextmanager
+    def branch(self, url):
+        """Atribuir a `url` los tiempos medidos en este hilo"""
+        anterior = getattr(self._local, 'sucursal', None)
+        self._local.sucursal = url
+        try:
+            yield
+        finally:
+            self._local.sucursal = anterior
+
+    def report(self):
+        with self._lock:
+            duracion = time.perf_counter() - self._inicio_perf
+            etapas = {
+                nombre: {
+                    'count': e['count'],
+                    'total_s': round(e['total_s'], 6),
+                    'mean_s': round(e['total_s'] / e['count'], 6),
+                    'max_s': round(e['max_s'], 6)
+                }
+                for nombre, e in sorted(self.etapas.items())
+            }
+            contadores = dict(sorted(self.contadores.items()))
+            sucursales = {
+                url: {nombre: round(segundos, 6) for nombre, segundos in sorted(desglose.items())}
+                for url, desglose in self.sucursales.items()
+            }
+        return {
+            'inicio': self.inicio.isoformat(timespec='seconds'),
+            'duracion_s': round(duracion, 3),
+            'etapas': etapas,
+            'contadores': contadores,
+            'por_segundo': {nombre: round(valor / duracion, 3) for nombre, valor in contadores.items()} if duracion else {},
+            'sucursales': sucursales
+        }
+
+    def write_json(self, ruta=None):
+        """Guardar el reporte de la ejecución; por defecto en metricas/run-<fecha>.json"""
+        if ruta is None:
+            ruta = os.path.join(METRICAS_DIR, f"run-{self.inicio:%Y%m%d-%H%M%S}.json")
+        carpeta = os.path.dirname(ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+        print(f"📈 Métricas guardadas en {ruta}")
+        return ruta
+
+    def write_prometheus(self, ruta):
+        """Formato de texto de Prometheus (para el textfile collector de node_exporter)"""
+        reporte = self.report()
+        lineas = [
+            '# HELP sanna_etapa_segundos Tiempo por etapa del scraping y del análisis',
+            '# TYPE sanna_etapa_segundos summary',
+        ]
+        for nombre, e in reporte['etapas'].items():
+            lineas.append(f'sanna_etapa_segundos_sum{{etapa="{nombre}"}} {e["total_s"]}')
+            lineas.append(f'sanna_etapa_segundos_count{{etapa="{nombre}"}} {e["count"]}')
+        lineas += ['# HELP sanna_etapa_segundos_max Duración máxima de una llamada', '# TYPE sanna_etapa_segundos_max gauge']
+        for nombre, e in reporte['etapas'].items():
+            lineas.append(f'sanna_etapa_segundos_max{{etapa="{nombre}"}} {e["max_s"]}')
+        lineas += ['# HELP sanna_total Contadores de la ejecución', '# TYPE sanna_total counter']
+        for nombre, valor in reporte['contadores'].items():
+            lineas.append(f'sanna_total{{contador="{nombre}"}} {valor}')
+        lineas += ['# HELP sanna_ejecucion_segundos Duración de la ejecución', '# TYPE sanna_ejecucion_segundos gauge',
+                   f'sanna_ejecucion_segundos {reporte["duracion_s"]}']
+
+        # Escritura atómica: el collector nunca lee un archivo a medio escribir
+        temporal = f"{ruta}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lineas) + '\n')
+        os.replace(temporal, ruta)
+        print(f"📈 Métricas Prometheus en {ruta}")
+        return ruta
+
+
+# Instancia compartida por el scraper, el escritor de BD y el analizador
+METRICS = Metrics()
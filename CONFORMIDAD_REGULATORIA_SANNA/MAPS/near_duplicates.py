@@ -0,0 +1,204 @@
+import re
+
+from normalizacion import normalizar_nombre, limpiar_review
+
+# MinHash de una sola permutación sobre 3-gramas de palabras: cada shingle se hashea una
+# vez (64 bits) y cae en una de CAJAS según sus bits bajos, y la firma guarda el mínimo de
+# cada caja. LSH con BANDAS x FILAS = CAJAS (umbral ~ (1/8)^(1/4) = 0.6): el umbral es bajo
+# a propósito, solo genera candidatos; la decisión la toma la comparación exacta de _similares.
+K_SHINGLE = 3
+BANDAS = 8
+FILAS = 4
+CAJAS = BANDAS * FILAS
+BITS_CAJA = 5
+VACIA = 1 << 64
+MASCARA_64 = VACIA - 1
+UMBRAL_JACCARD = 0.8
+UMBRAL_CONTENCION = 0.9
+RE_PALABRA = re.compile(r"\w+")
+SQL_REVIEWS_SUCURSAL = "SELECT id, autor, rating, texto, texto_normalizado FROM Reviews WHERE sucursal_id = ? ORDER BY id"
+
+
+def is_truncated(texto):
+    return bool(texto) and texto.rstrip().endswith(('…', '...'))
+
+
+def _shingles(palabras):
+    # hash() de Python está bien mezclado en los bits bajos; cambia entre procesos, pero las
+    # firmas solo viven en memoria durante una carga o una deduplicación
+    if len(palabras) < K_SHINGLE:
+        return {hash(tuple(palabras)) & MASCARA_64} if palabras else set()
+    return {hash(t) & MASCARA_64 for t in zip(palabras, palabras[1:], palabras[2:])}
+
+
+def minhash(shingles):
+    """Firma de CAJAS valores; las cajas vacías copian la siguiente no vacía más un
+    desplazamiento por la distancia (densificación por rotación), así textos cortos
+    siguen siendo comparables caja a caja."""
+    firma = [VACIA] * CAJAS
+    for h in shingles:
+        caja = h & (CAJAS - 1)
+        valor = h >> BITS_CAJA
+        if valor < firma[caja]:
+            firma[caja] = valor
+    if VACIA in firma and shingles:
+        original = list(firma)
+        for caja in range(CAJAS):
+            distancia = 1
+            while firma[caja] == VACIA:
+                siguiente = original[(caja + distancia) % CAJAS]
+                if siguiente != VACIA:
+                    firma[caja] = siguiente + (distancia << 59)
+                distancia += 1
+    return firma
+
+
+class _Entrada:
+    __slots__ = ('clave', 'autor', 'rating', 'palabras', 'shingles', 'truncado')
+
+    def __init__(self, clave, autor, rating, texto, normalizado=None):
+        self.clave = clave
+        self.autor = normalizar_nombre(autor or '')
+        self.rating = rating
+        self.palabras = RE_PALABRA.findall(normalizado if normalizado is not None else limpiar_review(texto))
+        self.shingles = _shingles(self.palabras)
+        self.truncado = is_truncated(texto)
+
+
+def _es_prefijo(cortado, completo):
+    # La última palabra antes de "…" puede estar incompleta ("ni…" de "ninguna")
+    n = len(cortado)
+    return (cortado[:n - 1] == completo[:n - 1]
+            and n <= len(completo) and completo[n - 1].startswith(cortado[-1]))
+
+
+def _similares(a, b):
+    if a.autor and b.autor and a.autor != b.autor:
+        return False
+    if not a.palabras or not b.palabras:
+        # Reseñas solo con estrellas: iguales si coinciden autor y rating
+        return not a.palabras and not b.palabras and bool(a.autor) and a.rating == b.rating
+    if a.truncado or b.truncado:
+        corto, largo = (a, b) if len(a.palabras) <= len(b.palabras) else (b, a)
+        if corto.truncado and _es_prefijo(corto.palabras, largo.palabras):
+            return True
+        return len(corto.shingles & largo.shingles) / len(corto.shingles) >= UMBRAL_CONTENCION
+    comunes = len(a.shingles & b.shingles)
+    return comunes / (len(a.shingles) + len(b.shingles) - comunes) >= UMBRAL_JACCARD
+
+
+class NearDuplicateIndex:
+    """Índice de casi-duplicados de las reseñas de una sucursal.
+
+    Los candidatos salen de las bandas LSH de la firma MinHash y de una clave por
+    autor + primera palabra, que encuentra las versiones cortadas con "…" aunque
+    compartan pocos shingles con el texto completo. Cada candidato se confirma con
+    Jaccard (o prefijo/contención si uno está cortado) y mismo autor.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+
+    def _claves_bucket(self, entrada):
+        claves = [('prefijo', entrada.autor, entrada.palabras[0] if entrada.palabras else '')]
+        if len(entrada.shingles) > 1:
+            firma = minhash(entrada.shingles)
+            claves.extend((n, tuple(firma[n * FILAS:(n + 1) * FILAS])) for n in range(BANDAS))
+        return claves
+
+    def _buscar(self, entrada, claves_bucket):
+        vistos = set()
+        for clave_bucket in claves_bucket:
+            for candidata in self.buckets.get(clave_bucket, ()):
+                if candidata.clave not in vistos:
+                    vistos.add(candidata.clave)
+                    if _similares(entrada, candidata):
+                        return candidata
+        return None
+
+    def find_or_add(self, clave, autor, rating, texto, normalizado=None):
+        """Clave de la reseña ya indexada que duplica a esta, o None (y esta queda indexada).
+
+        normalizado: limpiar_review(texto) si ya se calculó (Reviews.texto_normalizado).
+        """
+        entrada = _Entrada(clave, autor, rating, texto, normalizado)
+        claves_bucket = self._claves_bucket(entrada)
+        duplicada = self._buscar(entrada, claves_bucket)
+        if duplicada is not None:
+            return duplicada.clave
+        for clave_bucket in claves_bucket:
+            self.buckets.setdefault(clave_bucket, []).append(entrada)
+        return None
+
+
+def fuller(texto, otro):
+    """True si `texto` es una versión más completa que `otro` (no cortado, o más largo)"""
+    if is_truncated(texto) != is_truncated(otro):
+        return is_truncated(otro)
+    return len(texto or '') > len(otro or '')
+
+
+def branch_index(cursor, sucursal_id):
+    """NearDuplicateIndex con las reseñas ya guardadas de la sucursal y {id: texto}"""
+    cursor.execute(SQL_REVIEWS_SUCURSAL, (sucursal_id,))
+    indice = NearDuplicateIndex()
+    textos = {}
+    for review_id, autor, rating, texto, normalizado in cursor.fetchall():
+        textos[review_id] = texto
+        indice.find_or_add(review_id, autor, rating, texto, normalizado)
+    return indice, textos
+
+
+def dedup_reviews(connection, sucursal_id=None):
+    """Unir los casi-duplicados ya guardados: por grupo queda la reseña más antigua con el texto
+    más completo del grupo; las demás se borran (en cascada su análisis y tokens).
+
+    Si el texto de la que queda cambia, se borra su análisis para que se vuelva a analizar.
+    Retorna {sucursal_id: reseñas eliminadas} de las sucursales con cambios.
+    """
+    cursor = connection.cursor()
+    cursor.fast_executemany = True
+    if sucursal_id is None:
+        cursor.execute("SELECT DISTINCT sucursal_id FROM Reviews")
+        sucursales = [row[0] for row in cursor.fetchall()]
+    else:
+        sucursales = [sucursal_id]
+
+    eliminadas = {}
+    for sucursal in sucursales:
+        cursor.execute(SQL_REVIEWS_SUCURSAL, (sucursal,))
+        indice = NearDuplicateIndex()
+        textos = {}
+        grupos = {}
+        for review_id, autor, rating, texto, normalizado in cursor.fetchall():
+            textos[review_id] = texto
+            original = indice.find_or_add(review_id, autor, rating, texto, normalizado)
+            if original is not None:
+                grupos.setdefault(original, []).append(review_id)
+        if not grupos:
+            continue
+
+        borrar = [(review_id,) for duplicadas in grupos.values() for review_id in duplicadas]
+        actualizar = []
+        for original, duplicadas in grupos.items():
+            mejor = original
+            for review_id in duplicadas:
+                if fuller(textos[review_id], textos[mejor]):
+                    mejor = review_id
+            if mejor != original:
+                actualizar.append((textos[mejor], limpiar_review(textos[mejor]), original))
+        try:
+            cursor.executemany("DELETE FROM Reviews WHERE id = ?", borrar)
+            if actualizar:
+                cursor.executemany("UPDATE Reviews SET texto = ?, texto_normalizado = ? WHERE id = ?", actualizar)
+                cursor.executemany("DELETE FROM ReviewTokens WHERE review_id = ?", [(f[2],) for f in actualizar])
+                cursor.executemany("DELETE FROM AnalisisSentimientos WHERE review_id = ?", [(f[2],) for f in actualizar])
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        eliminadas[sucursal] = len(borrar)
+        print(f"🔁 Sucursal {sucursal}: {len(borrar)} reseñas duplicadas eliminadas, {len(actualizar)} textos completados")
+
+    print(f"✅ {sum(eliminadas.values())} reseñas duplicadas eliminadas en {len(eliminadas)} sucursales")
+    return eliminadas
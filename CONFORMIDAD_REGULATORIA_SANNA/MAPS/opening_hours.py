@@ -0,0 +1,190 @@
+import re
+import bisect
+from functools import lru_cache
+
+from records import Hours
+
+MINUTOS_DIA = 24 * 60
+MINUTOS_SEMANA = 7 * MINUTOS_DIA
+
+# Índice de día igual a datetime.weekday(): lunes = 0
+DIAS = {
+    'lunes': 0, 'martes': 1, 'miércoles': 2, 'miercoles': 2, 'jueves': 3,
+    'viernes': 4, 'sábado': 5, 'sabado': 5, 'domingo': 6,
+    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
+    'friday': 4, 'saturday': 5, 'sunday': 6,
+}
+
+# Google separa hora y meridiano con \u202f y 'a. m.' con \xa0 (ambos cuentan como \s)
+RE_ESPACIOS = re.compile(r"\s+")
+RE_RANGO = re.compile(
+    r"(\d{1,2})(?::(\d{2}))?\s*(a\.?\s*m\.?|p\.?\s*m\.?)?\s*[–—-]\s*"
+    r"(\d{1,2})(?::(\d{2}))?\s*(a\.?\s*m\.?|p\.?\s*m\.?)?"
+)
+
+
+def _minuto(hora, minutos, meridiano):
+    hora = int(hora) % 24
+    if meridiano is not None:
+        hora = hora % 12 + (12 if meridiano == 'p' else 0)
+    return hora * 60 + int(minutos or 0)
+
+
+@lru_cache(maxsize=512)
+def parse_hours(texto):
+    """Tramos (inicio, fin) en minutos desde las 0:00 de un texto de horario de Google.
+
+    'Cerrado' -> (), 'Abierto las 24 horas' -> ((0, 1440),),
+    '8 a. m.–1 p. m., 3–8 p. m.' -> ((480, 780), (900, 1200)).
+    Un tramo que pasa la medianoche termina después de 1440. None si no se reconoce.
+    """
+    if not texto:
+        return None
+    limpio = RE_ESPACIOS.sub(' ', texto).strip().lower()
+    if 'cerrado' in limpio or 'closed' in limpio:
+        return ()
+    if '24 horas' in limpio or '24 hours' in limpio:
+        return ((0, MINUTOS_DIA),)
+
+    tramos = []
+    for h1, m1, mer1, h2, m2, mer2 in RE_RANGO.findall(limpio):
+        mer1 = mer1[:1] or None
+        mer2 = mer2[:1] or None
+        fin = _minuto(h2, m2, mer2)
+        # "3–8 p. m.": el inicio sin meridiano toma el del final, salvo que quede después de él
+        inicio = _minuto(h1, m1, mer1 or mer2)
+        if mer1 is None and mer2 is not None and inicio > fin:
+            inicio = _minuto(h1, m1, 'a')
+        if fin <= inicio:
+            fin += MINUTOS_DIA
+        tramos.append((inicio, fin))
+    return tuple(tramos) if tramos else None
+
+
+def week_intervals(horarios):
+    """Intervalos [inicio, fin) en minutos de la semana a partir de [Hours].
+
+    Los tramos que cruzan la medianoche del domingo se parten en dos; los que se
+    superponen (p. ej. 24 horas seguidas) se unen.
+    """
+    intervalos = []
+    for horario in horarios:
+        dia = DIAS.get(RE_ESPACIOS.sub(' ', horario.dia).strip().lower())
+        tramos = parse_hours(horario.horas)
+        if dia is None or not tramos:
+            continue
+        for inicio, fin in tramos:
+            inicio += dia * MINUTOS_DIA
+            fin += dia * MINUTOS_DIA
+            if fin > MINUTOS_SEMANA:
+                intervalos.append((0, fin - MINUTOS_SEMANA))
+                fin = MINUTOS_SEMANA
+            intervalos.append((inicio, fin))
+
+    unidos = []
+    for inicio, fin in sorted(intervalos):
+        if unidos and inicio <= unidos[-1][1]:
+            unidos[-1] = (unidos[-1][0], max(unidos[-1][1], fin))
+        else:
+            unidos.append((inicio, fin))
+    return unidos
+
+
+def minute_of_week(fecha):
+    return fecha.weekday() * MINUTOS_DIA + fecha.hour * 60 + fecha.minute
+
+
+class OpeningHoursIndex:
+    """Índice en memoria de los intervalos de atención de todas las sucursales.
+
+    La semana se parte en los segmentos entre bordes de intervalos y cada segmento
+    guarda el conjunto de sucursales abiertas; una consulta es una búsqueda binaria.
+    """
+
+    def __init__(self, intervalos):
+        """intervalos: iterable de (sucursal_id, minuto_inicio, minuto_fin)"""
+        intervalos = list(intervalos)
+        bordes = sorted({0, MINUTOS_SEMANA} | {m for _, i, f in intervalos for m in (i, f)})
+        self.bordes = bordes
+        self.sucursales = frozenset(s for s, _, _ in intervalos)
+        abiertas = [set() for _ in bordes]
+        for sucursal_id, inicio, fin in intervalos:
+            for n in range(bisect.bisect_left(bordes, inicio), bisect.bisect_left(bordes, fin)):
+                abiertas[n].add(sucursal_id)
+        self.abiertas = [frozenset(s) for s in abiertas]
+
+    @classmethod
+    def from_db(cls, connection):
+        cursor = connection.cursor()
+        cursor.execute("SELECT sucursal_id, minuto_inicio, minuto_fin FROM HorariosIntervalos")
+        return cls((row[0], row[1], row[2]) for row in cursor.fetchall())
+
+    def _segmento(self, minuto):
+        return bisect.bisect_right(self.bordes, minuto % MINUTOS_SEMANA) - 1
+
+    def open_at(self, minuto):
+        """Sucursales abiertas en el minuto de la semana indicado (ver minute_of_week)"""
+        return self.abiertas[self._segmento(minuto)]
+
+    def open_during(self, inicio, fin, completo=False):
+        """Sucursales abiertas en algún momento de [inicio, fin), o durante todo el rango.
+
+        Los rangos pueden cruzar el fin de semana (domingo 23:00 a lunes 01:00).
+        """
+        largo = fin - inicio
+        if largo >= MINUTOS_SEMANA:
+            tramos = [(0, MINUTOS_SEMANA)]
+        else:
+            inicio %= MINUTOS_SEMANA
+            fin = inicio + largo
+            tramos = [(inicio, min(fin, MINUTOS_SEMANA))]
+            if fin > MINUTOS_SEMANA:
+                tramos.append((0, fin - MINUTOS_SEMANA))
+
+        resultado = None
+        for a, b in tramos:
+            if b <= a:
+                continue
+            for segmento in self.abiertas[self._segmento(a):bisect.bisect_left(self.bordes, b)]:
+                if resultado is None:
+                    resultado = set(segmento)
+                elif completo:
+                    resultado &= segmento
+                else:
+                    resultado |= segmento
+        return frozenset(resultado or ())
+
+
+def rebuild_intervals(connection):
+    """Regenerar HorariosIntervalos desde el último horario guardado de cada sucursal y día"""
+    cursor = connection.cursor()
+    cursor.fast_executemany = True
+    cursor.execute("""
+    SELECT h.sucursal_id, h.dia_semana, h.horas, h.esta_cerrado
+    FROM Horarios h
+    INNER JOIN (
+        SELECT MAX(id) as id FROM Horarios GROUP BY sucursal_id, dia_semana
+    ) ultimo ON ultimo.id = h.id
+    """)
+    por_sucursal = {}
+    for sucursal_id, dia, horas, esta_cerrado in cursor.fetchall():
+        por_sucursal.setdefault(sucursal_id, []).append(Hours(dia, horas, bool(esta_cerrado)))
+
+    filas = [
+        (sucursal_id, inicio, fin)
+        for sucursal_id, horarios in por_sucursal.items()
+        for inicio, fin in week_intervals(horarios)
+    ]
+    try:
+        cursor.execute("DELETE FROM HorariosIntervalos")
+        if filas:
+            cursor.executemany(
+                "INSERT INTO HorariosIntervalos (sucursal_id, minuto_inicio, minuto_fin) VALUES (?, ?, ?)",
+                filas
+            )
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    print(f"✅ {len(filas)} intervalos de atención para {len(por_sucursal)} sucursales")
+    return len(filas)
@@ -0,0 +1,165 @@
+import re
+import sqlite3
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from job_queue import JOBS_DB
+
+# Enlaces cortos de Google Maps (maps.app.goo.gl/...) resueltos una sola vez.
+# El destino es una URL /maps/place/<nombre>/@lat,lon,17z/data=...!1s0x...:0x...!3dLAT!4dLON...:
+# '!1s0x..:0x..' identifica el lugar (igual para dos enlaces cortos del mismo lugar) y
+# '!3d/!4d' son sus coordenadas ('/@' es el centro del mapa, solo si faltan las otras).
+HOSTS_CORTOS = ('maps.app.goo.gl', 'goo.gl')
+RE_ID_LUGAR = re.compile(r"!1s(0x[0-9a-f]+:0x[0-9a-f]+)", re.IGNORECASE)
+RE_PLACE_ID = re.compile(r"place_id:([\w-]+)")
+RE_COORDENADAS = re.compile(r"!3d(-?\d+(?:\.\d+)?)!4d(-?\d+(?:\.\d+)?)")
+RE_CENTRO = re.compile(r"/@(-?\d+(?:\.\d+)?),(-?\d+(?:\.\d+)?)")
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+MAX_REDIRECCIONES = 5
+
+
+def _es_corto(url):
+    return urllib.parse.urlsplit(url).hostname in HOSTS_CORTOS
+
+
+def parse_place_url(url):
+    """(url_canonica, id_lugar, latitud, longitud) de una URL de lugar de Google Maps.
+
+    La URL canónica es la misma sin query (?entry=ttu&g_ep=... cambian en cada enlace);
+    id_lugar, latitud y longitud son None si no aparecen.
+    """
+    partes = urllib.parse.urlsplit(url)
+    if partes.hostname and partes.hostname.startswith('consent.'):
+        # Página de consentimiento de cookies: el destino real va en ?continue=
+        continuar = urllib.parse.parse_qs(partes.query).get('continue')
+        if continuar:
+            return parse_place_url(continuar[0])
+    texto = urllib.parse.unquote(url)
+    id_lugar = RE_ID_LUGAR.search(texto) or RE_PLACE_ID.search(texto)
+    coordenadas = RE_COORDENADAS.search(texto) or RE_CENTRO.search(texto)
+    canonica = urllib.parse.urlunsplit((partes.scheme, partes.netloc, partes.path, '', ''))
+    return (
+        canonica,
+        id_lugar.group(1).lower() if id_lugar else None,
+        float(coordenadas.group(1)) if coordenadas else None,
+        float(coordenadas.group(2)) if coordenadas else None
+    )
+
+
+class _SinSeguir(urllib.request.HTTPRedirectHandler):
+    # Cada redirección se devuelve como HTTPError para leer su Location sin descargar la página
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_abridor = urllib.request.build_opener(_SinSeguir)
+
+
+def follow_short_link(url, timeout=15):
+    """URL de destino de un enlace corto, siguiendo solo las redirecciones de los hosts cortos"""
+    actual = url
+    for _ in range(MAX_REDIRECCIONES):
+        if not _es_corto(actual):
+            return actual
+        peticion = urllib.request.Request(actual, headers={'User-Agent': USER_AGENT})
+        try:
+            with _abridor.open(peticion, timeout=timeout):
+                return actual
+        except urllib.error.HTTPError as e:
+            destino = e.headers.get('Location') if 300 <= e.code < 400 else None
+            if not destino:
+                raise
+            actual = urllib.parse.urljoin(actual, destino)
+    raise ValueError(f"Demasiadas redirecciones desde {url}")
+
+
+class PlaceCache:
+    """Caché local (SQLite, junto a la cola de trabajos) de enlaces resueltos.
+
+    Por URL guarda la URL canónica, el id del lugar y sus coordenadas; un enlace se
+    resuelve por red solo la primera vez. Los fallos no se guardan: se reintentan en la
+    próxima ejecución y mientras tanto se scrapea la URL original.
+    """
+
+    def __init__(self, path=JOBS_DB, resolver=follow_short_link):
+        self.resolver = resolver
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS lugares (
+                url TEXT PRIMARY KEY,
+                url_canonica TEXT NOT NULL,
+                id_lugar TEXT,
+                latitud REAL,
+                longitud REAL,
+                fecha_resolucion TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ix_lugares_id ON lugares(id_lugar)")
+
+    def _execute(self, query, params=()):
+        with self._lock:
+            return self.conn.execute(query, params).fetchall()
+
+    def get(self, url):
+        rows = self._execute("SELECT * FROM lugares WHERE url = ?", (url,))
+        return dict(rows[0]) if rows else None
+
+    def resolve(self, url):
+        """Fila de la caché para la URL (resolviéndola si hace falta), o None si no se pudo"""
+        lugar = self.get(url)
+        if lugar is not None:
+            return lugar
+        try:
+            destino = self.resolver(url) if _es_corto(url) else url
+        except Exception as e:
+            print(f"⚠️ No se pudo resolver {url}: {str(e)}")
+            return None
+        canonica, id_lugar, latitud, longitud = parse_place_url(destino)
+        lugar = {'url': url, 'url_canonica': canonica, 'id_lugar': id_lugar, 'latitud': latitud,
+                 'longitud': longitud, 'fecha_resolucion': datetime.now().isoformat(timespec='seconds')}
+        self._execute("""
+            INSERT OR REPLACE INTO lugares (url, url_canonica, id_lugar, latitud, longitud, fecha_resolucion)
+            VALUES (:url, :url_canonica, :id_lugar, :latitud, :longitud, :fecha_resolucion)
+        """, lugar)
+        return lugar
+
+    def resolve_all(self, urls, workers=8):
+        """{url: lugar o None}; solo las URLs que no están en la caché salen a la red"""
+        lugares = {url: self.get(url) for url in urls}
+        faltan = [url for url, lugar in lugares.items() if lugar is None]
+        if faltan:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                lugares.update(zip(faltan, executor.map(self.resolve, faltan)))
+        return lugares
+
+    def close(self):
+        self.conn.close()
+
+
+def dedupe_by_place(urls, lugares):
+    """(urls únicas, [(url descartada, url que se conserva)]) según el id del lugar.
+
+    Se conserva la primera URL de cada lugar (su Sucursales.url no cambia); las URLs sin
+    id conocido se mantienen todas.
+    """
+    unicas = []
+    duplicadas = []
+    primera = {}
+    for url in urls:
+        lugar = lugares.get(url)
+        id_lugar = lugar['id_lugar'] if lugar else None
+        if id_lugar is None:
+            unicas.append(url)
+        elif id_lugar in primera:
+            duplicadas.append((url, primera[id_lugar]))
+        else:
+            primera[id_lugar] = url
+            unicas.append(url)
+    return unicas, duplicadas
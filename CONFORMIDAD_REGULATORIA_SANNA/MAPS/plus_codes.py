@@ -0,0 +1,318 @@
+import re
+import math
+import heapq
+from functools import lru_cache
+
+from normalizacion import normalizar, normalizar_nombre
+
+# Plus Codes (Open Location Code) sin red: Google muestra en `referencia` un código corto
+# ("W25X+WQ La Molina") al que le faltan los 4 primeros caracteres; se recuperan con el punto
+# de referencia de la localidad (basta con estar a menos de ~50 km del lugar real).
+ALFABETO = "23456789CFGHJMPQRVWX"
+VALOR = {c: i for i, c in enumerate(ALFABETO)}
+SEPARADOR = '+'
+POSICION_SEPARADOR = 8
+LARGO_PARES = 10
+FILAS_GRILLA = 5
+COLUMNAS_GRILLA = 4
+RE_REFERENCIA = re.compile(r"^\s*([23456789CFGHJMPQRVWX0]{2,8}\+[23456789CFGHJMPQRVWX]*)\s*(.*)$", re.IGNORECASE)
+
+RADIO_TIERRA_KM = 6371.0088
+
+# Centro aproximado de las localidades donde hay (o puede haber) sedes
+LOCALIDADES = {
+    'lima': (-12.0464, -77.0428),
+    'los olivos': (-11.9700, -77.0700),
+    'san martin de porres': (-12.0000, -77.0700),
+    'independencia': (-11.9900, -77.0500),
+    'comas': (-11.9300, -77.0500),
+    'carabayllo': (-11.8600, -77.0300),
+    'puente piedra': (-11.8700, -77.0800),
+    'san juan de lurigancho': (-11.9800, -77.0000),
+    'rimac': (-12.0300, -77.0300),
+    'brena': (-12.0600, -77.0500),
+    'jesus maria': (-12.0700, -77.0400),
+    'lince': (-12.0800, -77.0300),
+    'pueblo libre': (-12.0700, -77.0600),
+    'magdalena del mar': (-12.0900, -77.0700),
+    'san miguel': (-12.0800, -77.0900),
+    'callao': (-12.0500, -77.1200),
+    'san isidro': (-12.1000, -77.0400),
+    'miraflores': (-12.1200, -77.0300),
+    'surquillo': (-12.1100, -77.0200),
+    'barranco': (-12.1500, -77.0200),
+    'chorrillos': (-12.1700, -77.0200),
+    'santiago de surco': (-12.1400, -76.9900),
+    'surco': (-12.1400, -76.9900),
+    'la victoria': (-12.0700, -77.0200),
+    'san borja': (-12.1000, -76.9900),
+    'san luis': (-12.0800, -76.9900),
+    'la molina': (-12.0800, -76.9400),
+    'ate': (-12.0300, -76.9200),
+    'santa anita': (-12.0400, -76.9700),
+    'san juan de miraflores': (-12.1600, -76.9700),
+    'villa maria del triunfo': (-12.1600, -76.9400),
+    'villa el salvador': (-12.2100, -76.9400),
+    'pachacamac': (-12.2300, -76.8600),
+    'lurin': (-12.2700, -76.8700),
+    'punta hermosa': (-12.3300, -76.8200),
+    'trujillo': (-8.1100, -79.0300),
+    'victor larco herrera': (-8.1400, -79.0500),
+    'chiclayo': (-6.7700, -79.8400),
+    'piura': (-5.1900, -80.6300),
+    'talara': (-4.5800, -81.2700),
+    'cajamarca': (-7.1600, -78.5100),
+    'chimbote': (-9.0700, -78.5900),
+    'arequipa': (-16.4000, -71.5400),
+    'cusco': (-13.5300, -71.9700),
+    'ica': (-14.0700, -75.7300),
+    'huancayo': (-12.0700, -75.2100),
+}
+
+
+def _resolucion_par(n):
+    # Grados que cubre un dígito del par n (0: 20°, 1: 1°, 2: 0.05°, ...)
+    return 20.0 / 20 ** n
+
+
+def decode(codigo):
+    """Centro (lat, lon) de un Plus Code completo ('57R8W25X+WQ'); None si no es válido"""
+    codigo = codigo.upper()
+    if codigo.find(SEPARADOR) != POSICION_SEPARADOR or codigo.count(SEPARADOR) != 1:
+        return None
+    digitos = codigo.replace(SEPARADOR, '').rstrip('0')
+    if len(digitos) < 2 or any(c not in VALOR for c in digitos):
+        return None
+    lat, lon = -90.0, -180.0
+    pares = digitos[:LARGO_PARES]
+    for n in range(0, len(pares) - 1, 2):
+        resolucion = _resolucion_par(n // 2)
+        lat += VALOR[pares[n]] * resolucion
+        lon += VALOR[pares[n + 1]] * resolucion
+    alto = ancho = _resolucion_par(len(pares) // 2 - 1)
+    for c in digitos[LARGO_PARES:]:
+        alto /= FILAS_GRILLA
+        ancho /= COLUMNAS_GRILLA
+        fila, columna = divmod(VALOR[c], COLUMNAS_GRILLA)
+        lat += fila * alto
+        lon += columna * ancho
+    return (lat + alto / 2, lon + ancho / 2)
+
+
+def _prefijo(lat, lon, largo):
+    """Primeros `largo` dígitos (par) del Plus Code de un punto"""
+    lat = min(max(lat, -90.0), 90.0 - 1e-9) + 90.0
+    lon = (lon + 180.0) % 360.0
+    codigo = []
+    for n in range(largo // 2):
+        resolucion = _resolucion_par(n)
+        digito_lat, lat = divmod(lat, resolucion)
+        digito_lon, lon = divmod(lon, resolucion)
+        codigo.append(ALFABETO[int(digito_lat)] + ALFABETO[int(digito_lon)])
+    return ''.join(codigo)
+
+
+def recover_nearest(corto, lat_referencia, lon_referencia):
+    """Centro (lat, lon) de un Plus Code corto ('W25X+WQ') tomando la celda más cercana a la referencia"""
+    corto = corto.upper()
+    faltan = POSICION_SEPARADOR - corto.find(SEPARADOR)
+    if faltan <= 0:
+        return decode(corto)
+    if faltan % 2:
+        return None
+    centro = decode(_prefijo(lat_referencia, lon_referencia, faltan) + corto)
+    if centro is None:
+        return None
+    lat, lon = centro
+    # El prefijo de la referencia puede caer en la celda vecina: se corrige hacia la más cercana
+    resolucion = _resolucion_par(faltan // 2 - 1)
+    mitad = resolucion / 2
+    if lat_referencia + mitad < lat and lat - resolucion >= -90:
+        lat -= resolucion
+    elif lat_referencia - mitad > lat and lat + resolucion <= 90:
+        lat += resolucion
+    if lon_referencia + mitad < lon:
+        lon -= resolucion
+    elif lon_referencia - mitad > lon:
+        lon += resolucion
+    return (lat, (lon + 180.0) % 360.0 - 180.0)
+
+
+def _localidad_en(texto):
+    # Localidad conocida más larga que aparece en el texto ("San Juan de Miraflores" antes que "Miraflores")
+    palabras = f" {normalizar(texto)} "
+    for nombre in sorted(LOCALIDADES, key=len, reverse=True):
+        if f" {nombre} " in palabras:
+            return LOCALIDADES[nombre]
+    return None
+
+
+@lru_cache(maxsize=4096)
+def decode_reference(referencia, ubicacion=None):
+    """(lat, lon) de la `referencia` de una sucursal ('W25X+WQ La Molina'), o None.
+
+    Los códigos cortos se resuelven con la localidad escrita junto al código o, si no
+    se conoce, con la que aparezca en la dirección (`ubicacion`).
+    """
+    match = RE_REFERENCIA.match(referencia or '')
+    if not match:
+        return None
+    codigo, localidad = match.groups()
+    if codigo.find(SEPARADOR) == POSICION_SEPARADOR:
+        return decode(codigo)
+    punto = LOCALIDADES.get(normalizar_nombre(localidad)) if localidad else None
+    if punto is None:
+        punto = _localidad_en(localidad) if localidad else None
+    if punto is None and ubicacion:
+        punto = _localidad_en(ubicacion)
+    if punto is None:
+        return None
+    return recover_nearest(codigo, *punto)
+
+
+def _vector(lat, lon):
+    # Punto en la esfera unitaria: la distancia euclídea (cuerda) ordena igual que la del círculo máximo
+    lat, lon = math.radians(lat), math.radians(lon)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+
+def _cuerda(radio_km):
+    return 2 * math.sin(min(radio_km / RADIO_TIERRA_KM, math.pi) / 2)
+
+
+def _km(cuerda2):
+    return 2 * RADIO_TIERRA_KM * math.asin(min(1.0, math.sqrt(cuerda2) / 2))
+
+
+class BranchLocationIndex:
+    """Índice en memoria (KD-tree sobre la esfera) de la ubicación de las sucursales.
+
+    Cada sucursal es un punto 3D en la esfera unitaria; el árbol parte por la mediana de
+    x, y, z alternadamente y las consultas descartan las ramas más lejanas que el peor
+    resultado (nearest) o que el radio (within). Las distancias salen en km.
+    """
+
+    def __init__(self, ubicaciones):
+        """ubicaciones: iterable de (sucursal_id, latitud, longitud)"""
+        self.puntos = [(s, _vector(float(lat), float(lon))) for s, lat, lon in ubicaciones
+                       if lat is not None and lon is not None]
+        self.raiz = self._construir(list(range(len(self.puntos))), 0)
+
+    def _construir(self, indices, eje):
+        if not indices:
+            return None
+        indices.sort(key=lambda i: self.puntos[i][1][eje])
+        medio = len(indices) // 2
+        siguiente = (eje + 1) % 3
+        return (indices[medio], eje,
+                self._construir(indices[:medio], siguiente),
+                self._construir(indices[medio + 1:], siguiente))
+
+    @classmethod
+    def from_db(cls, connection):
+        cursor = connection.cursor()
+        cursor.execute("SELECT id, latitud, longitud FROM Sucursales WHERE latitud IS NOT NULL AND longitud IS NOT NULL")
+        return cls((row[0], row[1], row[2]) for row in cursor.fetchall())
+
+    def __len__(self):
+        return len(self.puntos)
+
+    def nearest(self, lat, lon, n=1):
+        """Las n sucursales más cercanas: [(sucursal_id, km)] de la más cercana a la más lejana"""
+        if n <= 0:
+            return []
+        consulta = _vector(lat, lon)
+        mejores = []  # heap de (-distancia², índice): el peor resultado queda arriba
+
+        def visitar(nodo):
+            if nodo is None:
+                return
+            indice, eje, izquierda, derecha = nodo
+            punto = self.puntos[indice][1]
+            d2 = sum((a - b) ** 2 for a, b in zip(punto, consulta))
+            if len(mejores) < n:
+                heapq.heappush(mejores, (-d2, indice))
+            elif d2 < -mejores[0][0]:
+                heapq.heapreplace(mejores, (-d2, indice))
+            diferencia = consulta[eje] - punto[eje]
+            cerca, lejos = (izquierda, derecha) if diferencia < 0 else (derecha, izquierda)
+            visitar(cerca)
+            if len(mejores) < n or diferencia * diferencia < -mejores[0][0]:
+                visitar(lejos)
+
+        visitar(self.raiz)
+        return [(self.puntos[i][0], _km(-d2)) for d2, i in sorted(mejores, reverse=True)]
+
+    def within(self, lat, lon, radio_km):
+        """Sucursales a radio_km o menos: [(sucursal_id, km)] de la más cercana a la más lejana"""
+        consulta = _vector(lat, lon)
+        limite = _cuerda(radio_km) ** 2
+        encontradas = []
+        pendientes = [self.raiz]
+        while pendientes:
+            nodo = pendientes.pop()
+            if nodo is None:
+                continue
+            indice, eje, izquierda, derecha = nodo
+            punto = self.puntos[indice][1]
+            d2 = sum((a - b) ** 2 for a, b in zip(punto, consulta))
+            if d2 <= limite:
+                encontradas.append((d2, self.puntos[indice][0]))
+            diferencia = consulta[eje] - punto[eje]
+            pendientes.append(izquierda if diferencia < 0 else derecha)
+            if diferencia * diferencia <= limite:
+                pendientes.append(derecha if diferencia < 0 else izquierda)
+        return [(s, _km(d2)) for d2, s in sorted(encontradas)]
+
+
+def nearest_branches(connection, lat, lon, n=5):
+    """Las n sucursales más cercanas según la columna geography (índice espacial, migración 0009).
+
+    [{'id', 'nombre', 'km'}]
+    """
+    cursor = connection.cursor()
+    cursor.execute("""
+    DECLARE @punto GEOGRAPHY = geography::Point(?, ?, 4326);
+    SELECT TOP (?) id, nombre, geo.STDistance(@punto) / 1000.0
+    FROM Sucursales
+    WHERE geo IS NOT NULL
+    ORDER BY geo.STDistance(@punto)
+    """, (lat, lon, n))
+    return [{'id': row[0], 'nombre': row[1], 'km': row[2]} for row in cursor.fetchall()]
+
+
+def branches_within(connection, lat, lon, radio_km):
+    """Sucursales a radio_km o menos según la columna geography: [{'id', 'nombre', 'km'}]"""
+    cursor = connection.cursor()
+    cursor.execute("""
+    DECLARE @punto GEOGRAPHY = geography::Point(?, ?, 4326);
+    SELECT id, nombre, geo.STDistance(@punto) / 1000.0
+    FROM Sucursales
+    WHERE geo.STDistance(@punto) <= ?
+    ORDER BY geo.STDistance(@punto)
+    """, (lat, lon, radio_km * 1000))
+    return [{'id': row[0], 'nombre': row[1], 'km': row[2]} for row in cursor.fetchall()]
+
+
+def rebuild_locations(connection):
+    """Completar latitud/longitud de las sucursales desde su referencia (Plus Code)"""
+    cursor = connection.cursor()
+    cursor.fast_executemany = True
+    cursor.execute("SELECT id, referencia, ubicacion FROM Sucursales")
+    filas = []
+    sin_ubicacion = 0
+    for sucursal_id, referencia, ubicacion in cursor.fetchall():
+        punto = decode_reference(referencia, ubicacion)
+        if punto is None:
+            sin_ubicacion += 1
+            continue
+        filas.append((round(punto[0], 6), round(punto[1], 6), sucursal_id))
+    try:
+        if filas:
+            cursor.executemany("UPDATE Sucursales SET latitud = ?, longitud = ? WHERE id = ?", filas)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    print(f"✅ {len(filas)} sucursales ubicadas, {sin_ubicacion} sin Plus Code reconocible")
+    return len(filas)
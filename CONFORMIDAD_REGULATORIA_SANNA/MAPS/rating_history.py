@@ -0,0 +1,99 @@
+from datetime import datetime
+
+# Calificaciones solo por cambio e historial compacto en tramos (migración 0008).
+# rating_global es DECIMAL(3,2) en la BD (pyodbc devuelve Decimal) y float al scrapear:
+# se comparan redondeados a 2 decimales.
+SQL_VIGENTE = """
+SELECT id, rating_global, total_reviews, valid_from
+FROM HistorialCalificaciones
+WHERE sucursal_id = ? AND valid_to IS NULL
+"""
+
+
+def _rating(valor):
+    return None if valor is None else round(float(valor), 2)
+
+
+def record_rating(cursor, sucursal_id, rating_global, total_reviews, fecha=None):
+    """Registrar una observación de la calificación de una sucursal, sin commit.
+
+    Si coincide con el tramo vigente solo se actualiza su ultima_verificacion; si cambió,
+    se cierra el tramo (valid_to = fecha), se abre otro y se inserta la fila en Calificaciones.
+    Una observación anterior al tramo vigente (recargar un snapshot viejo) no cambia nada.
+    Retorna True si se escribió un valor nuevo.
+    """
+    fecha = (fecha or datetime.now()).replace(microsecond=0)
+    cursor.execute(SQL_VIGENTE, (sucursal_id,))
+    vigente = cursor.fetchone()
+    if vigente is not None:
+        tramo_id, rating_vigente, total_vigente, valid_from = vigente
+        if fecha < valid_from:
+            return False
+        if _rating(rating_vigente) == _rating(rating_global) and total_vigente == total_reviews:
+            cursor.execute("""
+            UPDATE HistorialCalificaciones SET ultima_verificacion = ?
+            WHERE id = ? AND ultima_verificacion < ?
+            """, (fecha, tramo_id, fecha))
+            return False
+        cursor.execute("UPDATE HistorialCalificaciones SET valid_to = ? WHERE id = ?", (fecha, tramo_id))
+
+    cursor.execute("""
+    INSERT INTO HistorialCalificaciones (sucursal_id, rating_global, total_reviews, valid_from, ultima_verificacion)
+    VALUES (?, ?, ?, ?, ?)
+    """, (sucursal_id, rating_global, total_reviews, fecha, fecha))
+    cursor.execute("""
+    INSERT INTO Calificaciones (sucursal_id, rating_global, total_reviews, fecha_calificacion)
+    VALUES (?, ?, ?, ?)
+    """, (sucursal_id, rating_global, total_reviews, fecha))
+    return True
+
+
+def rating_trend(connection, sucursal_id=None, desde=None):
+    """Serie compacta de calificaciones por sucursal con el cambio respecto del tramo anterior.
+
+    {sucursal_id: {'nombre', 'tramos': [{'valid_from', 'valid_to', 'rating', 'total',
+    'delta_rating', 'delta_total'}], 'delta_rating', 'delta_total'}}
+    Con `desde` solo quedan los tramos vigentes en o después de esa fecha (el primero conserva
+    su delta contra el anterior). Los deltas de la sucursal van del primer al último tramo
+    devuelto (None si hay uno solo).
+    """
+    filtro = "WHERE h.sucursal_id = ?" if sucursal_id is not None else ""
+    cursor = connection.cursor()
+    cursor.execute(f"""
+    SELECT h.sucursal_id, s.nombre, h.valid_from, h.valid_to, h.rating_global, h.total_reviews
+    FROM HistorialCalificaciones h
+    INNER JOIN Sucursales s ON s.id = h.sucursal_id
+    {filtro}
+    ORDER BY h.sucursal_id, h.valid_from
+    """, (sucursal_id,) if sucursal_id is not None else ())
+
+    series = {}
+    anterior = None
+    for sucursal, nombre, valid_from, valid_to, rating, total in cursor.fetchall():
+        if anterior is None or anterior[0] != sucursal:
+            anterior = (sucursal, None, None)
+        rating = _rating(rating)
+        tramo = {
+            'valid_from': valid_from,
+            'valid_to': valid_to,
+            'rating': rating,
+            'total': total,
+            'delta_rating': _delta(rating, anterior[1]),
+            'delta_total': _delta(total, anterior[2])
+        }
+        anterior = (sucursal, rating, total)
+        if desde is None or valid_to is None or valid_to > desde:
+            series.setdefault(sucursal, {'nombre': nombre, 'tramos': []})['tramos'].append(tramo)
+
+    for serie in series.values():
+        primero, ultimo = serie['tramos'][0], serie['tramos'][-1]
+        serie['delta_rating'] = _delta(ultimo['rating'], primero['rating']) if len(serie['tramos']) > 1 else None
+        serie['delta_total'] = _delta(ultimo['total'], primero['total']) if len(serie['tramos']) > 1 else None
+    return series
+
+
+def _delta(actual, previo):
+    if actual is None or previo is None:
+        return None
+    # Los ratings son float redondeados a 2 decimales: 4.6 - 4.5 no debe quedar en 0.0999...
+    return round(actual - previo, 2) if isinstance(actual, float) else actual - previo
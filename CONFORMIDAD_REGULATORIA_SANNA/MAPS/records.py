@@ -0,0 +1,121 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+
+# Registros tipados del scraping. Los valores se convierten una sola vez al extraer
+# ("5" -> 5, "4,6" -> 4.6) y el escritor de BD y los snapshots los leen tal cual.
+# __slots__: sin __dict__ por instancia (con 1000 reseñas por sucursal es lo que más pesa).
+# Los atributos usan las mismas claves que el JSON de scrape_google_maps (info-N.json).
+
+
+def parse_int(valor, defecto=None):
+    if isinstance(valor, int):
+        return valor
+    return int(valor) if valor and str(valor).isdigit() else defecto
+
+
+def parse_float(valor):
+    try:
+        return float(str(valor).replace(',', '.')) if valor else None
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class Hours:
+    __slots__ = ('dia', 'horas', 'esta_cerrado')
+    dia: str
+    horas: str
+    esta_cerrado: bool
+
+    @classmethod
+    def from_dict(cls, horario):
+        return cls(horario['dia'], horario['horas'], 'cerrado' in horario['horas'].lower())
+
+    def as_dict(self):
+        return {'dia': self.dia, 'horas': self.horas}
+
+
+@dataclass
+class Review:
+    __slots__ = ('author', 'rating', 'date', 'text', 'photos', 'likes')
+    author: Optional[str]
+    rating: Optional[int]
+    date: Optional[str]
+    text: str
+    photos: int
+    likes: int
+
+    @classmethod
+    def from_dict(cls, review):
+        return cls(
+            review.get('author'),
+            parse_int(review.get('rating')),
+            review.get('date'),
+            review.get('text') or '',
+            parse_int(review.get('photos'), 0),
+            parse_int(review.get('likes'), 0)
+        )
+
+    def as_dict(self):
+        # Misma forma que los info-N.json existentes (rating y likes como texto)
+        return {
+            'author': self.author,
+            'rating': '' if self.rating is None else str(self.rating),
+            'date': self.date,
+            'text': self.text,
+            'photos': self.photos,
+            'likes': str(self.likes)
+        }
+
+
+@dataclass
+class Branch:
+    __slots__ = ('url', 'nombre', 'ubicacion', 'rating_global', 'total_reviews',
+                 'sitio_web', 'telefono', 'referencia', 'horarios', 'reviews', 'fecha_extraccion')
+    url: str
+    nombre: Optional[str]
+    ubicacion: Optional[str]
+    rating_global: Optional[float]
+    total_reviews: int
+    sitio_web: Optional[str]
+    telefono: Optional[str]
+    referencia: Optional[str]
+    horarios: List[Hours]
+    reviews: List[Review]
+    fecha_extraccion: Optional[datetime]
+
+    @classmethod
+    def from_dict(cls, resultado, fecha_extraccion=None):
+        """Branch desde el dict de un info-N.json (las reseñas que falten quedan vacías)"""
+        info = resultado.get('info_adicional') or {}
+        return cls(
+            resultado['url'],
+            resultado.get('nombre'),
+            resultado.get('ubicacion'),
+            parse_float(resultado.get('rating_global')),
+            parse_int(resultado.get('total_reviews'), 0),
+            info.get('sitio_web'),
+            info.get('telefono'),
+            info.get('referencia'),
+            [Hours.from_dict(h) for h in info.get('horarios') or []],
+            [Review.from_dict(r) for r in resultado.get('reviews') or []],
+            fecha_extraccion
+        )
+
+    def as_dict(self):
+        """Forma de info-N.json ('reviews' al final, como espera leer_snapshot_json)"""
+        return {
+            'url': self.url,
+            'nombre': self.nombre,
+            'ubicacion': self.ubicacion,
+            'rating_global': None if self.rating_global is None else f"{self.rating_global:.1f}",
+            'total_reviews': str(self.total_reviews),
+            'info_adicional': {
+                'horarios': [h.as_dict() for h in self.horarios],
+                'sitio_web': self.sitio_web,
+                'telefono': self.telefono,
+                'referencia': self.referencia
+            },
+            'reviews': [r.as_dict() for r in self.reviews]
+        }
@@ -0,0 +1,124 @@
+import re
+import calendar
+from datetime import timedelta
+from functools import lru_cache
+
+# "Hace 7 meses", "Hace una semana", "Fecha de edición: Hace 6 años" (y equivalentes en inglés)
+RE_RELATIVA_ES = re.compile(
+    r"hace\s+(\d+|un|una|uno)\s+(segundo|minuto|hora|d[ií]a|semana|mes|año)(?:s|es)?\b",
+    re.IGNORECASE
+)
+RE_RELATIVA_EN = re.compile(
+    r"(\d+|a|an|one)\s+(second|minute|hour|day|week|month|year)s?\s+ago\b",
+    re.IGNORECASE
+)
+
+UNIDADES = {
+    'segundo': 'segundo', 'second': 'segundo',
+    'minuto': 'minuto', 'minute': 'minuto',
+    'hora': 'hora', 'hour': 'hora',
+    'dia': 'día', 'día': 'día', 'day': 'día',
+    'semana': 'semana', 'week': 'semana',
+    'mes': 'mes', 'month': 'mes',
+    'año': 'año', 'year': 'año',
+}
+SEGUNDOS = {'segundo': 1, 'minuto': 60, 'hora': 3600, 'día': 86400, 'semana': 7 * 86400}
+
+
+@lru_cache(maxsize=1024)
+def parse_relative_text(texto):
+    """'Hace 7 meses' -> (7, 'mes'); None si el texto no es una fecha relativa.
+
+    Solo depende del texto: en una carga se repiten pocas cadenas distintas.
+    """
+    if not texto:
+        return None
+    match = RE_RELATIVA_ES.search(texto) or RE_RELATIVA_EN.search(texto)
+    if not match:
+        return None
+    cantidad, unidad = match.groups()
+    cantidad = int(cantidad) if cantidad.isdigit() else 1
+    return cantidad, UNIDADES[unidad.lower()]
+
+
+def restar_meses(fecha, meses):
+    mes_total = fecha.year * 12 + fecha.month - 1 - meses
+    año, mes = divmod(mes_total, 12)
+    dia = min(fecha.day, calendar.monthrange(año, mes + 1)[1])
+    return fecha.replace(year=año, month=mes + 1, day=dia)
+
+
+def parse_relative_date(texto, referencia):
+    """(fecha aproximada, precisión) de una fecha relativa de Google respecto a `referencia`.
+
+    La precisión es la unidad del texto ('hora', 'día', 'semana', 'mes', 'año'):
+    'Hace 7 meses' solo asegura el mes. Retorna (None, None) si no se reconoce.
+    """
+    resultado = parse_relative_text(texto)
+    if resultado is None or referencia is None:
+        return None, None
+    cantidad, unidad = resultado
+    if unidad == 'mes':
+        return restar_meses(referencia, cantidad), unidad
+    if unidad == 'año':
+        return restar_meses(referencia, 12 * cantidad), unidad
+    return referencia - timedelta(seconds=SEGUNDOS[unidad] * cantidad), unidad
+
+
+def backfill_review_dates(connection, chunk_size=5000):
+    """Completar fecha_review_aprox/precisión de las reseñas ya cargadas.
+
+    Lee primero todas las reseñas pendientes (sin MARS la conexión no admite leer en un
+    cursor mientras se escribe en otro), resuelve las fechas en Python y las aplica por
+    bloques con un solo UPDATE por bloque desde una tabla temporal.
+    """
+    cursor = connection.cursor()
+    cursor.execute("""
+    SELECT id, fecha_review, fecha_extraccion
+    FROM Reviews
+    WHERE fecha_review_aprox IS NULL AND fecha_review IS NOT NULL
+    """)
+    pendientes = []
+    sin_formato = 0
+    for review_id, fecha_review, fecha_extraccion in cursor.fetchall():
+        aprox, precision = parse_relative_date(fecha_review, fecha_extraccion)
+        if aprox is None:
+            sin_formato += 1
+            continue
+        pendientes.append((review_id, aprox, precision))
+
+    cursor.fast_executemany = True
+    cursor.execute("""
+    CREATE TABLE #FechasReview (
+        id INT PRIMARY KEY,
+        fecha_review_aprox DATETIME NULL,
+        fecha_review_precision NVARCHAR(10) NULL
+    )
+    """)
+    actualizadas = 0
+    try:
+        for inicio in range(0, len(pendientes), chunk_size):
+            bloque = pendientes[inicio:inicio + chunk_size]
+            cursor.executemany(
+                "INSERT INTO #FechasReview (id, fecha_review_aprox, fecha_review_precision) VALUES (?, ?, ?)",
+                bloque
+            )
+            cursor.execute("""
+            UPDATE r SET r.fecha_review_aprox = f.fecha_review_aprox,
+                         r.fecha_review_precision = f.fecha_review_precision
+            FROM Reviews r
+            INNER JOIN #FechasReview f ON f.id = r.id
+            """)
+            cursor.execute("TRUNCATE TABLE #FechasReview")
+            actualizadas += len(bloque)
+            print(f"🔄 {actualizadas} reseñas con fecha aproximada...")
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.execute("DROP TABLE #FechasReview")
+
+    print(f"✅ Backfill terminado: {actualizadas} reseñas actualizadas, {sin_formato} con fecha no reconocida")
+    return actualizadas
+
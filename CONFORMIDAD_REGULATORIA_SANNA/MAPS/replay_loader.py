@@ -0,0 +1,127 @@
+import os
+import json
+import glob
+import time
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from records import Branch, Review
+
+# ijson permite leer el arreglo de reseñas sin cargar todo el archivo
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+CLAVES_CABECERA = ('url', 'nombre', 'ubicacion', 'rating_global', 'total_reviews', 'info_adicional')
+
+
+def leer_snapshot_json(ruta):
+    """Retorna (Branch, iterador de Review) de un info-N.json.
+
+    Con ijson las reseñas se parsean de forma incremental a medida que se
+    insertan; sin ijson se carga el archivo completo con json.load. La fecha de
+    extracción es la de modificación del archivo (igual que importar_json): las
+    fechas relativas ("Hace 7 meses") se resuelven contra ella y no contra el replay.
+    """
+    fecha_extraccion = datetime.fromtimestamp(os.path.getmtime(ruta))
+    if ijson is None:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            sucursal = Branch.from_dict(json.load(f), fecha_extraccion)
+        return sucursal, iter(sucursal.reviews)
+
+    cabecera = {}
+    with open(ruta, 'rb') as f:
+        # save_result_to_json escribe 'reviews' al final: se corta antes de construirlo
+        for clave, valor in ijson.kvitems(f, '', use_float=True):
+            if clave == 'reviews':
+                break
+            cabecera[clave] = valor
+            if all(c in cabecera for c in CLAVES_CABECERA):
+                break
+    cabecera.pop('reviews', None)
+
+    def reviews():
+        with open(ruta, 'rb') as f:
+            for review in ijson.items(f, 'reviews.item', use_float=True):
+                yield Review.from_dict(review)
+
+    return Branch.from_dict(cabecera, fecha_extraccion), reviews()
+
+
+class _ConexionesPorHilo:
+    """Un DatabaseManager por hilo: las conexiones pyodbc no se comparten"""
+
+    def __init__(self, db_factory):
+        self.db_factory = db_factory
+        self.local = threading.local()
+        self.abiertas = []
+        self.lock = threading.Lock()
+
+    def get(self):
+        if not hasattr(self.local, 'db'):
+            db = self.db_factory()
+            if not db.connect():
+                raise RuntimeError("No se pudo conectar a la base de datos")
+            self.local.db = db
+            with self.lock:
+                self.abiertas.append(db)
+        return self.local.db
+
+    def cerrar(self):
+        for db in self.abiertas:
+            db.disconnect()
+
+
+def replay_json(db_factory, rutas, workers=4, chunk_size=1000):
+    """Cargar info-N.json a la BD en paralelo, sin navegador ni red"""
+    conexiones = _ConexionesPorHilo(db_factory)
+
+    def cargar(ruta):
+        cabecera, reviews = leer_snapshot_json(ruta)
+        return conexiones.get().save_complete_data_bulk(cabecera, reviews=reviews, chunk_size=chunk_size)
+
+    return _ejecutar(sorted(rutas), cargar, workers, conexiones)
+
+
+def replay_parquet(db_factory, reader, desde=None, hasta=None, workers=4, chunk_size=1000):
+    """Cargar a la BD la última extracción de cada URL guardada en el almacén Parquet"""
+    conexiones = _ConexionesPorHilo(db_factory)
+
+    def cargar(resultado):
+        return conexiones.get().save_complete_data_bulk(resultado, chunk_size=chunk_size)
+
+    return _ejecutar(list(reader.resultados(desde, hasta)), cargar, workers, conexiones)
+
+
+def _ejecutar(items, cargar, workers, conexiones):
+    inicio = time.perf_counter()
+    cargados = 0
+    fallidos = 0
+    print(f"🔁 Recargando {len(items)} snapshots con {workers} hilos")
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futuros = {executor.submit(cargar, item): item for item in items}
+            for futuro in as_completed(futuros):
+                item = futuros[futuro]
+                nombre = item if isinstance(item, str) else item.url
+                try:
+                    if futuro.result():
+                        cargados += 1
+                    else:
+                        fallidos += 1
+                except Exception as e:
+                    fallidos += 1
+                    print(f"❌ Error recargando {nombre}: {str(e)}")
+    finally:
+        conexiones.cerrar()
+
+    duracion = time.perf_counter() - inicio
+    print(f"✅ Replay terminado en {duracion:.1f}s: {cargados} cargados, {fallidos} fallidos")
+    return {'cargados': cargados, 'fallidos': fallidos, 'duracion_s': duracion}
+
+
+def rutas_json(patron='info-*.json'):
+    return sorted(glob.glob(patron))
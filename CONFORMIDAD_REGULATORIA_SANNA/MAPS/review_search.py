@@ -0,0 +1,57 @@
+import re
+
+# Búsqueda sobre el índice de texto completo de Reviews.texto (migración 0007)
+RE_FRASE = re.compile(r'"([^"]*)"')
+RE_TERMINO = re.compile(r"\w+\*?")
+RE_PALABRA = re.compile(r"\w+")
+OPERADORES = frozenset({'and', 'or', 'not', 'near'})
+
+
+def build_contains(consulta):
+    """Condición de CONTAINSTABLE a partir de texto libre; todas las partes deben aparecer.
+
+    'demora "buena atención" estacion*' ->
+    '"buena atención" AND FORMSOF(INFLECTIONAL, demora) AND "estacion*"'
+    Las frases van entre comillas, un * final busca por prefijo y el resto de palabras
+    incluye sus formas (plural, conjugaciones). Las tildes no importan (catálogo sin acentos).
+    """
+    partes = []
+    for frase in RE_FRASE.findall(consulta):
+        palabras = RE_PALABRA.findall(frase)
+        if palabras:
+            partes.append('"' + ' '.join(palabras) + '"')
+    for termino in RE_TERMINO.findall(RE_FRASE.sub(' ', consulta)):
+        palabra = termino.rstrip('*')
+        if palabra.lower() in OPERADORES:
+            continue
+        if termino.endswith('*'):
+            partes.append(f'"{palabra}*"')
+        else:
+            partes.append(f'FORMSOF(INFLECTIONAL, {palabra})')
+    return ' AND '.join(partes)
+
+
+def search_reviews(connection, consulta, sucursal_id=None, limite=20):
+    """Reseñas que coinciden con la consulta, de mayor a menor RANK; opcionalmente de una sucursal.
+
+    [{'id', 'sucursal_id', 'sucursal', 'autor', 'rating', 'texto', 'rank'}]
+    """
+    condicion = build_contains(consulta)
+    if not condicion:
+        return []
+    filtro = "WHERE r.sucursal_id = ?" if sucursal_id is not None else ""
+    parametros = (limite, condicion) + ((sucursal_id,) if sucursal_id is not None else ())
+    cursor = connection.cursor()
+    cursor.execute(f"""
+    SELECT TOP (?) r.id, r.sucursal_id, s.nombre, r.autor, r.rating, r.texto, ft.[RANK]
+    FROM CONTAINSTABLE(Reviews, texto, ?) ft
+    INNER JOIN Reviews r ON r.id = ft.[KEY]
+    INNER JOIN Sucursales s ON s.id = r.sucursal_id
+    {filtro}
+    ORDER BY ft.[RANK] DESC, r.id
+    """, parametros)
+    return [
+        {'id': row[0], 'sucursal_id': row[1], 'sucursal': row[2], 'autor': row[3],
+         'rating': row[4], 'texto': row[5], 'rank': row[6]}
+        for row in cursor.fetchall()
+    ]
@@ -0,0 +1,257 @@
+import os
+import json
+import uuid
+from datetime import datetime
+
+from records import Branch, Hours, Review
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    from pyarrow import fs
+except ImportError:
+    pa = None
+
+SNAPSHOTS_DIR = 'snapshots'
+
+# Esquemas tipados por tabla (una fila por sucursal / horario / reseña)
+if pa is not None:
+    ESQUEMAS = {
+        'sucursales': pa.schema([
+            ('url', pa.string()),
+            ('nombre', pa.string()),
+            ('ubicacion', pa.string()),
+            ('rating_global', pa.float32()),
+            ('total_reviews', pa.int32()),
+            ('sitio_web', pa.string()),
+            ('telefono', pa.string()),
+            ('referencia', pa.string()),
+            ('fecha_extraccion', pa.timestamp('s')),
+        ]),
+        'horarios': pa.schema([
+            ('url', pa.string()),
+            ('dia', pa.string()),
+            ('horas', pa.string()),
+            ('esta_cerrado', pa.bool_()),
+            ('fecha_extraccion', pa.timestamp('s')),
+        ]),
+        'reviews': pa.schema([
+            ('url', pa.string()),
+            ('posicion', pa.int32()),
+            ('autor', pa.string()),
+            ('rating', pa.int8()),
+            ('fecha_review', pa.string()),
+            ('texto', pa.string()),
+            ('fotos', pa.int16()),
+            ('likes', pa.int32()),
+            ('fecha_extraccion', pa.timestamp('s')),
+        ]),
+    }
+    PARTICION = ds.partitioning(pa.schema([('fecha', pa.string())]), flavor='hive')
+
+
+def disponible():
+    return pa is not None
+
+
+class SnapshotStore:
+    """Almacén append-only de resultados del scraping en Parquet.
+
+    Estructura: snapshots/<tabla>/fecha=YYYY-MM-DD/run-<hora>-<id>.parquet
+    Cada ejecución agrega archivos nuevos; nunca se sobreescribe un snapshot.
+    Cada flush_every sucursales el buffer se escribe como un archivo más: la memoria
+    no crece con la ejecución y si el proceso muere solo se pierde el último tramo.
+    """
+
+    def __init__(self, root=SNAPSHOTS_DIR, flush_every=20):
+        if pa is None:
+            raise ImportError("pyarrow no está instalado (pip install pyarrow)")
+        self.root = root
+        self.flush_every = flush_every
+        self._buffer = {tabla: {campo: [] for campo in esquema.names} for tabla, esquema in ESQUEMAS.items()}
+        self._pendientes = 0
+
+    def add(self, resultado, fecha_extraccion=None):
+        """Agregar un Branch (resultado de scrape_google_maps) al buffer de la ejecución.
+
+        Los valores ya vienen tipados: se agregan a las columnas sin convertir.
+        """
+        fecha = (fecha_extraccion or resultado.fecha_extraccion or datetime.now()).replace(microsecond=0)
+        url = resultado.url
+
+        s = self._buffer['sucursales']
+        s['url'].append(url)
+        s['nombre'].append(resultado.nombre)
+        s['ubicacion'].append(resultado.ubicacion)
+        s['rating_global'].append(resultado.rating_global)
+        s['total_reviews'].append(resultado.total_reviews)
+        s['sitio_web'].append(resultado.sitio_web)
+        s['telefono'].append(resultado.telefono)
+        s['referencia'].append(resultado.referencia)
+        s['fecha_extraccion'].append(fecha)
+
+        h = self._buffer['horarios']
+        for horario in resultado.horarios:
+            h['url'].append(url)
+            h['dia'].append(horario.dia)
+            h['horas'].append(horario.horas)
+            h['esta_cerrado'].append(horario.esta_cerrado)
+            h['fecha_extraccion'].append(fecha)
+
+        r = self._buffer['reviews']
+        for posicion, review in enumerate(resultado.reviews):
+            r['url'].append(url)
+            r['posicion'].append(posicion)
+            r['autor'].append(review.author)
+            r['rating'].append(review.rating)
+            r['fecha_review'].append(review.date)
+            r['texto'].append(review.text)
+            r['fotos'].append(review.photos)
+            r['likes'].append(review.likes)
+            r['fecha_extraccion'].append(fecha)
+
+        self._pendientes += 1
+        if self.flush_every and self._pendientes >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Escribir lo que queda en el buffer como un archivo Parquet por tabla en la partición del día"""
+        if not self._pendientes:
+            return []
+        ahora = datetime.now()
+        nombre = f"run-{ahora:%H%M%S}-{uuid.uuid4().hex[:8]}.parquet"
+        escritos = []
+
+        for tabla, columnas in self._buffer.items():
+            if not columnas['url']:
+                continue
+            # Partición por fecha de extracción (normalmente una sola por ejecución)
+            fechas = sorted({f.date() for f in columnas['fecha_extraccion']})
+            tabla_arrow = pa.Table.from_pydict(columnas, schema=ESQUEMAS[tabla])
+            for dia in fechas:
+                if len(fechas) > 1:
+                    mascara = pc.equal(
+                        pc.cast(tabla_arrow['fecha_extraccion'], pa.date32()),
+                        pa.scalar(dia, pa.date32())
+                    )
+                    parte = tabla_arrow.filter(mascara)
+                else:
+                    parte = tabla_arrow
+                carpeta = os.path.join(self.root, tabla, f"fecha={dia.isoformat()}")
+                os.makedirs(carpeta, exist_ok=True)
+                ruta = os.path.join(carpeta, nombre)
+                pq.write_table(parte, ruta, compression='zstd')
+                escritos.append(ruta)
+
+        self._buffer = {tabla: {campo: [] for campo in esquema.names} for tabla, esquema in ESQUEMAS.items()}
+        self._pendientes = 0
+        print(f"✅ Snapshot guardado en {self.root} ({len(escritos)} archivos)")
+        return escritos
+
+
+class SnapshotReader:
+    """Lectura filtrada de snapshots sin cargar todos los archivos.
+
+    Los filtros por fecha descartan particiones completas y los filtros por
+    URL se aplican por row group; los archivos se abren con memory-map.
+    """
+
+    def __init__(self, root=SNAPSHOTS_DIR):
+        if pa is None:
+            raise ImportError("pyarrow no está instalado (pip install pyarrow)")
+        self.root = root
+
+    def dataset(self, tabla):
+        return ds.dataset(
+            os.path.abspath(os.path.join(self.root, tabla)),
+            format='parquet',
+            partitioning=PARTICION,
+            filesystem=fs.LocalFileSystem(use_mmap=True)
+        )
+
+    def fechas(self, tabla='sucursales'):
+        carpeta = os.path.join(self.root, tabla)
+        if not os.path.isdir(carpeta):
+            return []
+        return sorted(n.split('=', 1)[1] for n in os.listdir(carpeta) if n.startswith('fecha='))
+
+    def leer(self, tabla, urls=None, desde=None, hasta=None, columnas=None):
+        """Tabla Arrow con las filas de `tabla` filtradas por URL y rango de fechas (YYYY-MM-DD)"""
+        if not os.path.isdir(os.path.join(self.root, tabla)):
+            return ESQUEMAS[tabla].empty_table()
+        filtro = None
+        condiciones = []
+        if urls is not None:
+            condiciones.append(ds.field('url').isin(list(urls)))
+        if desde is not None:
+            condiciones.append(ds.field('fecha') >= str(desde))
+        if hasta is not None:
+            condiciones.append(ds.field('fecha') <= str(hasta))
+        for condicion in condiciones:
+            filtro = condicion if filtro is None else filtro & condicion
+        return self.dataset(tabla).to_table(columns=columnas, filter=filtro)
+
+    def ultimo(self, url):
+        """Última extracción de una URL como Branch (igual que scrape_google_maps)"""
+        for resultado in self.resultados(urls=[url]):
+            return resultado
+        return None
+
+    def resultados(self, desde=None, hasta=None, urls=None):
+        """Última extracción de cada URL en el rango, como Branch (igual que scrape_google_maps)"""
+        sucursales = {}
+        for fila in self.leer('sucursales', urls=urls, desde=desde, hasta=hasta).to_pylist():
+            actual = sucursales.get(fila['url'])
+            if actual is None or fila['fecha_extraccion'] > actual['fecha_extraccion']:
+                sucursales[fila['url']] = fila
+        if not sucursales:
+            return
+
+        elegidas = {(url, fila['fecha_extraccion']) for url, fila in sucursales.items()}
+        horarios = {}
+        for fila in self.leer('horarios', urls=list(sucursales), desde=desde, hasta=hasta).to_pylist():
+            if (fila['url'], fila['fecha_extraccion']) in elegidas:
+                horarios.setdefault(fila['url'], []).append(Hours(fila['dia'], fila['horas'], fila['esta_cerrado']))
+        reviews = {}
+        for fila in self.leer('reviews', urls=list(sucursales), desde=desde, hasta=hasta).to_pylist():
+            if (fila['url'], fila['fecha_extraccion']) in elegidas:
+                reviews.setdefault(fila['url'], []).append(fila)
+
+        for url, sucursal in sucursales.items():
+            # rating_global se guarda como float32 (4.6 -> 4.599999...)
+            rating_global = None if sucursal['rating_global'] is None else round(sucursal['rating_global'], 1)
+            yield Branch(
+                url, sucursal['nombre'], sucursal['ubicacion'], rating_global, sucursal['total_reviews'],
+                sucursal['sitio_web'], sucursal['telefono'], sucursal['referencia'],
+                horarios.get(url, []),
+                [
+                    Review(fila['autor'], fila['rating'], fila['fecha_review'], fila['texto'], fila['fotos'], fila['likes'])
+                    for fila in sorted(reviews.get(url, []), key=lambda fila: fila['posicion'])
+                ],
+                sucursal['fecha_extraccion']
+            )
+
+
+def importar_json(rutas, root=SNAPSHOTS_DIR):
+    """Pasar los info-N.json existentes al almacén (fecha = modificación del archivo)"""
+    store = SnapshotStore(root)
+    for ruta in rutas:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            resultado = Branch.from_dict(json.load(f))
+        store.add(resultado, datetime.fromtimestamp(os.path.getmtime(ruta)))
+    return store.flush()
+
+
+if __name__ == "__main__":
+    import glob
+
+    rutas = sorted(glob.glob('info-*.json'))
+    if not disponible():
+        print("❌ pyarrow no está instalado (pip install pyarrow)")
+    elif rutas:
+        print(f"📦 Importando {len(rutas)} archivos JSON al almacén de snapshots")
+        importar_json(rutas)
+    else:
+        print("ℹ️ No hay archivos info-*.json para importar")
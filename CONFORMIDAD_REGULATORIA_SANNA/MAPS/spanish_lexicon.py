@@ -0,0 +1,134 @@
+import re
+import math
+
+# Valencia en [-1, 1] de términos frecuentes en reseñas de clínicas (claves sin tildes)
+VALENCIAS = {
+    'excelente': 0.9, 'exelente': 0.9, 'excelentes': 0.9, 'increible': 0.8, 'genial': 0.8,
+    'maravilloso': 0.8, 'maravillosa': 0.8, 'perfecto': 0.8, 'perfecta': 0.8, 'espectacular': 0.8,
+    'mejor': 0.6, 'mejores': 0.6, 'recomiendo': 0.7, 'recomendado': 0.7, 'recomendable': 0.7,
+    'bueno': 0.5, 'buena': 0.5, 'buenos': 0.5, 'buenas': 0.5, 'buen': 0.5, 'bien': 0.4,
+    'amable': 0.6, 'amables': 0.6, 'atento': 0.5, 'atenta': 0.5, 'atentos': 0.5, 'atentas': 0.5,
+    'cordial': 0.5, 'cordiales': 0.5, 'agradable': 0.5, 'gusto': 0.4, 'gusta': 0.4,
+    'gracias': 0.4, 'agradecido': 0.5, 'agradecida': 0.5, 'agradezco': 0.5,
+    'profesional': 0.5, 'profesionales': 0.5, 'calificado': 0.4, 'eficiente': 0.6, 'eficientes': 0.6,
+    'rapido': 0.5, 'rapida': 0.5, 'rapidos': 0.5, 'rapidez': 0.5, 'puntual': 0.5, 'puntuales': 0.5,
+    'limpio': 0.4, 'limpia': 0.4, 'limpieza': 0.3, 'ordenado': 0.4, 'comodo': 0.4, 'comoda': 0.4,
+    'empatia': 0.5, 'paciencia': 0.4, 'satisfecho': 0.6, 'satisfecha': 0.6, 'feliz': 0.6,
+    'tranquilo': 0.3, 'tranquila': 0.3, 'seguro': 0.2, 'confianza': 0.4, 'volveria': 0.5,
+    'malo': -0.6, 'mala': -0.6, 'malos': -0.6, 'malas': -0.6, 'mal': -0.5,
+    'pesimo': -0.9, 'pesima': -0.9, 'pesimos': -0.9, 'pesimas': -0.9, 'peor': -0.8, 'peores': -0.8,
+    'terrible': -0.9, 'horrible': -0.9, 'fatal': -0.8, 'deficiente': -0.7, 'lamentable': -0.7,
+    'decepcion': -0.6, 'decepcionado': -0.6, 'decepcionada': -0.6, 'decepcionante': -0.6,
+    'demora': -0.5, 'demoran': -0.5, 'demoraron': -0.5, 'demorado': -0.5, 'lento': -0.5, 'lenta': -0.5,
+    'lentos': -0.5, 'esperando': -0.3, 'cola': -0.2, 'colas': -0.2, 'caos': -0.7, 'desorden': -0.6,
+    'desorganizado': -0.6, 'desorganizacion': -0.6, 'burocracia': -0.5, 'sucio': -0.6, 'sucia': -0.6,
+    'caro': -0.4, 'cara': -0.3, 'caros': -0.4, 'abuso': -0.7, 'estafa': -0.9, 'robo': -0.8,
+    'grosero': -0.7, 'grosera': -0.7, 'groseros': -0.7, 'malcriado': -0.7, 'malcriada': -0.7,
+    'prepotente': -0.7, 'indiferente': -0.5, 'negligencia': -0.9, 'negligente': -0.9,
+    'incompetente': -0.8, 'incompetentes': -0.8, 'irresponsable': -0.7, 'irresponsables': -0.7,
+    'cancelaron': -0.4, 'problema': -0.4, 'problemas': -0.4, 'inconvenientes': -0.3, 'queja': -0.5,
+    'reclamo': -0.4, 'molesto': -0.5, 'molesta': -0.5, 'triste': -0.5, 'verguenza': -0.8,
+    'nadie': -0.3, 'cero': -0.4,
+}
+
+NEGADORES = frozenset({'no', 'nunca', 'jamas', 'tampoco', 'ni', 'sin', 'nada', 'poco', 'ningun', 'ninguna'})
+# Multiplicadores de la intensidad de la palabra siguiente
+INTENSIFICADORES = {
+    'muy': 1.3, 'super': 1.3, 'bastante': 1.2, 'tan': 1.2, 'demasiado': 1.25, 'sumamente': 1.35,
+    'extremadamente': 1.4, 'realmente': 1.2, 'totalmente': 1.25, 'completamente': 1.25,
+    'mas': 1.1, 'algo': 0.8, 'medio': 0.7, 'casi': 0.8,
+}
+# Tras "pero" / "aunque" pesa más lo que sigue (como en VADER)
+CONTRASTES = frozenset({'pero', 'aunque', 'embargo'})
+VENTANA_NEGACION = 3
+FACTOR_NEGACION = -0.75
+ALFA = 1.0
+
+# Un solo str.translate para quitar tildes al comparar con el léxico
+SIN_TILDES = str.maketrans('áéíóúüÁÉÍÓÚÜ', 'aeiouuAEIOUU')
+RE_TOKEN = re.compile(r"\w+")
+
+
+class SpanishLexiconScorer:
+    """Puntaje de sentimiento en una pasada: léxico en español + pesos de PalabrasClave.
+
+    Cada token se busca una vez; la negación invierte y atenúa las siguientes
+    VENTANA_NEGACION palabras ("no son amables") y los intensificadores escalan la
+    palabra siguiente ("muy buena"). Los pesos de PalabrasClave reemplazan a la
+    valencia base de la misma palabra y se reportan como palabras clave detectadas.
+    """
+
+    def __init__(self, palabras_clave=None, valencias=VALENCIAS):
+        self.valencias = dict(valencias)
+        self.palabras_clave = {}
+        for palabra, datos in (palabras_clave or {}).items():
+            clave = palabra.lower().translate(SIN_TILDES)
+            self.palabras_clave[clave] = (palabra, datos)
+            self.valencias[clave] = datos['peso']
+
+    def score(self, text):
+        """{'score', 'positive_words', 'negative_words', 'detected_keywords', 'word_count', 'confidence'}"""
+        tokens = RE_TOKEN.findall(text.lower()) if text else []
+        valencias = self.valencias
+        palabras_clave = self.palabras_clave
+
+        positive_words = []
+        negative_words = []
+        detected_keywords = []
+        aportes = []
+        negacion = 0
+        intensidad = 1.0
+        contraste = None
+
+        for token in tokens:
+            clave = token.translate(SIN_TILDES)
+            if clave in CONTRASTES:
+                # Lo dicho antes del contraste pesa la mitad; lo que sigue, 1.5 veces
+                aportes = [a * 0.5 for a in aportes]
+                contraste = 1.5
+                negacion = 0
+                continue
+            if clave in NEGADORES:
+                negacion = VENTANA_NEGACION
+                continue
+            if clave in INTENSIFICADORES:
+                intensidad *= INTENSIFICADORES[clave]
+                continue
+
+            valencia = valencias.get(clave)
+            if valencia is not None:
+                valor = valencia * intensidad
+                if negacion:
+                    valor *= FACTOR_NEGACION
+                if contraste:
+                    valor *= contraste
+                aportes.append(valor)
+
+                if clave in palabras_clave:
+                    palabra, datos = palabras_clave[clave]
+                    detected_keywords.append({
+                        'palabra': palabra,
+                        'peso': datos['peso'],
+                        'categoria': datos['categoria']
+                    })
+                if valor > 0:
+                    positive_words.append(token)
+                elif valor < 0:
+                    negative_words.append(token)
+
+            intensidad = 1.0
+            if negacion:
+                negacion -= 1
+
+        total = sum(aportes)
+        # Normalización tipo VADER: acota a (-1, 1) y satura con muchas palabras del mismo signo
+        score = total / math.sqrt(total * total + ALFA) if aportes else 0.0
+        magnitud = sum(abs(a) for a in aportes)
+        return {
+            'score': score,
+            'positive_words': positive_words,
+            'negative_words': negative_words,
+            'detected_keywords': detected_keywords,
+            'word_count': len(aportes),
+            'confidence': abs(total) / magnitud if magnitud else 0.0
+        }
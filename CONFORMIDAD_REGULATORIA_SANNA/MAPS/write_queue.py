@@ -0,0 +1,112 @@
+import queue
+import threading
+import time
+
+_FIN = object()
+
+
+class DatabaseWriter(threading.Thread):
+    """Hilo escritor: consume resultados del scraping y los guarda por lotes.
+
+    Los scrapers llaman a submit(); la cola es acotada, así que si la BD se
+    atrasa submit() bloquea al scraper (backpressure) en lugar de acumular
+    sucursales completas en memoria. close() drena la cola antes de terminar.
+    Si un lote falla (p. ej. se cayó la conexión) sus resultados se informan como
+    fallidos con on_saved(resultado, None) y el hilo sigue consumiendo la cola.
+    """
+
+    def __init__(self, db_factory, maxsize=4, batch_size=5, on_saved=None):
+        super().__init__(name='DatabaseWriter', daemon=True)
+        self.db_factory = db_factory
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.batch_size = batch_size
+        self.on_saved = on_saved
+        self.saved = 0
+        self.failed = 0
+        self.blocked_seconds = 0.0
+        self.error = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def submit(self, resultado):
+        """Encolar un resultado; bloquea mientras la cola está llena"""
+        if not self.is_alive():
+            raise RuntimeError(f"El escritor de BD no está activo: {self.error}")
+        inicio = time.perf_counter()
+        if self.queue.full():
+            print(f"⏸️ Cola de escritura llena ({self.queue.maxsize}), esperando a la BD...")
+        self.queue.put(resultado)
+        with self._lock:
+            self.blocked_seconds += time.perf_counter() - inicio
+
+    def close(self):
+        """Drenar la cola y esperar a que el hilo termine (se puede llamar más de una vez)"""
+        if self._closed:
+            return
+        self._closed = True
+        if self.is_alive():
+            self.queue.put(_FIN)
+            self.join()
+        print(f"💾 Escritor de BD cerrado: {self.saved} guardados, {self.failed} fallidos")
+
+    def wait_idle(self):
+        """Esperar a que todo lo encolado hasta ahora quede guardado (sin cerrar el hilo)"""
+        if self.is_alive():
+            self.queue.join()
+
+    def run(self):
+        db = self.db_factory()
+        if not db.connect():
+            self.error = "no se pudo conectar a la base de datos"
+            # Vaciar la cola para no dejar bloqueados a los scrapers
+            while True:
+                item = self.queue.get()
+                self.queue.task_done()
+                if item is _FIN:
+                    return
+                self._report(item, None)
+
+        try:
+            terminado = False
+            while not terminado:
+                lote = [self.queue.get()]
+                # Completar el lote con lo que ya esté en cola, sin esperar
+                while len(lote) < self.batch_size:
+                    try:
+                        lote.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                consumidos = len(lote)
+                if _FIN in lote:
+                    terminado = True
+                    lote = [item for item in lote if item is not _FIN]
+                try:
+                    if lote:
+                        self._write(db, lote)
+                except Exception as e:
+                    self.error = str(e)
+                    print(f"❌ Error guardando un lote de {len(lote)} sucursales: {str(e)}")
+                    for resultado in lote:
+                        self._report(resultado, None)
+                finally:
+                    for _ in range(consumidos):
+                        self.queue.task_done()
+        finally:
+            db.disconnect()
+
+    def _write(self, db, lote):
+        ids = db.save_many_bulk(lote)
+        for resultado, sucursal_id in zip(lote, ids):
+            self._report(resultado, sucursal_id)
+
+    def _report(self, resultado, sucursal_id):
+        if sucursal_id:
+            self.saved += 1
+            print(f"💾 {resultado.nombre} guardado en SQL Server (sucursal {sucursal_id})")
+        else:
+            self.failed += 1
+        if self.on_saved:
+            try:
+                self.on_saved(resultado, sucursal_id)
+            except Exception as e:
+                print(f"⚠️ Error en on_saved: {str(e)}")
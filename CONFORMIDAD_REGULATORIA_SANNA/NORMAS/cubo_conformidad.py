@@ -0,0 +1,173 @@
+import pyodbc
+from itertools import product
+
+# Configuración
+DB_CONFIG = {
+    'server': 'DESKTOP-5B78EO8\\SQL2022',
+    'database': 'SannaIConformidadRegulatoria',
+    'trusted_connection': 'yes',
+    'driver': '{ODBC Driver 17 for SQL Server}'
+}
+
+# Agregado de hechos por sucursal x año_mes x usuario (solo claves de #ClavesResumen)
+SQL_AGREGADO_CLAVES = """
+    INSERT INTO Resumen_Conformidad (
+        sucursal_id, año_mes, id_usuario,
+        total_acciones_correctivas,
+        total_acciones_correctivas_conformes,
+        total_acciones_correctivas_noconformes
+    )
+    SELECT h.sucursal_id, RTRIM(t.año_mes), h.id_usuario,
+           SUM(h.total_acciones_correctivas),
+           SUM(h.total_acciones_correctivas_conformes),
+           SUM(h.total_acciones_correctivas_noconformes)
+    FROM Hechos_Conformidad_Sanitaria h
+    INNER JOIN Tiempo t ON h.fecha = t.fecha
+    INNER JOIN #ClavesResumen c
+        ON c.sucursal_id = h.sucursal_id
+        AND c.id_usuario = h.id_usuario
+        AND c.año_mes = RTRIM(t.año_mes)
+    GROUP BY h.sucursal_id, RTRIM(t.año_mes), h.id_usuario
+"""
+
+SQL_AGREGADO_TOTAL = """
+    INSERT INTO Resumen_Conformidad (
+        sucursal_id, año_mes, id_usuario,
+        total_acciones_correctivas,
+        total_acciones_correctivas_conformes,
+        total_acciones_correctivas_noconformes
+    )
+    SELECT h.sucursal_id, RTRIM(t.año_mes), h.id_usuario,
+           SUM(h.total_acciones_correctivas),
+           SUM(h.total_acciones_correctivas_conformes),
+           SUM(h.total_acciones_correctivas_noconformes)
+    FROM Hechos_Conformidad_Sanitaria h
+    INNER JOIN Tiempo t ON h.fecha = t.fecha
+    GROUP BY h.sucursal_id, RTRIM(t.año_mes), h.id_usuario
+"""
+
+
+def año_mes_de(fecha):
+    # Mismo formato que fila_tiempo en procesar_normativas.py
+    return f"{fecha.year}-{fecha.month:02d}"
+
+
+def refrescar_resumen(cursor, claves=None):
+    """Recalcula Resumen_Conformidad.
+
+    claves: iterable de (sucursal_id, id_usuario, fecha) afectadas por la última
+    carga de hechos. Solo se recalculan esas celdas; si es None se reconstruye
+    el resumen completo. No hace commit.
+    """
+    if claves is None:
+        cursor.execute("DELETE FROM Resumen_Conformidad")
+        cursor.execute(SQL_AGREGADO_TOTAL)
+        return
+
+    celdas = {(sucursal_id, año_mes_de(fecha), id_usuario) for sucursal_id, id_usuario, fecha in claves}
+    if not celdas:
+        return
+
+    cursor.execute("IF OBJECT_ID('tempdb..#ClavesResumen') IS NOT NULL DROP TABLE #ClavesResumen")
+    cursor.execute("""
+        CREATE TABLE #ClavesResumen (
+            sucursal_id INT NOT NULL,
+            año_mes NCHAR(7) NOT NULL,
+            id_usuario NVARCHAR(8) NOT NULL
+        )
+    """)
+    cursor.fast_executemany = True
+    cursor.executemany(
+        "INSERT INTO #ClavesResumen (sucursal_id, año_mes, id_usuario) VALUES (?, ?, ?)",
+        list(celdas)
+    )
+    cursor.execute("""
+        DELETE r FROM Resumen_Conformidad r
+        INNER JOIN #ClavesResumen c
+            ON c.sucursal_id = r.sucursal_id
+            AND c.año_mes = r.año_mes
+            AND c.id_usuario = r.id_usuario
+    """)
+    cursor.execute(SQL_AGREGADO_CLAVES)
+    cursor.execute("DROP TABLE #ClavesResumen")
+
+
+class CuboConformidad:
+    """Cubo en memoria sobre Resumen_Conformidad.
+
+    Al cargar se precalculan los roll-ups de las 8 combinaciones de
+    dimensiones (sucursal, año_mes, usuario), de modo que cada consulta
+    es una sola búsqueda en diccionario.
+    """
+
+    DIMENSIONES = ('sucursal_id', 'año_mes', 'id_usuario')
+
+    def __init__(self, filas):
+        self.agregados = {}
+        for sucursal_id, año_mes, id_usuario, total, conformes, no_conformes in filas:
+            celda = (sucursal_id, año_mes.strip(), id_usuario)
+            # Cada celda suma en sus 8 roll-ups (None = todas)
+            for mascara in product((True, False), repeat=3):
+                clave = tuple(v if usar else None for v, usar in zip(celda, mascara))
+                acumulado = self.agregados.setdefault(clave, [0, 0, 0])
+                acumulado[0] += total
+                acumulado[1] += conformes
+                acumulado[2] += no_conformes
+
+    @classmethod
+    def desde_bd(cls, cursor):
+        cursor.execute("""
+            SELECT sucursal_id, año_mes, id_usuario,
+                   total_acciones_correctivas,
+                   total_acciones_correctivas_conformes,
+                   total_acciones_correctivas_noconformes
+            FROM Resumen_Conformidad
+        """)
+        return cls(cursor.fetchall())
+
+    def consultar(self, sucursal_id=None, año_mes=None, id_usuario=None):
+        """Totales para la combinación pedida; None en una dimensión = todas"""
+        total, conformes, no_conformes = self.agregados.get((sucursal_id, año_mes, id_usuario), (0, 0, 0))
+        return {
+            'total': total,
+            'conformes': conformes,
+            'no_conformes': no_conformes,
+            'porcentaje_conformidad': (conformes / total * 100) if total else 0.0
+        }
+
+    def valores(self, dimension):
+        """Valores presentes de una dimensión (para armar reportes)"""
+        posicion = self.DIMENSIONES.index(dimension)
+        return sorted({
+            clave[posicion] for clave in self.agregados
+            if clave[posicion] is not None
+        })
+
+
+if __name__ == "__main__":
+    try:
+        conn = pyodbc.connect(
+            f"DRIVER={DB_CONFIG['driver']};"
+            f"SERVER={DB_CONFIG['server']};"
+            f"DATABASE={DB_CONFIG['database']};"
+            f"Trusted_Connection=yes;"
+        )
+        cursor = conn.cursor()
+        print("✅ Conexión exitosa a SQL Server")
+
+        refrescar_resumen(cursor)
+        conn.commit()
+        print("✅ Resumen_Conformidad reconstruido")
+
+        cubo = CuboConformidad.desde_bd(cursor)
+        general = cubo.consultar()
+        print(f"📊 Total: {general['total']} | Conformes: {general['conformes']} | "
+              f"No conformes: {general['no_conformes']} ({general['porcentaje_conformidad']:.1f}%)")
+        for sucursal_id in cubo.valores('sucursal_id'):
+            fila = cubo.consultar(sucursal_id=sucursal_id)
+            print(f"   • Sucursal {sucursal_id}: {fila['conformes']}/{fila['total']} conformes")
+
+        conn.close()
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
@@ -0,0 +1,108 @@
+import re
+from datetime import datetime
+from bs4 import BeautifulSoup, SoupStrainer
+
+# lxml es bastante más rápido que html.parser; se usa si está instalado
+try:
+    import lxml  # noqa: F401
+    PARSER = "lxml"
+except ImportError:
+    PARSER = "html.parser"
+
+# PATRONES PRECOMPILADOS (una sola vez por proceso)
+
+MESES = {
+    "enero": 1, "febrero": 2, "marzo": 3, "abril": 4, "mayo": 5, "junio": 6,
+    "julio": 7, "agosto": 8, "setiembre": 9, "septiembre": 9, "octubre": 10,
+    "noviembre": 11, "diciembre": 12
+}
+
+_MESES_ALTERNATIVA = "|".join(sorted(MESES, key=len, reverse=True))
+RE_FECHA = re.compile(rf"(\d{{1,2}})\s+de\s+({_MESES_ALTERNATIVA})\s+de\s+(\d{{4}})", re.IGNORECASE)
+
+RE_ACCION = re.compile(r"(Ot[óo]rguese|Decl[áa]rese|Autoriz[ae]|Enc[áa]rg[ue])[^.]{20,200}\.", re.IGNORECASE)
+RE_CONFORME = re.compile(r"ot[oó]rg[ao]|autoriz[ao]", re.IGNORECASE)
+
+PATRONES_SUCURSAL = [
+    re.compile(r'nombre comercial\s*[“"]?(SANNA[^”",\n]+)', re.IGNORECASE),
+    re.compile(r'autorizaci[oó]n.*?a\s+(SANNA[^”",\n]+)', re.IGNORECASE),
+    re.compile(r'(SANNA[^,.\n]{5,80})', re.IGNORECASE)
+]
+
+# Contenedor de la norma en gob.pe: se parsea solo esa parte de la página. Es un cambio
+# respecto de parsear la página completa: el texto donde se buscan la sucursal y las
+# acciones ya no incluye cabecera, menú ni pie (que podrían nombrar a SANNA fuera de la
+# norma). Si <main> no tiene el título (<h2>) se usa la página completa como antes.
+# benchmarks/extractores_normas.py compara los campos de ambos modos sobre el HTML en caché.
+CONTENIDO = SoupStrainer("main")
+
+# FECHAS
+
+def parsear_fecha_texto(texto, completo=True):
+    """'05 de febrero de 2024' -> datetime en una sola pasada.
+
+    completo=True exige que el texto sea solo la fecha (como el <p> bajo el
+    título); completo=False la busca dentro de un texto más largo (PDF).
+    """
+    texto = texto.strip()
+    match = RE_FECHA.fullmatch(texto) if completo else RE_FECHA.search(texto)
+    if not match:
+        return None
+    dia, mes, año = match.groups()
+    try:
+        return datetime(int(año), MESES[mes.lower()], int(dia))
+    except ValueError:
+        return None
+
+# PARSEO
+
+def crear_soup(html, parser=None, solo_contenido=True):
+    """BeautifulSoup limitado al nodo de contenido; si no se encuentra el título, página completa"""
+    parser = parser or PARSER
+    if solo_contenido:
+        soup = BeautifulSoup(html, parser, parse_only=CONTENIDO)
+        if soup.find("h2"):
+            return soup
+    return BeautifulSoup(html, parser)
+
+# EXTRACTORES
+
+def extraer_tipo(soup):
+    h2 = soup.find("h2")
+    return h2.get_text(strip=True) if h2 else "SIN TIPO"
+
+def extraer_fecha(soup):
+    h2 = soup.find("h2")
+    if not h2:
+        return None
+    p_tag = h2.find_next_sibling("p")
+    if p_tag:
+        return parsear_fecha_texto(p_tag.get_text(strip=True))
+    return None
+
+def extraer_accion(texto):
+    match = RE_ACCION.search(texto)
+    return match.group(0).strip() if match else "SIN ACCIONES"
+
+def extraer_sucursal(texto):
+    for patron in PATRONES_SUCURSAL:
+        match = patron.search(texto)
+        if match:
+            return match.group(1).strip()
+    return None
+
+def clasificar_resultado(acciones):
+    return "Conforme" if RE_CONFORME.search(acciones) else "No conforme"
+
+def extraer_campos(html, parser=None, solo_contenido=True):
+    """Todos los campos de una página de normativa en un solo parseo"""
+    soup = crear_soup(html, parser, solo_contenido)
+    texto = soup.get_text()
+    acciones = extraer_accion(texto)
+    return {
+        'tipo': extraer_tipo(soup),
+        'fecha': extraer_fecha(soup),
+        'sucursal_extraida': extraer_sucursal(texto),
+        'acciones': acciones,
+        'resultado': clasificar_resultado(acciones)
+    }
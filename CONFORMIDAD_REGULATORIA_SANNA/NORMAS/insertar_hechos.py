@@ -1,4 +1,6 @@
+import sys
 import pyodbc
+from cubo_conformidad import refrescar_resumen
 
 # Configuración
 DB_CONFIG = {
@@ -19,34 +21,72 @@ try:
     cursor = conn.cursor()
     print("✅ Conexión exitosa a SQL Server")
 
-    # Obtener datos de la tabla Normativas
+    # Un hecho por normativa (migración 0011): MERGE por id_normativa desde Normativas.
+    # Volver a correr la carga solo inserta las normativas nuevas y actualiza las que
+    # cambiaron; las demás no se tocan y no cuentan como claves afectadas.
     cursor.execute("""
-        SELECT id_normativa, id_usuario, sucursal_id, fecha, resultado_normativa
-        FROM Normativas
+        MERGE Hechos_Conformidad_Sanitaria WITH (HOLDLOCK) AS destino
+        USING (
+            SELECT id_normativa, id_usuario, sucursal_id, fecha,
+                   1 AS total,
+                   CASE WHEN LOWER(resultado_normativa) = 'conforme' THEN 1 ELSE 0 END AS conformes,
+                   CASE WHEN LOWER(resultado_normativa) = 'no conforme' THEN 1 ELSE 0 END AS no_conformes
+            FROM Normativas
+        ) AS origen
+        ON destino.id_normativa = origen.id_normativa
+        WHEN MATCHED AND (
+            destino.sucursal_id <> origen.sucursal_id
+            OR destino.id_usuario <> origen.id_usuario
+            OR destino.fecha <> origen.fecha
+            OR destino.total_acciones_correctivas_conformes <> origen.conformes
+            OR destino.total_acciones_correctivas_noconformes <> origen.no_conformes
+        ) THEN UPDATE SET
+            sucursal_id = origen.sucursal_id,
+            id_usuario = origen.id_usuario,
+            fecha = origen.fecha,
+            total_acciones_correctivas = origen.total,
+            total_acciones_correctivas_conformes = origen.conformes,
+            total_acciones_correctivas_noconformes = origen.no_conformes
+        WHEN NOT MATCHED THEN
+            INSERT (sucursal_id, id_usuario, id_normativa, fecha,
+                    total_acciones_correctivas,
+                    total_acciones_correctivas_conformes,
+                    total_acciones_correctivas_noconformes)
+            VALUES (origen.sucursal_id, origen.id_usuario, origen.id_normativa, origen.fecha,
+                    origen.total, origen.conformes, origen.no_conformes)
+        OUTPUT $action, inserted.id_normativa,
+               inserted.sucursal_id, inserted.id_usuario, inserted.fecha,
+               deleted.sucursal_id, deleted.id_usuario, deleted.fecha;
     """)
-    filas = cursor.fetchall()
+    claves_afectadas = set()
+    acciones = []
+    for accion, id_normativa, sucursal_id, id_usuario, fecha, sucursal_prev, usuario_prev, fecha_prev in cursor.fetchall():
+        acciones.append(accion)
+        claves_afectadas.add((sucursal_id, id_usuario, fecha))
+        # Un hecho que cambió de sucursal, usuario o mes también resta de su celda anterior
+        if accion == 'UPDATE':
+            claves_afectadas.add((sucursal_prev, usuario_prev, fecha_prev))
+        print(f"✅ {'Insertado' if accion == 'INSERT' else 'Actualizado'}: {id_normativa}")
 
-    for fila in filas:
-        id_normativa, id_usuario, sucursal_id, fecha, resultado = fila
+    # Refrescar solo las celdas del resumen tocadas por esta carga
+    refrescar_resumen(cursor, claves_afectadas)
 
-        total = 1
-        conformes = 1 if resultado.lower() == "conforme" else 0
-        no_conformes = 1 if resultado.lower() == "no conforme" else 0
+    conn.commit()
 
+    # Comprimir los rowgroups abiertos del columnstore de hechos (migración 0002)
+    try:
+        conn.autocommit = True
         cursor.execute("""
-            INSERT INTO Hechos_Conformidad_Sanitaria (
-                sucursal_id, id_usuario, id_normativa, fecha,
-                total_acciones_correctivas,
-                total_acciones_correctivas_conformes,
-                total_acciones_correctivas_noconformes
-            ) VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (sucursal_id, id_usuario, id_normativa, fecha, total, conformes, no_conformes))
-
-        print(f"✅ Insertado: {id_normativa} - {resultado}")
-
-    conn.commit()
+            IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'NCCI_Hechos_Analitica')
+                ALTER INDEX NCCI_Hechos_Analitica ON Hechos_Conformidad_Sanitaria
+                REORGANIZE WITH (COMPRESS_ALL_ROW_GROUPS = ON)
+        """)
+    except Exception as e:
+        print(f"⚠️ No se pudo compactar el columnstore de hechos: {e}")
     conn.close()
-    print("🎉 Todos los registros insertados correctamente en Hechos_Conformidad_Sanitaria")
+    print(f"🎉 Hechos_Conformidad_Sanitaria: {acciones.count('INSERT')} nuevos, {acciones.count('UPDATE')} actualizados")
+    print(f"📊 Resumen_Conformidad actualizado ({len(claves_afectadas)} combinaciones)")
 
 except Exception as e:
     print(f"❌ Error: {e}")
+    sys.exit(1)
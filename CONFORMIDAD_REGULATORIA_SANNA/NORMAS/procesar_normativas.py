@@ -1,12 +1,14 @@
 import os
-import re
-import fitz  # PyMuPDF
-import pyodbc
+import sys
+import argparse
 import requests
-from bs4 import BeautifulSoup
-import unicodedata
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 import calendar
+from extraccion_normas import extraer_campos
+
+# normalizacion.py es compartido con MAPS y está en la carpeta superior
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from normalizacion import normalizar, normalizar_nombre
 
 # CONFIGURACIÓN DE CONEXIÓN
 DB_CONFIG = {
@@ -16,12 +18,17 @@ DB_CONFIG = {
     'driver': '{ODBC Driver 17 for SQL Server}'
 }
 
+# Carpeta donde se guarda el HTML descargado de cada normativa (NOR001.html, ...)
+CACHE_HTML = "html_normativas"
+
 class DatabaseManager:
     def __init__(self, config):
         self.config = config
         self.connection = None
 
     def connect(self):
+        # pyodbc solo hace falta para cargar: el pipeline se puede importar sin driver ODBC
+        import pyodbc
         connection_string = (
             f"DRIVER={self.config['driver']};"
             f"SERVER={self.config['server']};"
@@ -36,96 +43,53 @@ class DatabaseManager:
             self.connect()
         return self.connection
 
-# NORMALIZACIÓN
+class CatalogoSucursales:
+    """Nombres de Sucursales normalizados una sola vez para el emparejamiento"""
+
+    def __init__(self, filas):
+        # filas: iterable de (nombre, id) tal como vienen de la tabla Sucursales
+        self.sucursales_raw = []
+        self.sucursales_db = []
+        self.sucursal_ids = {}
+        for nombre_original, id_sucursal in filas:
+            nombre_norm = normalizar(nombre_original)
+            self.sucursales_raw.append(nombre_original)
+            self.sucursales_db.append(nombre_norm)
+            self.sucursal_ids[nombre_norm] = id_sucursal
 
-def normalizar(texto):
-    texto = texto.lower()
-    texto = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("utf-8")
-    texto = re.sub(r"[\\’'\"–\-/()\[\]]", " ", texto)
-    texto = re.sub(r"\s+", " ", texto)
-    return texto.strip()
+    def id_de(self, nombre):
+        return self.sucursal_ids.get(normalizar_nombre(nombre))
 
-def sucursal_mas_cercana(extraida):
-    extraida_norm = normalizar(extraida)
+def cargar_catalogo(cursor):
+    cursor.execute("SELECT nombre, id FROM Sucursales")
+    return CatalogoSucursales((row.nombre, row.id) for row in cursor.fetchall())
+
+def sucursal_mas_cercana(extraida, catalogo):
+    extraida_norm = normalizar_nombre(extraida)
     palabras_extraida = set(extraida_norm.split())
     mejor_match = None
     mejor_puntaje = 0
-    for original, normalizado in zip(sucursales_raw, sucursales_db):
+    for original, normalizado in zip(catalogo.sucursales_raw, catalogo.sucursales_db):
         palabras_sucursal = set(normalizado.split())
         comunes = palabras_extraida.intersection(palabras_sucursal)
         puntaje = len(comunes)
         if puntaje > mejor_puntaje:
             mejor_puntaje = puntaje
             mejor_match = original
-    if mejor_puntaje >= 2 or extraida_norm in sucursales_db:
+    if mejor_puntaje >= 2 or extraida_norm in catalogo.sucursales_db:
         return mejor_match
     return None
 
-def extraer_tipo(soup):
-    h2 = soup.find("h2")
-    return h2.get_text(strip=True) if h2 else "SIN TIPO"
-
-def extraer_fecha(soup):
-    h2 = soup.find("h2")
-    if not h2:
-        return None
-    p_tag = h2.find_next_sibling("p")
-    if p_tag:
-        texto = p_tag.get_text(strip=True)
-        meses = {
-            "enero": "January", "febrero": "February", "marzo": "March",
-            "abril": "April", "mayo": "May", "junio": "June",
-            "julio": "July", "agosto": "August", "setiembre": "September",
-            "septiembre": "September", "octubre": "October",
-            "noviembre": "November", "diciembre": "December"
-        }
-        for es, en in meses.items():
-            texto = texto.lower().replace(es, en)
-        try:
-            fecha = datetime.strptime(texto, "%d de %B de %Y")
-            return fecha
-        except Exception:
-            pass
-    return None
-
-def extraer_accion(html_text):
-    match = re.search(r"(Ot[óo]rguese|Decl[áa]rese|Autoriz[ae]|Enc[áa]rg[ue])[^.]{20,200}\.", html_text, re.IGNORECASE)
-    return match.group(0).strip() if match else "SIN ACCIONES"
-
-def extraer_sucursal(texto):
-    patrones = [
-        r'nombre comercial\s*[“"]?(SANNA[^”",\n]+)',
-        r'autorizaci[oó]n.*?a\s+(SANNA[^”",\n]+)',
-        r'(SANNA[^,.\n]{5,80})'
-    ]
-    for patron in patrones:
-        match = re.search(patron, texto, re.IGNORECASE)
-        if match:
-            return match.group(1).strip()
-    return None
-
-def insertar_tiempo(cursor, fecha):
-    try:
-        cursor.execute("SELECT id_tiempo FROM Tiempo WHERE fecha = ?", fecha)
-        row = cursor.fetchone()
-        if row:
-            return row[0]
-        año = fecha.year
-        mes = fecha.month
-        dia_año = fecha.timetuple().tm_yday
-        semana_año = int(fecha.strftime("%U"))
-        trimestre = (mes - 1) // 3 + 1
-        dia_semana = calendar.day_name[fecha.weekday()]
-        año_mes = f"{año}-{mes:02d}"
-        cursor.execute("""
-            INSERT INTO Tiempo (año_mes, dia_semana, trimestre, dia_año, semana_año, mes, año, fecha)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (año_mes, dia_semana, trimestre, dia_año, semana_año, mes, año, fecha))
-        cursor.execute("SELECT @@IDENTITY")
-        return int(cursor.fetchone()[0])
-    except Exception as ex:
-        print(f"Error insertando tiempo: {ex}")
-        return None
+def fila_tiempo(fecha):
+    """Columnas de Tiempo para una fecha, en el orden del INSERT"""
+    año = fecha.year
+    mes = fecha.month
+    dia_año = fecha.timetuple().tm_yday
+    semana_año = int(fecha.strftime("%U"))
+    trimestre = (mes - 1) // 3 + 1
+    dia_semana = calendar.day_name[fecha.weekday()]
+    año_mes = f"{año}-{mes:02d}"
+    return (año_mes, dia_semana, trimestre, dia_año, semana_año, mes, año, fecha)
 
 # RELACIÓN ID_USUARIO POR NOR
 mapa_usuarios = {
@@ -140,88 +104,254 @@ mapa_usuarios = {
     "NOR008": "PER004"
 }
 
-# CONEXIÓN
-
-db = DatabaseManager(DB_CONFIG)
-conn = db.get_connection()
-cursor = conn.cursor()
-
-cursor.execute("SELECT nombre, id FROM Sucursales")
-sucursales_raw = []
-sucursales_db = []
-sucursal_ids = {}
-for row in cursor.fetchall():
-    nombre_original = row.nombre
-    id_sucursal = row.id
-    sucursales_raw.append(nombre_original)
-    sucursales_db.append(normalizar(nombre_original))
-    sucursal_ids[normalizar(nombre_original)] = id_sucursal
-
-# URLs
-with open("urlnormas.txt", "r", encoding="utf-8") as f:
-    urls = [line.strip() for line in f.readlines()]
-
-for i, url in enumerate(urls):
-    nombre_pdf = f"NOR{str(i+1).zfill(3)}.pdf"
-    ruta_pdf = os.path.join("normativas", nombre_pdf)
-    print(f"\nProcesando {nombre_pdf} desde {url}")
-    try:
-        response = requests.get(url, timeout=10)
-        soup = BeautifulSoup(response.text, "html.parser")
-        html_text = soup.get_text()
-
-        tipo = extraer_tipo(soup)
-        print(f"Tipo extraído: {tipo}")
-
-        fecha = extraer_fecha(soup)
-        if fecha:
-            print(f"Fecha: {fecha.strftime('%d/%m/%Y')}")
-            tiempo_id = insertar_tiempo(cursor, fecha)
-        else:
-            print("⚠️ Fecha no encontrada.")
-            tiempo_id = None
-
-        sucursal_extraida = extraer_sucursal(html_text)
-        if sucursal_extraida:
-            print(f"Sucursal extraída: {sucursal_extraida}")
-            match = sucursal_mas_cercana(sucursal_extraida)
-            if match:
-                print(f"Coincidencia encontrada en lista: {match}")
-                sucursal_id = sucursal_ids.get(normalizar(match))
-            else:
-                print(f"No se encontró coincidencia válida para: {sucursal_extraida}")
-                sucursal_id = None
-        else:
-            print("⚠️ No se pudo extraer una sucursal del HTML")
-            sucursal_id = None
+# PIPELINE: descargar -> parsear -> emparejar -> cargar (cargar_lote)
+# Solo descargar y cargar tienen efectos (red / BD); parsear y emparejar son puros.
+
+def id_normativa_de(indice):
+    """NOR001, NOR002, ... según la posición (desde 0) en urlnormas.txt"""
+    return f"NOR{str(indice + 1).zfill(3)}"
+
+def leer_urls(ruta="urlnormas.txt"):
+    with open(ruta, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f.readlines() if line.strip()]
+
+def descargar(url, timeout=10):
+    response = requests.get(url, timeout=timeout)
+    response.raise_for_status()
+    return response.text
+
+def guardar_html(id_normativa, html, carpeta=CACHE_HTML):
+    os.makedirs(carpeta, exist_ok=True)
+    with open(os.path.join(carpeta, f"{id_normativa}.html"), "w", encoding="utf-8") as f:
+        f.write(html)
+
+def leer_html(id_normativa, carpeta=CACHE_HTML):
+    ruta = os.path.join(carpeta, f"{id_normativa}.html")
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, "r", encoding="utf-8") as f:
+        return f.read()
+
+def parsear(html, id_normativa, parser=None):
+    """HTML de gob.pe -> campos de la normativa (sin tocar BD ni red)"""
+    registro = extraer_campos(html, parser)
+    registro['id_normativa'] = id_normativa
+    registro['estado'] = "Activo"
+    return registro
+
+def emparejar(registro, catalogo, usuarios=mapa_usuarios):
+    """Completa sucursal_id e id_usuario a partir del catálogo de sucursales"""
+    registro = dict(registro)
+    registro['sucursal_match'] = None
+    registro['sucursal_id'] = None
+    if registro['sucursal_extraida']:
+        match = sucursal_mas_cercana(registro['sucursal_extraida'], catalogo)
+        if match:
+            registro['sucursal_match'] = match
+            registro['sucursal_id'] = catalogo.id_de(match)
+    registro['id_usuario'] = usuarios.get(registro['id_normativa'])
+    return registro
+
+def es_cargable(registro):
+    return bool(
+        registro['tipo'] != "SIN TIPO" and registro['sucursal_id']
+        and registro['fecha'] and registro['id_usuario']
+    )
+
+def procesar_documento(html, id_normativa, catalogo):
+    """parsear + emparejar para un documento"""
+    return emparejar(parsear(html, id_normativa), catalogo)
+
+def _procesar_documento_args(args):
+    return procesar_documento(*args)
+
+def procesar_lote(documentos, catalogo, workers=None):
+    """Procesa [(html, id_normativa), ...]; con workers > 1 usa un pool de procesos"""
+    documentos = list(documentos)
+    if not workers or workers <= 1:
+        return [procesar_documento(html, id_normativa, catalogo) for html, id_normativa in documentos]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        argumentos = [(html, id_normativa, catalogo) for html, id_normativa in documentos]
+        return list(pool.map(_procesar_documento_args, argumentos, chunksize=max(1, len(argumentos) // (workers * 4))))
+
+def cargar_lote(cursor, registros):
+    """Carga masiva: un MERGE por tabla sobre tablas temporales. No hace commit.
+
+    Las normativas ya existentes (mismo id_normativa) se actualizan, así que
+    volver a correr el proceso es idempotente. Retorna {'insert': n, 'update': m}.
+    """
+    # Última versión de cada id_normativa
+    lote = {r['id_normativa']: r for r in registros if es_cargable(r)}
+    if not lote:
+        return {'insert': 0, 'update': 0}
+
+    cursor.fast_executemany = True
+
+    # 1. Tiempo: solo las fechas que aún no existen
+    cursor.execute("IF OBJECT_ID('tempdb..#TiempoStage') IS NOT NULL DROP TABLE #TiempoStage")
+    cursor.execute("""
+        CREATE TABLE #TiempoStage (
+            año_mes NCHAR(61), dia_semana NCHAR(30), trimestre INT, dia_año INT,
+            semana_año INT, mes INT, año INT, fecha DATETIME PRIMARY KEY
+        )
+    """)
+    fechas = {r['fecha'] for r in lote.values()}
+    cursor.executemany("""
+        INSERT INTO #TiempoStage (año_mes, dia_semana, trimestre, dia_año, semana_año, mes, año, fecha)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, [fila_tiempo(fecha) for fecha in fechas])
+    cursor.execute("""
+        INSERT INTO Tiempo (año_mes, dia_semana, trimestre, dia_año, semana_año, mes, año, fecha)
+        SELECT s.año_mes, s.dia_semana, s.trimestre, s.dia_año, s.semana_año, s.mes, s.año, s.fecha
+        FROM #TiempoStage s
+        WHERE NOT EXISTS (SELECT 1 FROM Tiempo t WITH (UPDLOCK, HOLDLOCK) WHERE t.fecha = s.fecha)
+    """)
+
+    # 2. Normativas: MERGE por id_normativa
+    cursor.execute("IF OBJECT_ID('tempdb..#NormativasStage') IS NOT NULL DROP TABLE #NormativasStage")
+    cursor.execute("""
+        CREATE TABLE #NormativasStage (
+            id_normativa NVARCHAR(8) PRIMARY KEY,
+            tipo_normativa NVARCHAR(100),
+            estado_normativa NVARCHAR(50),
+            resultado_normativa NVARCHAR(100),
+            acciones_normativa NVARCHAR(300),
+            sucursal_id INT,
+            id_usuario NVARCHAR(8),
+            fecha DATETIME
+        )
+    """)
+    cursor.executemany("""
+        INSERT INTO #NormativasStage (
+            id_normativa, tipo_normativa, estado_normativa, resultado_normativa,
+            acciones_normativa, sucursal_id, id_usuario, fecha
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, [
+        (r['id_normativa'], r['tipo'], r['estado'], r['resultado'],
+         r['acciones'], r['sucursal_id'], r['id_usuario'], r['fecha'])
+        for r in lote.values()
+    ])
+    cursor.execute("""
+        MERGE Normativas WITH (HOLDLOCK) AS destino
+        USING (
+            SELECT s.*, t.id_tiempo
+            FROM #NormativasStage s
+            INNER JOIN Tiempo t ON t.fecha = s.fecha
+        ) AS origen
+        ON destino.id_normativa = origen.id_normativa
+        WHEN MATCHED THEN UPDATE SET
+            tipo_normativa = origen.tipo_normativa,
+            estado_normativa = origen.estado_normativa,
+            resultado_normativa = origen.resultado_normativa,
+            acciones_normativa = origen.acciones_normativa,
+            sucursal_id = origen.sucursal_id,
+            id_usuario = origen.id_usuario,
+            fecha = origen.fecha,
+            id_tiempo = origen.id_tiempo
+        WHEN NOT MATCHED THEN
+            INSERT (id_normativa, tipo_normativa, estado_normativa, resultado_normativa,
+                    acciones_normativa, sucursal_id, id_usuario, fecha, id_tiempo)
+            VALUES (origen.id_normativa, origen.tipo_normativa, origen.estado_normativa,
+                    origen.resultado_normativa, origen.acciones_normativa, origen.sucursal_id,
+                    origen.id_usuario, origen.fecha, origen.id_tiempo)
+        OUTPUT $action;
+    """)
+    acciones = [row[0] for row in cursor.fetchall()]
 
-        acciones = extraer_accion(html_text)
-        print(f"Acciones correctivas: {acciones}")
+    cursor.execute("DROP TABLE #NormativasStage")
+    cursor.execute("DROP TABLE #TiempoStage")
+    return {'insert': acciones.count('INSERT'), 'update': acciones.count('UPDATE')}
 
-        estado = "Activo"
-        resultado = "Conforme" if re.search(r"ot[oó]rg[ao]|autoriz[ao]", acciones, re.IGNORECASE) else "No conforme"
+def cargar(cursor, registro):
+    """Carga una sola normativa; retorna True si quedó en la BD"""
+    resultado = cargar_lote(cursor, [registro])
+    return resultado['insert'] + resultado['update'] > 0
 
-        id_normativa = nombre_pdf[:-4]
-        id_usuario = mapa_usuarios.get(id_normativa)
+def descargar_todo(urls, carpeta=CACHE_HTML):
+    """Etapa de descarga: guarda el HTML de cada URL para procesarlo después sin red.
 
-        if tipo != "SIN TIPO" and sucursal_id and tiempo_id and id_usuario:
-            cursor.execute("""
-                INSERT INTO Normativas (
-                id_normativa, tipo_normativa, estado_normativa,
-                resultado_normativa, acciones_normativa,
-                sucursal_id, id_usuario, fecha, id_tiempo
-            )VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (id_normativa, tipo, estado, resultado, acciones, sucursal_id, id_usuario, fecha, tiempo_id))
+    Retorna cuántas descargas fallaron.
+    """
+    fallidas = 0
+    for i, url in enumerate(urls):
+        id_normativa = id_normativa_de(i)
+        try:
+            guardar_html(id_normativa, descargar(url), carpeta)
+            print(f"✅ {id_normativa} descargada desde {url}")
+        except Exception as e:
+            fallidas += 1
+            print(f"❌ Error descargando {id_normativa}: {e}")
+    return fallidas
+
+def main(desde_cache=False, carpeta=CACHE_HTML):
+    """Retorna True si el lote se cargó y ninguna normativa falló al procesarse"""
+    db = DatabaseManager(DB_CONFIG)
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    catalogo = cargar_catalogo(cursor)
+
+    urls = leer_urls()
+    registros = []
+    errores = 0
+    for i, url in enumerate(urls):
+        id_normativa = id_normativa_de(i)
+        print(f"\nProcesando {id_normativa}.pdf desde {url}")
+        try:
+            html = leer_html(id_normativa, carpeta) if desde_cache else None
+            if html is None:
+                html = descargar(url)
+
+            registro = procesar_documento(html, id_normativa, catalogo)
+            print(f"Tipo extraído: {registro['tipo']}")
+
+            if registro['fecha']:
+                print(f"Fecha: {registro['fecha'].strftime('%d/%m/%Y')}")
+            else:
+                print("⚠️ Fecha no encontrada.")
 
+            if registro['sucursal_extraida']:
+                print(f"Sucursal extraída: {registro['sucursal_extraida']}")
+                if registro['sucursal_match']:
+                    print(f"Coincidencia encontrada en lista: {registro['sucursal_match']}")
+                else:
+                    print(f"No se encontró coincidencia válida para: {registro['sucursal_extraida']}")
+            else:
+                print("⚠️ No se pudo extraer una sucursal del HTML")
 
+            print(f"Acciones correctivas: {registro['acciones']}")
 
+            if es_cargable(registro):
+                registros.append(registro)
+                print(f"📦 Normativa {id_normativa} preparada para la carga con usuario {registro['id_usuario']}")
+            else:
+                print("⚠️ Normativa no insertada por datos incompletos")
 
-            conn.commit()
-            print(f"✅ Normativa {id_normativa} insertada correctamente con usuario {id_usuario}")
-        else:
-            print("⚠️ Normativa no insertada por datos incompletos")
+        except Exception as e:
+            errores += 1
+            print(f"❌ Error procesando {id_normativa}.pdf: {e}")
 
+    # Carga de todo el lote en una sola transacción
+    try:
+        resultado = cargar_lote(cursor, registros)
+        conn.commit()
+        print(f"\n✅ Normativas cargadas: {resultado['insert']} nuevas, {resultado['update']} actualizadas")
     except Exception as e:
-        print(f"❌ Error procesando {nombre_pdf}: {e}")
+        conn.rollback()
+        print(f"❌ Error en la carga de normativas (sin cambios en la BD): {e}")
+        errores += 1
+
+    conn.close()
+    return errores == 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ETL de normativas: descargar -> parsear -> emparejar -> cargar")
+    parser.add_argument("--solo-descarga", action="store_true", help="Solo descargar el HTML de urlnormas.txt a la caché (no usa la BD)")
+    parser.add_argument("--desde-cache", action="store_true", help="Usar el HTML descargado previamente cuando exista")
+    parser.add_argument("--cache", default=CACHE_HTML, help="Carpeta de la caché de HTML")
+    args = parser.parse_args()
 
-conn.close()
+    # Código de salida 1 si algo falló: ejecutar_etl.py no registra la etapa como terminada
+    if args.solo_descarga:
+        sys.exit(1 if descargar_todo(leer_urls(), args.cache) else 0)
+    else:
+        sys.exit(0 if main(desde_cache=args.desde_cache, carpeta=args.cache) else 1)
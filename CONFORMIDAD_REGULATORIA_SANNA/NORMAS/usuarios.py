@@ -1,3 +1,4 @@
+import sys
 import pyodbc
 
 # Configuración de conexión
@@ -39,15 +40,25 @@ try:
         apellido = capitalizar_nombre(apellido)
         tipo = capitalizar_tipo(tipo)
 
+        # MERGE por id_usuario: volver a ejecutar actualiza en lugar de chocar con la PK
         cursor.execute("""
-            INSERT INTO Usuarios (id_usuario, nombre_usuario, apellido_usuario, tipopersona_usuario)
-            VALUES (?, ?, ?, ?)
+            MERGE Usuarios WITH (HOLDLOCK) AS destino
+            USING (SELECT ? AS id_usuario, ? AS nombre_usuario, ? AS apellido_usuario, ? AS tipopersona_usuario) AS origen
+            ON destino.id_usuario = origen.id_usuario
+            WHEN MATCHED THEN UPDATE SET
+                nombre_usuario = origen.nombre_usuario,
+                apellido_usuario = origen.apellido_usuario,
+                tipopersona_usuario = origen.tipopersona_usuario
+            WHEN NOT MATCHED THEN
+                INSERT (id_usuario, nombre_usuario, apellido_usuario, tipopersona_usuario)
+                VALUES (origen.id_usuario, origen.nombre_usuario, origen.apellido_usuario, origen.tipopersona_usuario);
         """, (idu, nombre, apellido, tipo))
-        print(f"✅ Usuario {idu} insertado correctamente")
+        print(f"✅ Usuario {idu} cargado correctamente")
 
     conn.commit()
     conn.close()
-    print("✅ Todos los usuarios fueron insertados.")
+    print("✅ Todos los usuarios fueron cargados.")
 
 except Exception as e:
     print(f"❌ Error al insertar usuarios: {e}")
+    sys.exit(1)
@@ -0,0 +1,162 @@
+import random
+from datetime import datetime, timedelta
+
+# Vocabulario base con la forma de los datos reales (reseñas de Google Maps y normas de gob.pe)
+
+POSITIVAS = ['excelente', 'buena', 'bueno', 'amable', 'rápido', 'recomendado', 'profesional',
+             'limpio', 'atento', 'eficiente', 'puntual', 'cordial', 'agradable', 'genial']
+NEGATIVAS = ['pésimo', 'malo', 'mala', 'demora', 'lento', 'caro', 'sucio', 'grosero',
+             'malcriado', 'desorden', 'espera', 'horrible', 'falta', 'cobro']
+RELLENO = ['la', 'atención', 'en', 'el', 'centro', 'médico', 'de', 'muy', 'para', 'con', 'doctor',
+           'doctora', 'clínica', 'cita', 'emergencia', 'resultado', 'ecografía', 'personal',
+           'y', 'que', 'me', 'una', 'por', 'se', 'pero', 'no', 'todo', 'siempre', 'horas']
+SIGNOS = ['.', ',', '!', '?', ' 👍', ' 😡', '...', '']
+
+DISTRITOS = ['San Borja', 'Los Olivos', 'La Molina', 'Miraflores', 'Surco', 'San Isidro',
+             'Chorrillos', 'Independencia', 'Callao', 'San Miguel', 'Lince', 'Ate']
+TIPOS_SEDE = ['Clínica', 'Centro Médico', 'Sede', 'Policlínico', 'Centro de Salud']
+DIAS = ['lunes', 'martes', 'miércoles', 'jueves', 'viernes', 'sábado', 'domingo']
+HORARIOS = ['8\u202fa.\xa0m.–8\u202fp.\xa0m.', '7:15\u202fa.\xa0m.–1\u202fp.\xa0m.',
+            'Abierto las 24 horas', 'Cerrado', '8\u202fa.\xa0m.–1\u202fp.\xa0m., 3–8\u202fp.\xa0m.']
+FECHAS_REVIEW = ['Hace 7 meses', 'Hace una semana', 'Hace un año', 'Hace 3 años',
+                 'Fecha de edición: Hace 6 años', 'Hace 2 días', 'Hace un mes']
+MESES = ['enero', 'febrero', 'marzo', 'abril', 'mayo', 'junio', 'julio', 'agosto',
+         'setiembre', 'octubre', 'noviembre', 'diciembre']
+TIPOS_NORMA = ['Resolución Directoral', 'Resolución Administrativa', 'Resolución Jefatural']
+ACCIONES = ['Otórguese la autorización sanitaria de funcionamiento',
+            'Declárese improcedente la solicitud de autorización',
+            'Autorízase la renovación de la categoría del establecimiento',
+            'Encárguese a la Dirección de Fiscalización la verificación']
+
+
+def generar_lexico(n_palabras=300, semilla=42):
+    """PalabrasClave sintéticas: {palabra: {'peso', 'tipo', 'categoria'}} como load_palabras_clave"""
+    rnd = random.Random(semilla)
+    lexico = {}
+    for palabra in POSITIVAS:
+        lexico[palabra] = {'peso': round(rnd.uniform(0.3, 1.0), 2), 'tipo': 'servicio', 'categoria': 'Positivo'}
+    for palabra in NEGATIVAS:
+        lexico[palabra] = {'peso': round(rnd.uniform(-1.0, -0.3), 2), 'tipo': 'servicio', 'categoria': 'Negativo'}
+    i = 0
+    while len(lexico) < n_palabras:
+        peso = round(rnd.uniform(-1.0, 1.0), 2)
+        categoria = 'Positivo' if peso > 0.2 else 'Negativo' if peso < -0.2 else 'Neutral'
+        lexico[f"termino{i}"] = {'peso': peso, 'tipo': 'general', 'categoria': categoria}
+        i += 1
+    return lexico
+
+
+def generar_texto_review(rnd, lexico_palabras, min_palabras=4, max_palabras=60):
+    palabras = []
+    for _ in range(rnd.randint(min_palabras, max_palabras)):
+        if rnd.random() < 0.2:
+            palabras.append(rnd.choice(lexico_palabras))
+        else:
+            palabras.append(rnd.choice(RELLENO))
+        if rnd.random() < 0.1:
+            palabras[-1] += rnd.choice(SIGNOS)
+    texto = ' '.join(palabras)
+    return texto[0].upper() + texto[1:]
+
+
+def generar_reviews(n, lexico=None, semilla=42):
+    """Reseñas con la forma de scrape_google_maps (rating/likes como texto)"""
+    rnd = random.Random(semilla)
+    palabras = list(lexico or generar_lexico(semilla=semilla))
+    reviews = []
+    for i in range(n):
+        reviews.append({
+            'author': f"Usuario {rnd.randint(1, 10 ** 6)}",
+            'rating': str(rnd.randint(1, 5)),
+            'date': rnd.choice(FECHAS_REVIEW),
+            'text': generar_texto_review(rnd, palabras) if rnd.random() > 0.05 else '',
+            'photos': rnd.choice([0, 0, 0, 1, 3]),
+            'likes': str(rnd.choice([0, 0, 1, 2, 10]))
+        })
+    return reviews
+
+
+def nombre_sucursal(rnd, i):
+    return f"{rnd.choice(TIPOS_SEDE)} SANNA {rnd.choice(DISTRITOS)} {i}"
+
+
+def generar_sucursales(n, reviews_por_sucursal=200, lexico=None, semilla=42):
+    """Resultados completos de scrape_google_maps (sucursal + horarios + reseñas)"""
+    rnd = random.Random(semilla)
+    sucursales = []
+    for i in range(n):
+        nombre = nombre_sucursal(rnd, i)
+        sucursales.append({
+            'url': f"https://www.google.com/maps/place/sintetica-{semilla}-{i}",
+            'nombre': nombre,
+            'ubicacion': f"Av. Sintética {rnd.randint(100, 9999)}, {rnd.choice(DISTRITOS)} 15{rnd.randint(0, 999):03d}",
+            'rating_global': f"{rnd.uniform(3.0, 5.0):.1f}",
+            'total_reviews': str(reviews_por_sucursal),
+            'info_adicional': {
+                'horarios': [{'dia': dia, 'horas': rnd.choice(HORARIOS)} for dia in DIAS],
+                'sitio_web': 'sanna.pe',
+                'telefono': f"9{rnd.randint(10, 99)} {rnd.randint(100, 999)} {rnd.randint(100, 999)}",
+                'referencia': f"{rnd.randint(2, 9)}W{rnd.randint(2, 9)}H+{rnd.randint(10, 99)} {rnd.choice(DISTRITOS)}"
+            },
+            'reviews': generar_reviews(reviews_por_sucursal, lexico, semilla=semilla * 1000 + i)
+        })
+    return sucursales
+
+
+def generar_catalogo(n, semilla=42):
+    """Filas (nombre, id) de la tabla Sucursales para CatalogoSucursales"""
+    rnd = random.Random(semilla)
+    return [(nombre_sucursal(rnd, i), i + 1) for i in range(n)]
+
+
+def variantes_nombre(catalogo, n, semilla=42):
+    """Nombres como vienen en las normas: mayúsculas, sin tildes, guiones o con ruido"""
+    rnd = random.Random(semilla)
+    variantes = []
+    for _ in range(n):
+        nombre = rnd.choice(catalogo)[0]
+        opcion = rnd.random()
+        if opcion < 0.3:
+            nombre = nombre.upper()
+        elif opcion < 0.5:
+            nombre = nombre.replace('í', 'i').replace('é', 'e').replace(' ', ' - ', 1)
+        elif opcion < 0.7:
+            nombre = f"{nombre} S.A.C. (sede {rnd.choice(DISTRITOS)})"
+        elif opcion < 0.8:
+            nombre = f"SANNA Desconocida {rnd.randint(1, 999)}"
+        variantes.append(nombre)
+    return variantes
+
+
+def generar_pagina_norma(rnd, nombre_sucursal_norma, fecha):
+    """HTML con la estructura de una norma en gob.pe (título, fecha y cuerpo dentro de <main>)"""
+    tipo = rnd.choice(TIPOS_NORMA)
+    accion = rnd.choice(ACCIONES)
+    fecha_texto = f"{fecha.day:02d} de {MESES[fecha.month - 1]} de {fecha.year}"
+    relleno = ' '.join(rnd.choice(RELLENO) for _ in range(rnd.randint(80, 300)))
+    menu = ''.join(f'<li><a href="/institucion/{i}">Enlace {i}</a></li>' for i in range(60))
+    return f"""<!DOCTYPE html>
+<html lang="es"><head><meta charset="utf-8"><title>{tipo} - Gobierno del Perú</title></head>
+<body>
+<header><nav><ul>{menu}</ul></nav></header>
+<main>
+<h1>Normas legales</h1>
+<h2>{tipo} N.° {rnd.randint(1, 999):03d}-{fecha.year}-DIRIS-LC</h2>
+<p>{fecha_texto}</p>
+<div class="contenido">
+<p>VISTO: el expediente presentado por la empresa con nombre comercial “{nombre_sucursal_norma}”, {relleno}.</p>
+<p>SE RESUELVE: Artículo 1.- {accion} al establecimiento de salud con nombre comercial “{nombre_sucursal_norma}”, ubicado en el distrito de {rnd.choice(DISTRITOS)}.</p>
+</div>
+</main>
+<footer>{menu}</footer>
+</body></html>"""
+
+
+def generar_paginas_norma(n, catalogo=None, semilla=42):
+    rnd = random.Random(semilla)
+    catalogo = catalogo or generar_catalogo(max(10, n // 5), semilla)
+    inicio = datetime(2020, 1, 1)
+    return [
+        generar_pagina_norma(rnd, rnd.choice(catalogo)[0], inicio + timedelta(days=rnd.randint(0, 2000)))
+        for _ in range(n)
+    ]
@@ -0,0 +1,412 @@
+import os
+import io
+import sys
+import json
+import time
+import glob
+import random
+import argparse
+import platform
+import tracemalloc
+import importlib.util
+from contextlib import redirect_stdout
+from datetime import datetime
+
+import datos_sinteticos
+import sqlite_standin
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAPS = os.path.join(BASE, 'MAPS')
+NORMAS = os.path.join(BASE, 'NORMAS')
+
+
+class Caso:
+    """Un benchmark: `funcion(entrada)` procesa `items` elementos.
+
+    preparar() (opcional) se ejecuta antes de cada repetición, fuera de la
+    medición, y su retorno es la entrada de la función.
+    """
+
+    def __init__(self, grupo, nombre, funcion, items, preparar=None):
+        self.grupo = grupo
+        self.nombre = nombre
+        self.funcion = funcion
+        self.items = items
+        self.preparar = preparar or (lambda: None)
+
+
+def _silencioso(funcion, entrada):
+    # Los métodos del proyecto imprimen por cada fila; la salida no se mide en consola
+    with redirect_stdout(io.StringIO()):
+        return funcion(entrada)
+
+
+def medir(caso, repeticiones):
+    _silencioso(caso.funcion, caso.preparar())  # calentamiento
+    tiempos = []
+    for _ in range(repeticiones):
+        entrada = caso.preparar()
+        inicio = time.perf_counter()
+        _silencioso(caso.funcion, entrada)
+        tiempos.append(time.perf_counter() - inicio)
+
+    # Memoria en una corrida aparte: tracemalloc distorsiona los tiempos
+    entrada = caso.preparar()
+    tracemalloc.start()
+    _silencioso(caso.funcion, entrada)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    mejor = min(tiempos)
+    return {
+        'grupo': caso.grupo,
+        'nombre': caso.nombre,
+        'items': caso.items,
+        'repeticiones': repeticiones,
+        'mejor_s': round(mejor, 6),
+        'media_s': round(sum(tiempos) / len(tiempos), 6),
+        'items_por_s': round(caso.items / mejor, 1) if mejor else None,
+        'memoria_pico_kib': round(pico / 1024, 1)
+    }
+
+
+def cargar_big_data_maps():
+    """Big-Data-Maps.py no se puede importar por nombre (guion): se carga por ruta"""
+    sys.path.insert(0, MAPS)
+    spec = importlib.util.spec_from_file_location('big_data_maps', os.path.join(MAPS, 'Big-Data-Maps.py'))
+    modulo = importlib.util.module_from_spec(spec)
+    with redirect_stdout(io.StringIO()):
+        spec.loader.exec_module(modulo)
+    return modulo
+
+
+def crear_analizador(maps, conexion, modo='ensemble'):
+    """SentimentAnalyzer sin cargar spaCy (no participa en el cálculo del puntaje)"""
+    db = sqlite_standin.conectar(maps.DatabaseManager({}), conexion)
+    analizador = maps.SentimentAnalyzer.__new__(maps.SentimentAnalyzer)
+    analizador.db = db
+    analizador.modo = modo
+    analizador.vader_analyzer = None
+    if modo == 'ensemble':
+        try:
+            analizador.vader_analyzer = maps.SentimentIntensityAnalyzer()
+        except Exception:
+            analizador.vader_analyzer = None
+    analizador.nlp = None
+    analizador.stop_words = set()
+    with redirect_stdout(io.StringIO()):
+        analizador.palabras_clave = analizador.load_palabras_clave()
+    analizador.lexicon = maps.SpanishLexiconScorer(analizador.palabras_clave)
+    analizador.lexicon_content = maps.lexicon_content(modo, analizador.palabras_clave, analizador.lexicon)
+    analizador.lexicon_version = maps.lexicon_version(analizador.lexicon_content)
+    return analizador
+
+
+def reviews_reales():
+    """Textos de las reseñas reales guardadas en MAPS/info-*.json"""
+    textos = []
+    for ruta in sorted(glob.glob(os.path.join(MAPS, 'info-*.json'))):
+        with open(ruta, 'r', encoding='utf-8') as f:
+            textos += [r['text'] for r in json.load(f).get('reviews', []) if r.get('text')]
+    return textos
+
+
+def concordancia_sentimiento(datos):
+    """Modo léxico frente al ensemble: % de reseñas con la misma categoría y diferencia media de puntaje"""
+    maps = cargar_big_data_maps()
+    conexion = sqlite_standin.crear_bd(lexico=datos['lexico'])
+    ensemble = crear_analizador(maps, conexion)
+    lexico = crear_analizador(maps, conexion, 'lexico')
+    conjuntos = {
+        'sinteticas': [r['text'] for r in datos['reviews'] if r['text']],
+        'reales': reviews_reales(),
+    }
+    resultado = {'ensemble_con_vader': ensemble.vader_analyzer is not None}
+    for nombre, textos in conjuntos.items():
+        if not textos:
+            continue
+        iguales = 0
+        diferencia = 0.0
+        for i, texto in enumerate(textos):
+            a = ensemble.analyze_review_sentiment(texto, i)
+            b = lexico.analyze_review_sentiment(texto, i)
+            iguales += a['categoria_emocional_id'] == b['categoria_emocional_id']
+            diferencia += abs(a['puntuacion_sentimiento'] - b['puntuacion_sentimiento'])
+        resultado[nombre] = {
+            'reviews': len(textos),
+            'misma_categoria_pct': round(100.0 * iguales / len(textos), 1),
+            'diferencia_media_puntaje': round(diferencia / len(textos), 4)
+        }
+    return resultado
+
+
+def casos_maps(datos):
+    try:
+        maps = cargar_big_data_maps()
+    except Exception as e:
+        print(f"⚠️ Benchmarks de MAPS omitidos: no se pudo cargar Big-Data-Maps.py ({str(e)})")
+        return []
+
+    lexico = datos['lexico']
+    textos = [r['text'] for r in datos['reviews'] if r['text']]
+    conexion = sqlite_standin.crear_bd(lexico=lexico)
+    analizador = crear_analizador(maps, conexion)
+    if analizador.vader_analyzer is None:
+        print("ℹ️ VADER/TextBlob no instalados: analyze_review_sentiment mide solo limpieza y palabras clave")
+    limpios = [analizador.clean_text(t) for t in textos]
+
+    analizador_lexico = crear_analizador(maps, conexion, 'lexico')
+    # Los escritores reciben Branch, como los entrega scrape_google_maps
+    sucursales = [maps.Branch.from_dict(s) for s in datos['sucursales']]
+
+    casos = [
+        Caso('sentimiento', 'clean_text', lambda _: [analizador.clean_text(t) for t in textos], len(textos)),
+        Caso('sentimiento', 'analyze_custom_keywords',
+             lambda _: [analizador.analyze_custom_keywords(t) for t in limpios], len(limpios)),
+        Caso('sentimiento', 'analyze_review_sentiment',
+             lambda _: [analizador.analyze_review_sentiment(t, i) for i, t in enumerate(textos)], len(textos)),
+        Caso('sentimiento', 'analyze_review_sentiment (modo léxico)',
+             lambda _: [analizador_lexico.analyze_review_sentiment(t, i) for i, t in enumerate(textos)], len(textos)),
+    ]
+
+    # BD con sucursales, reseñas y análisis para calculate_emotional_metrics
+    db_metricas = sqlite_standin.conectar(maps.DatabaseManager({}), conexion)
+    with redirect_stdout(io.StringIO()):
+        ids = [db_metricas.save_complete_data_bulk(s) for s in sucursales]
+        cursor = conexion.cursor()
+        cursor.execute("SELECT id, texto FROM Reviews WHERE texto <> ''")
+        for review_id, texto in cursor.fetchall():
+            analizador.save_sentiment_analysis(analizador.analyze_review_sentiment(texto, review_id))
+    casos.append(Caso('sentimiento', 'calculate_emotional_metrics',
+                      lambda _: [analizador.calculate_emotional_metrics(i) for i in ids], len(ids)))
+
+    # Horarios: parseo a intervalos y consultas "abiertas a las T" sobre el índice en memoria
+    import opening_hours
+    horarios = [s.horarios for s in sucursales]
+    intervalos = [(n, i, f) for n, h in enumerate(horarios * 20) for i, f in opening_hours.week_intervals(h)]
+    indice = opening_hours.OpeningHoursIndex(intervalos)
+    minutos = list(range(0, opening_hours.MINUTOS_SEMANA, 7))
+
+    def parsear_horarios(_):
+        opening_hours.parse_hours.cache_clear()
+        return [opening_hours.week_intervals(h) for h in horarios]
+
+    casos += [
+        Caso('horarios', 'week_intervals', parsear_horarios, len(horarios)),
+        Caso('horarios', f'open_at ({len(horarios) * 20} sucursales)',
+             lambda _: [indice.open_at(m) for m in minutos], len(minutos)),
+        Caso('horarios', 'open_during (2 horas)',
+             lambda _: [indice.open_during(m, m + 120) for m in minutos], len(minutos)),
+    ]
+
+    # Ubicación: Plus Codes de `referencia` y cercanía sobre el KD-tree en memoria
+    # (1000 sucursales repartidas por Perú, consultas dentro de Lima)
+    import plus_codes
+    referencias = [(s.referencia, s.ubicacion) for s in sucursales]
+    rnd = random.Random(42)
+    ubicaciones = [(n, rnd.uniform(-18.0, -3.5), rnd.uniform(-81.3, -69.0)) for n in range(1000)]
+    indice_geo = plus_codes.BranchLocationIndex(ubicaciones)
+    puntos = [(rnd.uniform(-12.3, -11.8), rnd.uniform(-77.15, -76.85)) for _ in range(500)]
+
+    def decodificar(_):
+        plus_codes.decode_reference.cache_clear()
+        return [plus_codes.decode_reference(r, u) for r, u in referencias]
+
+    casos += [
+        Caso('ubicacion', 'decode_reference', decodificar, len(referencias)),
+        Caso('ubicacion', f'nearest 5 ({len(ubicaciones)} sucursales)',
+             lambda _: [indice_geo.nearest(lat, lon, 5) for lat, lon in puntos], len(puntos)),
+        Caso('ubicacion', 'within 100 km',
+             lambda _: [indice_geo.within(lat, lon, 100) for lat, lon in puntos], len(puntos)),
+    ]
+
+    # Escritores de BD: BD nueva en cada repetición
+    filas = sum(len(s.reviews) + len(s.horarios) + 2 for s in sucursales)
+
+    def bd_nueva():
+        return sqlite_standin.conectar(maps.DatabaseManager({}), sqlite_standin.crear_bd())
+
+    def bd_cargada():
+        db = bd_nueva()
+        with redirect_stdout(io.StringIO()):
+            db.save_many_bulk(sucursales)
+        return db
+
+    # Casi-duplicados: índice MinHash/LSH por sucursal (lo que hace el escritor en cada recarga)
+    import near_duplicates
+
+    def indexar_duplicados(_):
+        for s in sucursales:
+            indice = near_duplicates.NearDuplicateIndex()
+            for n, r in enumerate(s.reviews):
+                indice.find_or_add(n, r.author, r.rating, r.text)
+
+    casos += [
+        Caso('duplicados', 'NearDuplicateIndex.find_or_add', indexar_duplicados,
+             sum(len(s.reviews) for s in sucursales)),
+        Caso('bd', 'save_complete_data (fila por fila)',
+             lambda db: [db.save_complete_data(s) for s in sucursales], filas, bd_nueva),
+        Caso('bd', 'save_complete_data_bulk',
+             lambda db: [db.save_complete_data_bulk(s) for s in sucursales], filas, bd_nueva),
+        Caso('bd', 'save_many_bulk',
+             lambda db: db.save_many_bulk(sucursales), filas, bd_nueva),
+        Caso('bd', 'save_many_bulk (recarga: une duplicados)',
+             lambda db: db.save_many_bulk(sucursales), filas, bd_cargada),
+    ]
+    casos.append(Caso('registros', 'Branch.from_dict', lambda _: [maps.Branch.from_dict(s) for s in datos['sucursales']],
+                      sum(len(s.reviews) for s in sucursales)))
+    return casos
+
+
+def memoria_registros(datos):
+    """Memoria retenida por las sucursales como dicts de JSON frente a Branch/Review con __slots__"""
+    sys.path.insert(0, MAPS)
+    from records import Branch
+    texto = json.dumps(datos['sucursales'], ensure_ascii=False)
+    reviews = sum(len(s['reviews']) for s in datos['sucursales'])
+
+    def retenida(construir):
+        tracemalloc.start()
+        objeto = construir()
+        bytes_retenidos = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del objeto
+        return bytes_retenidos
+
+    # Los textos se comparten en ambos casos: la diferencia es el contenedor de cada registro
+    como_dict = retenida(lambda: json.loads(texto))
+    como_registro = retenida(lambda: [Branch.from_dict(s) for s in json.loads(texto)])
+    return {
+        'reviews': reviews,
+        'dict_kib': round(como_dict / 1024, 1),
+        'registros_kib': round(como_registro / 1024, 1),
+        'bytes_por_review_dict': round(como_dict / reviews),
+        'bytes_por_review_registros': round(como_registro / reviews),
+    }
+
+
+def casos_normas(datos):
+    sys.path.insert(0, NORMAS)
+    casos = []
+    try:
+        import extraccion_normas as ext
+    except ImportError as e:
+        print(f"⚠️ Benchmarks de extractores omitidos ({str(e)})")
+        ext = None
+
+    if ext is not None:
+        paginas = datos['paginas']
+        soups = [ext.crear_soup(html) for html in paginas]
+        textos = [soup.get_text() for soup in soups]
+        fechas = [f"{d:02d} de {m} de 2024" for d, m in zip(range(1, 29), datos_sinteticos.MESES * 3)]
+        casos += [
+            Caso('normas', f'extraer_campos ({ext.PARSER})',
+                 lambda _: [ext.extraer_campos(h) for h in paginas], len(paginas)),
+            Caso('normas', 'extraer_campos (página completa)',
+                 lambda _: [ext.extraer_campos(h, solo_contenido=False) for h in paginas], len(paginas)),
+            Caso('normas', 'extraer_tipo + extraer_fecha',
+                 lambda _: [(ext.extraer_tipo(s), ext.extraer_fecha(s)) for s in soups], len(soups)),
+            Caso('normas', 'extraer_sucursal + extraer_accion',
+                 lambda _: [(ext.extraer_sucursal(t), ext.extraer_accion(t)) for t in textos], len(textos)),
+            Caso('normas', 'parsear_fecha_texto',
+                 lambda _: [ext.parsear_fecha_texto(f) for f in fechas * 10], len(fechas) * 10),
+        ]
+
+    try:
+        import procesar_normativas as pn
+    except Exception as e:
+        print(f"⚠️ Benchmarks de normalizar/sucursal_mas_cercana omitidos: {str(e)}")
+        return casos
+
+    catalogo = pn.CatalogoSucursales(datos['catalogo'])
+    consultas = datos['variantes']
+    casos += [
+        Caso('normas', 'normalizar', lambda _: [pn.normalizar(n) for n in consultas], len(consultas)),
+        Caso('normas', f'sucursal_mas_cercana ({len(datos["catalogo"])} sucursales)',
+             lambda _: [pn.sucursal_mas_cercana(n, catalogo) for n in consultas], len(consultas)),
+    ]
+    return casos
+
+
+def generar_datos(escala, semilla):
+    lexico = datos_sinteticos.generar_lexico(300 * escala, semilla)
+    catalogo = datos_sinteticos.generar_catalogo(100 * escala, semilla)
+    return {
+        'lexico': lexico,
+        'reviews': datos_sinteticos.generar_reviews(1000 * escala, lexico, semilla),
+        'sucursales': datos_sinteticos.generar_sucursales(5 * escala, 200, lexico, semilla),
+        'catalogo': catalogo,
+        'variantes': datos_sinteticos.variantes_nombre(catalogo, 1000 * escala, semilla),
+        'paginas': datos_sinteticos.generar_paginas_norma(50 * escala, catalogo, semilla),
+    }
+
+
+def main(escala=1, repeticiones=5, semilla=42, filtro=None, salida=None):
+    print(f"🧪 Generando datos sintéticos (escala {escala}, semilla {semilla})")
+    datos = generar_datos(escala, semilla)
+    casos = casos_maps(datos) + casos_normas(datos)
+    if filtro:
+        casos = [c for c in casos if filtro.lower() in f"{c.grupo}.{c.nombre}".lower()]
+
+    resultados = []
+    print(f"\n{'caso':<52}{'items':>8}{'mejor (ms)':>12}{'items/s':>12}{'memoria KiB':>13}")
+    print("-" * 97)
+    for caso in casos:
+        try:
+            r = medir(caso, repeticiones)
+        except Exception as e:
+            print(f"❌ {caso.grupo}.{caso.nombre}: {str(e)}")
+            continue
+        resultados.append(r)
+        print(f"{caso.grupo + '.' + caso.nombre:<52}{r['items']:>8}{r['mejor_s'] * 1000:>12.2f}"
+              f"{r['items_por_s']:>12.0f}{r['memoria_pico_kib']:>13.1f}")
+
+    concordancia = None
+    if not filtro or filtro.lower() in 'sentimiento':
+        try:
+            concordancia = concordancia_sentimiento(datos)
+            print(f"\n🔁 Modo léxico vs. ensemble{'' if concordancia['ensemble_con_vader'] else ' (sin VADER/TextBlob instalados)'}:")
+            for nombre in ('sinteticas', 'reales'):
+                if nombre in concordancia:
+                    c = concordancia[nombre]
+                    print(f"   {nombre}: {c['misma_categoria_pct']}% misma categoría, "
+                          f"diferencia media de puntaje {c['diferencia_media_puntaje']} ({c['reviews']} reseñas)")
+        except Exception as e:
+            print(f"⚠️ Concordancia de sentimiento omitida: {str(e)}")
+
+    memoria = None
+    if not filtro or filtro.lower() in 'registros':
+        try:
+            memoria = memoria_registros(datos)
+            print(f"\n📦 Memoria de {memoria['reviews']} reseñas: dicts {memoria['dict_kib']} KiB "
+                  f"({memoria['bytes_por_review_dict']} B/reseña), Branch/Review {memoria['registros_kib']} KiB "
+                  f"({memoria['bytes_por_review_registros']} B/reseña)")
+        except Exception as e:
+            print(f"⚠️ Medición de memoria de registros omitida: {str(e)}")
+
+    reporte = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'escala': escala,
+        'semilla': semilla,
+        'resultados': resultados,
+        'concordancia_sentimiento': concordancia,
+        'memoria_registros': memoria
+    }
+    if salida:
+        with open(salida, 'w', encoding='utf-8') as f:
+            json.dump(reporte, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Resultados guardados en {salida}")
+    return reporte
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks de las rutas críticas del ETL con datos sintéticos")
+    parser.add_argument('--escala', type=int, default=1, help="Multiplicador del volumen de datos sintéticos")
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--filtro', default=None, help="Solo los casos cuyo nombre contenga este texto")
+    parser.add_argument('--salida', default=None, metavar='JSON', help="Guardar los resultados (p. ej. para comparar entre versiones)")
+    args = parser.parse_args()
+    main(args.escala, args.repeticiones, args.semilla, args.filtro, args.salida)
@@ -0,0 +1,137 @@
+import os
+import re
+import sys
+import time
+import argparse
+from datetime import datetime
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NORMAS = os.path.join(BASE, 'NORMAS')
+sys.path.insert(0, NORMAS)
+
+import extraccion_normas as ext
+
+# Extractores de normativas sobre los documentos guardados (NORMAS/normativas/*.pdf y
+# NORMAS/html_normativas/*.html): implementación anterior vs motor precompilado, y el
+# parseo solo de <main> contra la página completa (tiempo y campos extraídos).
+
+
+def _fecha_anterior(texto):
+    # Implementación previa, solo como referencia
+    meses = {
+        "enero": "January", "febrero": "February", "marzo": "March",
+        "abril": "April", "mayo": "May", "junio": "June",
+        "julio": "July", "agosto": "August", "setiembre": "September",
+        "septiembre": "September", "octubre": "October",
+        "noviembre": "November", "diciembre": "December"
+    }
+    for es, en in meses.items():
+        texto = texto.lower().replace(es, en)
+    try:
+        return datetime.strptime(texto, "%d de %B de %Y")
+    except Exception:
+        return None
+
+
+def _sucursal_anterior(texto):
+    patrones = [
+        r'nombre comercial\s*[“"]?(SANNA[^”",\n]+)',
+        r'autorizaci[oó]n.*?a\s+(SANNA[^”",\n]+)',
+        r'(SANNA[^,.\n]{5,80})'
+    ]
+    for patron in patrones:
+        re.purge()  # sin caché de re, como al compilar en cada llamada
+        match = re.search(patron, texto, re.IGNORECASE)
+        if match:
+            return match.group(1).strip()
+    return None
+
+
+def _medir(funcion, entradas, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for entrada in entradas:
+            funcion(entrada)
+    total = time.perf_counter() - inicio
+    return total / (repeticiones * len(entradas)) * 1e6
+
+
+def textos_pdf(carpeta=os.path.join(NORMAS, "normativas")):
+    import fitz  # PyMuPDF
+    textos = []
+    for nombre in sorted(os.listdir(carpeta)):
+        if nombre.lower().endswith(".pdf"):
+            with fitz.open(os.path.join(carpeta, nombre)) as doc:
+                textos.append("".join(pagina.get_text() for pagina in doc))
+    return textos
+
+
+def htmls_guardados(carpeta=os.path.join(NORMAS, "html_normativas")):
+    if not os.path.isdir(carpeta):
+        return []
+    htmls = []
+    for nombre in sorted(os.listdir(carpeta)):
+        if nombre.endswith(".html"):
+            with open(os.path.join(carpeta, nombre), "r", encoding="utf-8") as f:
+                htmls.append((nombre, f.read()))
+    return htmls
+
+
+def comparar_contenido(htmls):
+    """Páginas cuyos campos cambian al parsear solo <main>: [(archivo, campo, completa, main)]"""
+    diferencias = []
+    for nombre, html in htmls:
+        completa = ext.extraer_campos(html, solo_contenido=False)
+        contenido = ext.extraer_campos(html)
+        for campo in completa:
+            if completa[campo] != contenido[campo]:
+                diferencias.append((nombre, campo, completa[campo], contenido[campo]))
+    return diferencias
+
+
+def benchmark(repeticiones=200):
+    try:
+        textos = textos_pdf()
+    except ImportError as e:
+        print(f"⚠️ Extractores sobre PDF omitidos ({str(e)})")
+        textos = []
+    print(f"📄 {len(textos)} normativas PDF cargadas")
+    fechas = [m.group(0) for m in (ext.RE_FECHA.search(t) for t in textos) if m]
+
+    casos = [
+        ("fecha (anterior)", _fecha_anterior, fechas),
+        ("fecha (motor)", ext.parsear_fecha_texto, fechas),
+        ("sucursal (anterior)", _sucursal_anterior, textos),
+        ("sucursal (motor)", ext.extraer_sucursal, textos),
+        ("accion (motor)", ext.extraer_accion, textos),
+    ]
+    for nombre, funcion, entradas in casos:
+        if entradas:
+            print(f"   • {nombre:<22} {_medir(funcion, entradas, repeticiones):10.1f} µs/doc")
+
+    htmls = htmls_guardados()
+    if not htmls:
+        print("ℹ️ Sin HTML en caché (python procesar_normativas.py --solo-descarga)")
+        return
+
+    print(f"🌐 {len(htmls)} páginas HTML en caché")
+    paginas = [html for _, html in htmls]
+    parsers = ["html.parser"] + (["lxml"] if ext.PARSER == "lxml" else [])
+    for parser in parsers:
+        for solo_contenido in (False, True):
+            etiqueta = f"{parser}{' + contenido' if solo_contenido else ''}"
+            tiempo = _medir(lambda h: ext.extraer_campos(h, parser, solo_contenido), paginas, max(1, repeticiones // 20))
+            print(f"   • {etiqueta:<22} {tiempo:10.1f} µs/doc")
+
+    diferencias = comparar_contenido(htmls)
+    if not diferencias:
+        print(f"✅ Mismos campos con <main> y con la página completa en las {len(htmls)} páginas")
+    for nombre, campo, completa, contenido in diferencias:
+        print(f"⚠️ {nombre} {campo}: página completa {completa!r} / <main> {contenido!r}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de los extractores de normativas sobre los documentos guardados")
+    parser.add_argument("--repeticiones", type=int, default=200)
+    args = parser.parse_args()
+    benchmark(args.repeticiones)
@@ -0,0 +1,229 @@
+import re
+import sqlite3
+from datetime import datetime
+
+# Esquema de Conformidad_Regulatoria_Final.sql (tablas de MAPS) traducido a SQLite
+ESQUEMA = """
+CREATE TABLE Sucursales (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL UNIQUE,
+    nombre TEXT NOT NULL,
+    ubicacion TEXT,
+    sitio_web TEXT,
+    telefono TEXT,
+    referencia TEXT,
+    fecha_extraccion DATETIME DEFAULT CURRENT_TIMESTAMP,
+    latitud REAL,
+    longitud REAL
+);
+CREATE TABLE Calificaciones (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sucursal_id INTEGER NOT NULL REFERENCES Sucursales(id) ON DELETE CASCADE,
+    rating_global REAL,
+    total_reviews INTEGER DEFAULT 0,
+    fecha_calificacion DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE HistorialCalificaciones (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sucursal_id INTEGER NOT NULL REFERENCES Sucursales(id) ON DELETE CASCADE,
+    rating_global REAL,
+    total_reviews INTEGER,
+    valid_from DATETIME NOT NULL,
+    valid_to DATETIME,
+    ultima_verificacion DATETIME NOT NULL
+);
+CREATE TABLE Horarios (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sucursal_id INTEGER NOT NULL REFERENCES Sucursales(id) ON DELETE CASCADE,
+    dia_semana TEXT NOT NULL,
+    horas TEXT,
+    esta_cerrado INTEGER DEFAULT 0
+);
+CREATE TABLE HorariosIntervalos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sucursal_id INTEGER NOT NULL REFERENCES Sucursales(id) ON DELETE CASCADE,
+    minuto_inicio INTEGER NOT NULL,
+    minuto_fin INTEGER NOT NULL
+);
+CREATE TABLE Reviews (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sucursal_id INTEGER NOT NULL REFERENCES Sucursales(id) ON DELETE CASCADE,
+    autor TEXT,
+    rating INTEGER,
+    fecha_review TEXT,
+    texto TEXT,
+    cantidad_fotos INTEGER DEFAULT 0,
+    likes INTEGER DEFAULT 0,
+    fecha_extraccion DATETIME DEFAULT CURRENT_TIMESTAMP,
+    fecha_review_aprox DATETIME,
+    fecha_review_precision TEXT,
+    texto_normalizado TEXT
+);
+CREATE TABLE CategoriasEmocionales (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre TEXT NOT NULL UNIQUE,
+    descripcion TEXT,
+    color_hex TEXT
+);
+CREATE TABLE PalabrasClave (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    palabra TEXT NOT NULL,
+    categoria_emocional_id INTEGER NOT NULL REFERENCES CategoriasEmocionales(id),
+    peso REAL DEFAULT 1.0,
+    tipo TEXT DEFAULT 'general'
+);
+CREATE TABLE AnalisisSentimientos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    review_id INTEGER NOT NULL REFERENCES Reviews(id) ON DELETE CASCADE,
+    categoria_emocional_id INTEGER NOT NULL REFERENCES CategoriasEmocionales(id),
+    puntuacion_sentimiento REAL,
+    confianza REAL,
+    palabras_positivas TEXT,
+    palabras_negativas TEXT,
+    palabras_clave_detectadas TEXT,
+    fecha_analisis DATETIME DEFAULT CURRENT_TIMESTAMP,
+    version_lexico TEXT
+);
+CREATE TABLE VersionesLexico (
+    version TEXT PRIMARY KEY,
+    modo TEXT NOT NULL,
+    contenido TEXT NOT NULL,
+    fecha_registro DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE ReviewTokens (
+    token TEXT NOT NULL,
+    review_id INTEGER NOT NULL REFERENCES Reviews(id) ON DELETE CASCADE,
+    PRIMARY KEY (token, review_id)
+);
+CREATE TABLE MetricasEmocionales (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sucursal_id INTEGER NOT NULL REFERENCES Sucursales(id) ON DELETE CASCADE,
+    total_reviews_analizados INTEGER DEFAULT 0,
+    porcentaje_muy_positivo REAL DEFAULT 0,
+    porcentaje_positivo REAL DEFAULT 0,
+    porcentaje_neutral REAL DEFAULT 0,
+    porcentaje_negativo REAL DEFAULT 0,
+    porcentaje_muy_negativo REAL DEFAULT 0,
+    puntuacion_promedio_sentimiento REAL,
+    indice_satisfaccion REAL,
+    palabras_mas_mencionadas TEXT,
+    fecha_ultimo_analisis DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IX_Reviews_SucursalId ON Reviews(sucursal_id);
+CREATE INDEX IX_Reviews_Sucursal_FechaAprox ON Reviews(sucursal_id, fecha_review_aprox);
+CREATE INDEX IX_Horarios_SucursalId ON Horarios(sucursal_id);
+CREATE INDEX IX_HorariosIntervalos_Inicio ON HorariosIntervalos(minuto_inicio, minuto_fin);
+CREATE INDEX IX_Calificaciones_SucursalId ON Calificaciones(sucursal_id);
+CREATE UNIQUE INDEX UX_HistorialCalificaciones_Vigente ON HistorialCalificaciones(sucursal_id) WHERE valid_to IS NULL;
+CREATE INDEX IX_AnalisisSentimientos_ReviewId ON AnalisisSentimientos(review_id);
+CREATE INDEX IX_ReviewTokens_ReviewId ON ReviewTokens(review_id);
+"""
+
+# Las columnas DATETIME vuelven como datetime, igual que con pyodbc
+sqlite3.register_converter('DATETIME', lambda valor: datetime.fromisoformat(valor.decode()))
+
+# Mismos IDs que asume SentimentAnalyzer.determine_emotion_category
+CATEGORIAS = ['Muy Positivo', 'Positivo', 'Neutral', 'Negativo', 'Muy Negativo']
+
+RE_OUTPUT = re.compile(r"OUTPUT\s+INSERTED\.(\w+)\s*", re.IGNORECASE)
+
+
+def traducir(sql):
+    """T-SQL usado por los scripts -> SQLite (OUTPUT INSERTED, LEN, GETDATE)"""
+    match = RE_OUTPUT.search(sql)
+    if match:
+        sql = RE_OUTPUT.sub('', sql).rstrip().rstrip(';') + f" RETURNING {match.group(1)}"
+    sql = re.sub(r"\bLEN\(", "LENGTH(", sql, flags=re.IGNORECASE)
+    return re.sub(r"\bGETDATE\(\)", "CURRENT_TIMESTAMP", sql, flags=re.IGNORECASE)
+
+
+class Fila(tuple):
+    """Fila con acceso por índice y por nombre de columna, como pyodbc.Row"""
+
+    def __new__(cls, columnas, valores):
+        fila = super().__new__(cls, valores)
+        fila._columnas = columnas
+        return fila
+
+    def __getattr__(self, nombre):
+        try:
+            return self[self._columnas[nombre]]
+        except KeyError:
+            raise AttributeError(nombre)
+
+
+def _fabrica_fila(cursor, valores):
+    columnas = {d[0]: i for i, d in enumerate(cursor.description)}
+    return Fila(columnas, valores)
+
+
+class CursorSQLite:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.fast_executemany = False
+
+    def execute(self, sql, params=()):
+        self._cursor.execute(traducir(sql), tuple(params))
+        return self
+
+    def executemany(self, sql, filas):
+        self._cursor.executemany(traducir(sql), filas)
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+
+class ConexionSQLite:
+    """Conexión con la interfaz de pyodbc que usan los DatabaseManager del proyecto"""
+
+    def __init__(self, ruta=':memory:'):
+        self._conn = sqlite3.connect(ruta, check_same_thread=False, detect_types=sqlite3.PARSE_DECLTYPES)
+        self._conn.row_factory = _fabrica_fila
+        self._conn.execute("PRAGMA foreign_keys = ON")
+
+    def cursor(self):
+        return CursorSQLite(self._conn.cursor())
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+
+def crear_bd(ruta=':memory:', lexico=None):
+    """Conexión SQLite con el esquema de MAPS, las categorías y (opcional) PalabrasClave"""
+    conexion = ConexionSQLite(ruta)
+    conexion._conn.executescript(ESQUEMA)
+    cursor = conexion.cursor()
+    cursor.executemany("INSERT INTO CategoriasEmocionales (nombre) VALUES (?)", [(c,) for c in CATEGORIAS])
+    if lexico:
+        ids = {nombre: i for i, nombre in enumerate(CATEGORIAS, 1)}
+        cursor.executemany("""
+        INSERT INTO PalabrasClave (palabra, categoria_emocional_id, peso, tipo)
+        VALUES (?, ?, ?, ?)
+        """, [(palabra, ids[datos['categoria']], datos['peso'], datos['tipo']) for palabra, datos in lexico.items()])
+    conexion.commit()
+    return conexion
+
+
+def conectar(db_manager, conexion):
+    """Apuntar un DatabaseManager del proyecto a la BD SQLite (sin pyodbc ni SQL Server)"""
+    db_manager.connection = conexion
+    db_manager.connect = lambda: True
+    return db_manager
@@ -0,0 +1,307 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+try:
+    import pyodbc
+except ImportError:
+    pyodbc = None
+
+# Configuración
+DB_CONFIG = {
+    'server': 'DESKTOP-5B78EO8\\SQL2022',
+    'database': 'SannaIConformidadRegulatoria',
+    'trusted_connection': 'yes',
+    'driver': '{ODBC Driver 17 for SQL Server}'
+}
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ESTADO_FILE = os.path.join(BASE_DIR, '.etl_estado.json')
+REPORTE_FILE = os.path.join(BASE_DIR, 'etl_reporte.json')
+LOGS_DIR = os.path.join(BASE_DIR, 'logs')
+
+# Etapas del ETL y sus dependencias (mismo orden que el README)
+ETAPAS = [
+    {
+        'nombre': 'sucursales',
+        'carpeta': 'MAPS',
+        'script': 'Big-Data-Maps.py',
+        'depende_de': [],
+        'entradas': ['urls.txt'],
+        'tablas': ['Sucursales', 'Calificaciones', 'Horarios', 'Reviews'],
+        # Las reseñas cambian en Google aunque urls.txt no cambie: se vuelve a scrapear
+        # cuando la última ejecución correcta tiene más de max_edad_h horas
+        'max_edad_h': 24,
+        # Big-Data-Maps.py pregunta si se hace el análisis de sentimientos
+        'stdin': 'n\n'
+    },
+    {
+        'nombre': 'usuarios',
+        'carpeta': 'NORMAS',
+        'script': 'usuarios.py',
+        'depende_de': [],
+        'entradas': [],
+        'tablas': ['Usuarios']
+    },
+    {
+        # Solo red: puede correr mientras se scrapean las sucursales
+        'nombre': 'descarga_normativas',
+        'carpeta': 'NORMAS',
+        'script': 'procesar_normativas.py',
+        'args': ['--solo-descarga'],
+        'depende_de': [],
+        'entradas': ['urlnormas.txt'],
+        'tablas': []
+    },
+    {
+        'nombre': 'normativas',
+        'carpeta': 'NORMAS',
+        'script': 'procesar_normativas.py',
+        'args': ['--desde-cache'],
+        'depende_de': ['sucursales', 'usuarios', 'descarga_normativas'],
+        'entradas': ['urlnormas.txt', 'normativas', 'extraccion_normas.py', 'html_normativas'],
+        'tablas': ['Normativas', 'Tiempo']
+    },
+    {
+        'nombre': 'hechos',
+        'carpeta': 'NORMAS',
+        'script': 'insertar_hechos.py',
+        'depende_de': ['normativas'],
+        'entradas': ['cubo_conformidad.py'],
+        'tablas': ['Hechos_Conformidad_Sanitaria', 'Resumen_Conformidad']
+    }
+]
+
+
+def conectar_bd(config):
+    """Conexión opcional, solo para contar filas por etapa"""
+    if pyodbc is None:
+        return None
+    try:
+        return pyodbc.connect(
+            f"DRIVER={config['driver']};"
+            f"SERVER={config['server']};"
+            f"DATABASE={config['database']};"
+            f"Trusted_Connection=yes;",
+            autocommit=True
+        )
+    except Exception as e:
+        print(f"⚠️ Sin conexión a SQL Server, no se contarán filas: {e}")
+        return None
+
+
+def contar_filas(conn, tablas):
+    if conn is None:
+        return {}
+    conteos = {}
+    cursor = conn.cursor()
+    for tabla in tablas:
+        try:
+            cursor.execute(f"SELECT COUNT_BIG(*) FROM {tabla}")
+            conteos[tabla] = int(cursor.fetchone()[0])
+        except Exception:
+            conteos[tabla] = None
+    return conteos
+
+
+def huella_etapa(etapa, huellas_previas):
+    """Hash del script, sus archivos de entrada y las huellas de sus dependencias"""
+    carpeta = os.path.join(BASE_DIR, etapa['carpeta'])
+    h = hashlib.sha256()
+    rutas = [os.path.join(carpeta, etapa['script'])]
+    rutas += [os.path.join(carpeta, entrada) for entrada in etapa['entradas']]
+
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            archivos = sorted(
+                os.path.join(raiz, nombre)
+                for raiz, _, nombres in os.walk(ruta)
+                for nombre in nombres
+            )
+        else:
+            archivos = [ruta]
+        for archivo in archivos:
+            h.update(os.path.relpath(archivo, BASE_DIR).encode('utf-8'))
+            try:
+                with open(archivo, 'rb') as f:
+                    for bloque in iter(lambda: f.read(1 << 16), b''):
+                        h.update(bloque)
+            except FileNotFoundError:
+                h.update(b'<no existe>')
+
+    h.update(' '.join(etapa.get('args', [])).encode('utf-8'))
+    for dependencia in etapa['depende_de']:
+        h.update(huellas_previas[dependencia].encode('utf-8'))
+    return h.hexdigest()
+
+
+def vigente(etapa, previo, ahora):
+    """La última ejecución correcta de la etapa no superó su antigüedad máxima (si la tiene)"""
+    if etapa.get('max_edad_h') is None:
+        return True
+    try:
+        ultima = datetime.fromisoformat(previo['ultima_ejecucion'])
+    except (KeyError, TypeError, ValueError):
+        return False
+    return (ahora - ultima).total_seconds() < etapa['max_edad_h'] * 3600
+
+
+def cargar_estado():
+    try:
+        with open(ESTADO_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def guardar_json(ruta, datos):
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, indent=2, ensure_ascii=False)
+
+
+def ejecutar_etapa(etapa, conn):
+    """Ejecuta el script de la etapa en su carpeta y mide tiempo y filas.
+
+    Los scripts salen con código distinto de 0 si la carga falló; solo entonces la
+    etapa queda como 'error' y no se guarda su huella.
+    """
+    os.makedirs(LOGS_DIR, exist_ok=True)
+    log_path = os.path.join(LOGS_DIR, f"{etapa['nombre']}.log")
+    antes = contar_filas(conn, etapa['tablas'])
+
+    inicio = time.perf_counter()
+    with open(log_path, 'w', encoding='utf-8') as log:
+        proceso = subprocess.run(
+            [sys.executable, etapa['script'], *etapa.get('args', [])],
+            cwd=os.path.join(BASE_DIR, etapa['carpeta']),
+            input=etapa.get('stdin', ''),
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding='utf-8',
+            env={**os.environ, 'PYTHONIOENCODING': 'utf-8'}
+        )
+    duracion = time.perf_counter() - inicio
+
+    despues = contar_filas(conn, etapa['tablas'])
+    filas = {
+        tabla: (despues[tabla] - antes[tabla])
+        if antes.get(tabla) is not None and despues.get(tabla) is not None else None
+        for tabla in etapa['tablas'] if tabla in despues
+    }
+    return {
+        'estado': 'ok' if proceso.returncode == 0 else 'error',
+        'codigo_salida': proceso.returncode,
+        'duracion_s': round(duracion, 3),
+        'filas_nuevas': filas,
+        'log': os.path.relpath(log_path, BASE_DIR)
+    }
+
+
+def ejecutar_pipeline(etapas=ETAPAS, forzar=False, max_paralelo=3, config=DB_CONFIG):
+    """Ejecuta las etapas como un DAG: las independientes corren en paralelo"""
+    por_nombre = {etapa['nombre']: etapa for etapa in etapas}
+    for etapa in etapas:
+        for dependencia in etapa['depende_de']:
+            if dependencia not in por_nombre:
+                raise ValueError(f"La etapa {etapa['nombre']} depende de una etapa inexistente: {dependencia}")
+
+    estado_previo = cargar_estado()
+    huellas = {}
+    resultados = {}
+    pendientes = [etapa['nombre'] for etapa in etapas]
+    en_curso = {}
+    # Conexión por hilo: pyodbc no comparte conexiones entre hilos
+    conexiones = []
+
+    def trabajo(etapa):
+        conn = conectar_bd(config)
+        conexiones.append(conn)
+        return ejecutar_etapa(etapa, conn)
+
+    inicio_total = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_paralelo) as executor:
+        while pendientes or en_curso:
+            antes_de_pasada = len(pendientes)
+            for nombre in list(pendientes):
+                etapa = por_nombre[nombre]
+                estados_deps = [resultados.get(dep, {}).get('estado') for dep in etapa['depende_de']]
+
+                if any(e in ('error', 'cancelada') for e in estados_deps):
+                    pendientes.remove(nombre)
+                    resultados[nombre] = {'estado': 'cancelada', 'motivo': 'falló una dependencia'}
+                    print(f"⏭️ {nombre}: cancelada (falló una dependencia)")
+                    continue
+                if not all(e in ('ok', 'sin_cambios') for e in estados_deps):
+                    continue
+
+                pendientes.remove(nombre)
+                huellas[nombre] = huella_etapa(etapa, huellas)
+                previo = estado_previo.get(nombre, {})
+                deps_sin_cambios = all(e == 'sin_cambios' for e in estados_deps)
+
+                if not forzar and deps_sin_cambios and previo.get('huella') == huellas[nombre]:
+                    if vigente(etapa, previo, datetime.now()):
+                        resultados[nombre] = {'estado': 'sin_cambios', 'duracion_s': 0.0}
+                        print(f"⏭️ {nombre}: entradas sin cambios, se omite")
+                        continue
+                    print(f"⌛ {nombre}: entradas sin cambios, pero la última ejecución tiene más de {etapa['max_edad_h']}h")
+
+                print(f"🔄 {nombre}: iniciando ({etapa['carpeta']}/{etapa['script']})")
+                en_curso[executor.submit(trabajo, etapa)] = nombre
+
+            if not en_curso:
+                if pendientes and len(pendientes) == antes_de_pasada:
+                    # Nada corriendo y ninguna etapa lista: dependencias circulares
+                    raise ValueError(f"Dependencias circulares entre etapas: {', '.join(pendientes)}")
+                continue
+
+            terminadas, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+            for futuro in terminadas:
+                nombre = en_curso.pop(futuro)
+                try:
+                    resultados[nombre] = futuro.result()
+                except Exception as e:
+                    resultados[nombre] = {'estado': 'error', 'error': str(e)}
+
+                resultado = resultados[nombre]
+                if resultado['estado'] == 'ok':
+                    estado_previo[nombre] = {
+                        'huella': huellas[nombre],
+                        'ultima_ejecucion': datetime.now().isoformat(timespec='seconds')
+                    }
+                    print(f"✅ {nombre}: {resultado['duracion_s']:.1f}s, filas nuevas {resultado['filas_nuevas']}")
+                else:
+                    print(f"❌ {nombre}: falló (ver {resultado.get('log', 'log')})")
+
+    for conn in conexiones:
+        if conn is not None:
+            conn.close()
+
+    guardar_json(ESTADO_FILE, estado_previo)
+    reporte = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'duracion_total_s': round(time.perf_counter() - inicio_total, 3),
+        'etapas': resultados
+    }
+    guardar_json(REPORTE_FILE, reporte)
+    return reporte
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ejecuta el ETL completo respetando dependencias entre etapas")
+    parser.add_argument('--forzar', action='store_true', help="Ejecutar todas las etapas aunque sus entradas no hayan cambiado")
+    parser.add_argument('--max-paralelo', type=int, default=3, help="Máximo de etapas ejecutándose a la vez")
+    args = parser.parse_args()
+
+    print("🚀 ETL Conformidad Regulatoria SANNA")
+    print("=" * 50)
+    reporte = ejecutar_pipeline(forzar=args.forzar, max_paralelo=args.max_paralelo)
+    print("=" * 50)
+    print(f"🎉 Pipeline terminado en {reporte['duracion_total_s']:.1f}s (reporte en {os.path.basename(REPORTE_FILE)})")
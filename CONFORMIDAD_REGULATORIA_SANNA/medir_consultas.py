@@ -0,0 +1,268 @@
+import os
+import re
+import json
+import time
+import argparse
+import statistics
+from datetime import datetime, timedelta
+
+try:
+    import pyodbc
+except ImportError:
+    pyodbc = None
+
+# Configuración
+DB_CONFIG = {
+    'server': 'DESKTOP-5B78EO8\\SQL2022',
+    'database': 'SannaIConformidadRegulatoria',
+    'trusted_connection': 'yes',
+    'driver': '{ODBC Driver 17 for SQL Server}'
+}
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PLANES_DIR = os.path.join(BASE_DIR, 'planes')
+
+RE_LECTURAS = re.compile(r"logical reads (\d+)", re.IGNORECASE)
+RE_OPERADOR = re.compile(r'PhysicalOp="([^"]+)"')
+
+# Consultas del ETL tal como las ejecutan los scripts; los parámetros salen de preparar_parametros
+CONSULTAS = {
+    'reviews_sin_analizar': ("""
+        SELECT r.id, r.texto, r.texto_normalizado
+        FROM Reviews r
+        LEFT JOIN AnalisisSentimientos a ON r.id = a.review_id
+        WHERE r.sucursal_id = ?
+        AND a.id IS NULL
+        AND r.texto IS NOT NULL
+        AND LEN(r.texto) > 0
+    """, ('sucursal_id',)),
+    'metricas_por_categoria': ("""
+        SELECT ce.nombre, x.cantidad, x.promedio_puntuacion
+        FROM (
+            SELECT a.categoria_emocional_id, COUNT(*) as cantidad, AVG(a.puntuacion_sentimiento) as promedio_puntuacion
+            FROM AnalisisSentimientos a
+            INNER JOIN Reviews r ON a.review_id = r.id
+            WHERE r.sucursal_id = ?
+            GROUP BY a.categoria_emocional_id
+        ) x
+        INNER JOIN CategoriasEmocionales ce ON x.categoria_emocional_id = ce.id
+    """, ('sucursal_id',)),
+    'metricas_palabras_clave': ("""
+        SELECT palabras_clave_detectadas
+        FROM AnalisisSentimientos a
+        INNER JOIN Reviews r ON a.review_id = r.id
+        WHERE r.sucursal_id = ? AND palabras_clave_detectadas IS NOT NULL
+    """, ('sucursal_id',)),
+    'estadisticas_generales': ("""
+        SELECT (SELECT COUNT(*) FROM Sucursales) as total_sucursales,
+               (SELECT COUNT(*) FROM Reviews) as total_reviews,
+               (SELECT COUNT(DISTINCT review_id) FROM AnalisisSentimientos) as total_reviews_analizados
+    """, ()),
+    'distribucion_emocional': ("""
+        SELECT ce.nombre, x.cantidad,
+               CAST(x.cantidad * 100.0 / SUM(x.cantidad) OVER() AS DECIMAL(5,2)) as porcentaje
+        FROM (
+            SELECT categoria_emocional_id, COUNT(*) as cantidad
+            FROM AnalisisSentimientos
+            GROUP BY categoria_emocional_id
+        ) x
+        INNER JOIN CategoriasEmocionales ce ON x.categoria_emocional_id = ce.id
+        ORDER BY ce.id
+    """, ()),
+    'sentimiento_por_mes': ("""
+        SELECT DATEFROMPARTS(YEAR(r.fecha_review_aprox), MONTH(r.fecha_review_aprox), 1) as mes,
+               COUNT(*) as cantidad, AVG(a.puntuacion_sentimiento) as promedio_puntuacion
+        FROM Reviews r
+        INNER JOIN AnalisisSentimientos a ON a.review_id = r.id
+        WHERE r.sucursal_id = ?
+        AND r.fecha_review_aprox >= ? AND r.fecha_review_aprox < ?
+        GROUP BY DATEFROMPARTS(YEAR(r.fecha_review_aprox), MONTH(r.fecha_review_aprox), 1)
+    """, ('sucursal_id', 'desde', 'hasta')),
+    'sucursales_abiertas': ("""
+        SELECT DISTINCT sucursal_id
+        FROM HorariosIntervalos
+        WHERE minuto_inicio <= ? AND minuto_fin > ?
+    """, ('minuto_semana', 'minuto_semana')),
+    'buscar_reviews_like': ("""
+        SELECT TOP 20 r.id, r.sucursal_id, r.texto
+        FROM Reviews r
+        WHERE r.texto LIKE ?
+    """, ('patron_busqueda',)),
+    'buscar_reviews_texto_completo': ("""
+        SELECT TOP 20 r.id, r.sucursal_id, r.texto, ft.[RANK]
+        FROM CONTAINSTABLE(Reviews, texto, ?) ft
+        INNER JOIN Reviews r ON r.id = ft.[KEY]
+        ORDER BY ft.[RANK] DESC
+    """, ('busqueda',)),
+    'sucursales_cercanas_geo': ("""
+        SELECT TOP 5 id, nombre
+        FROM Sucursales
+        WHERE geo IS NOT NULL
+        ORDER BY geo.STDistance(geography::Point(?, ?, 4326))
+    """, ('latitud', 'longitud')),
+    'sucursales_en_radio_geo': ("""
+        SELECT id, nombre
+        FROM Sucursales
+        WHERE geo.STDistance(geography::Point(?, ?, 4326)) <= ?
+    """, ('latitud', 'longitud', 'radio_m')),
+    'tiempo_por_fecha': ("""
+        SELECT id_tiempo FROM Tiempo WHERE fecha = ?
+    """, ('fecha',)),
+    'normativas_por_sucursal': ("""
+        SELECT id_normativa, id_usuario, fecha, resultado_normativa
+        FROM Normativas
+        WHERE sucursal_id = ?
+        ORDER BY fecha
+    """, ('sucursal_id',)),
+    'hechos_por_sucursal': ("""
+        SELECT h.sucursal_id, RTRIM(t.año_mes), h.id_usuario, SUM(h.total_acciones_correctivas)
+        FROM Hechos_Conformidad_Sanitaria h
+        INNER JOIN Tiempo t ON h.fecha = t.fecha
+        WHERE h.sucursal_id = ?
+        GROUP BY h.sucursal_id, RTRIM(t.año_mes), h.id_usuario
+    """, ('sucursal_id',)),
+}
+
+
+def conectar(config):
+    return pyodbc.connect(
+        f"DRIVER={config['driver']};"
+        f"SERVER={config['server']};"
+        f"DATABASE={config['database']};"
+        f"Trusted_Connection=yes;",
+        autocommit=True
+    )
+
+
+def preparar_parametros(cursor):
+    """Valores representativos: la sucursal con más reseñas y una fecha existente de Tiempo"""
+    cursor.execute("SELECT TOP 1 sucursal_id FROM Reviews GROUP BY sucursal_id ORDER BY COUNT(*) DESC")
+    fila = cursor.fetchone()
+    sucursal_id = fila[0] if fila else 1
+    cursor.execute("SELECT TOP 1 fecha FROM Tiempo ORDER BY fecha DESC")
+    fila = cursor.fetchone()
+    fecha = fila[0] if fila else datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    # Último año de reseñas según su fecha aproximada
+    hasta = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    desde = hasta - timedelta(days=365)
+    # Domingo 21:00 en minutos de la semana (lunes 0:00 = 0)
+    minuto_semana = 6 * 24 * 60 + 21 * 60
+    # Misma búsqueda con LIKE y con el índice de texto completo (build_contains de review_search.py)
+    return {'sucursal_id': sucursal_id, 'fecha': fecha, 'desde': desde, 'hasta': hasta,
+            'minuto_semana': minuto_semana,
+            'patron_busqueda': '%demora%', 'busqueda': 'FORMSOF(INFLECTIONAL, demora)',
+            # Centro de Lima, 10 km a la redonda (índice espacial de la migración 0009)
+            'latitud': -12.0464, 'longitud': -77.0428, 'radio_m': 10000}
+
+
+def lecturas_logicas(cursor):
+    # Mensajes de SET STATISTICS IO (pyodbc >= 4.0.31 los expone en cursor.messages)
+    mensajes = getattr(cursor, 'messages', None) or []
+    return sum(int(n) for _, texto in mensajes for n in RE_LECTURAS.findall(str(texto)))
+
+
+def consumir(cursor):
+    """Recorre todos los resultados; retorna (XML del plan real o None, lecturas lógicas)"""
+    plan = None
+    lecturas = 0
+    while True:
+        # Los mensajes se reinician con cada conjunto de resultados
+        lecturas += lecturas_logicas(cursor)
+        if cursor.description:
+            filas = cursor.fetchall()
+            if cursor.description[0][0].startswith('Microsoft SQL Server') and filas:
+                plan = filas[0][0]
+        if not cursor.nextset():
+            return plan, lecturas
+
+
+def medir(conn, nombre, sql, parametros, repeticiones, carpeta_planes):
+    cursor = conn.cursor()
+    # Plan real y lecturas en una ejecución aparte para no sumar su costo a los tiempos
+    cursor.execute("SET STATISTICS XML ON; SET STATISTICS IO ON")
+    cursor.execute(sql, parametros)
+    plan, lecturas = consumir(cursor)
+    cursor.execute("SET STATISTICS XML OFF; SET STATISTICS IO OFF")
+
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        cursor.execute(sql, parametros)
+        consumir(cursor)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+
+    operadores = sorted(set(RE_OPERADOR.findall(plan or '')))
+    if plan:
+        with open(os.path.join(carpeta_planes, f"{nombre}.sqlplan"), 'w', encoding='utf-8') as f:
+            f.write(plan)
+    return {
+        'mediana_ms': round(statistics.median(tiempos), 3),
+        'min_ms': round(min(tiempos), 3),
+        'lecturas_logicas': lecturas,
+        'operadores': operadores
+    }
+
+
+def capturar(etiqueta, config=DB_CONFIG, repeticiones=20):
+    """Tiempos, lecturas y planes de todas las consultas en planes/<etiqueta>/"""
+    carpeta = os.path.join(PLANES_DIR, etiqueta)
+    os.makedirs(carpeta, exist_ok=True)
+    conn = conectar(config)
+    try:
+        cursor = conn.cursor()
+        valores = preparar_parametros(cursor)
+        # Caché fría no se controla (requiere DBCC DROPCLEANBUFFERS): se mide con caché caliente
+        resultados = {}
+        for nombre, (sql, claves) in CONSULTAS.items():
+            try:
+                resultados[nombre] = medir(conn, nombre, sql, tuple(valores[c] for c in claves), repeticiones, carpeta)
+                r = resultados[nombre]
+                print(f"⏱️ {nombre}: {r['mediana_ms']} ms, {r['lecturas_logicas']} lecturas, {', '.join(r['operadores'])}")
+            except Exception as e:
+                print(f"❌ {nombre}: {e}")
+        reporte = {
+            'etiqueta': etiqueta,
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'parametros': {k: str(v) for k, v in valores.items()},
+            'consultas': resultados
+        }
+        with open(os.path.join(carpeta, 'resumen.json'), 'w', encoding='utf-8') as f:
+            json.dump(reporte, f, indent=2, ensure_ascii=False)
+        print(f"💾 Planes y tiempos guardados en {carpeta}")
+        return reporte
+    finally:
+        conn.close()
+
+
+def comparar(antes, despues):
+    with open(os.path.join(PLANES_DIR, antes, 'resumen.json'), 'r', encoding='utf-8') as f:
+        a = json.load(f)['consultas']
+    with open(os.path.join(PLANES_DIR, despues, 'resumen.json'), 'r', encoding='utf-8') as f:
+        d = json.load(f)['consultas']
+
+    print(f"{'consulta':<28}{'antes ms':>10}{'después ms':>12}{'lect. antes':>13}{'lect. después':>15}")
+    print("-" * 78)
+    for nombre in CONSULTAS:
+        if nombre not in a or nombre not in d:
+            continue
+        print(f"{nombre:<28}{a[nombre]['mediana_ms']:>10}{d[nombre]['mediana_ms']:>12}"
+              f"{a[nombre]['lecturas_logicas']:>13}{d[nombre]['lecturas_logicas']:>15}")
+        quitados = set(a[nombre]['operadores']) - set(d[nombre]['operadores'])
+        nuevos = set(d[nombre]['operadores']) - set(a[nombre]['operadores'])
+        if quitados or nuevos:
+            print(f"   plan: -{sorted(quitados)} +{sorted(nuevos)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plan de ejecución y tiempos de las consultas del ETL (antes/después de migrar)")
+    parser.add_argument('--etiqueta', default=None, help="Nombre de la captura, p. ej. 'antes' o 'despues'")
+    parser.add_argument('--comparar', nargs=2, metavar=('ANTES', 'DESPUES'), help="Comparar dos capturas")
+    parser.add_argument('--repeticiones', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.comparar:
+        comparar(*args.comparar)
+    elif pyodbc is None:
+        print("❌ pyodbc no está instalado")
+    else:
+        capturar(args.etiqueta or datetime.now().strftime('%Y%m%d-%H%M%S'), repeticiones=args.repeticiones)
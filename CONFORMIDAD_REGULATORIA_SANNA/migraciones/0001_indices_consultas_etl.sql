@@ -0,0 +1,56 @@
+-- 0001: índices para las consultas más frecuentes del ETL
+--
+-- analyze_all_reviews_for_sucursal: Reviews r LEFT JOIN AnalisisSentimientos a ... WHERE a.id IS NULL
+-- calculate_emotional_metrics / print_final_statistics: AnalisisSentimientos JOIN Reviews por sucursal
+-- insertar_tiempo: Tiempo WHERE fecha = ? (ya cubierta por UNIQUE(fecha), no se agrega nada)
+-- refrescar_resumen: Hechos_Conformidad_Sanitaria por (sucursal_id, id_usuario, fecha)
+
+-- Una reseña se analiza una sola vez: se eliminan los análisis repetidos (queda el primero)
+WITH repetidos AS (
+    SELECT id, ROW_NUMBER() OVER (PARTITION BY review_id ORDER BY id) AS n
+    FROM AnalisisSentimientos
+)
+DELETE FROM repetidos WHERE n > 1;
+go
+
+IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_AnalisisSentimientos_ReviewId' AND object_id = OBJECT_ID('AnalisisSentimientos'))
+    DROP INDEX IX_AnalisisSentimientos_ReviewId ON AnalisisSentimientos;
+go
+
+-- Único y cubriente: el anti-join y los agregados por categoría no vuelven a la tabla base
+CREATE UNIQUE INDEX UX_AnalisisSentimientos_ReviewId
+    ON AnalisisSentimientos(review_id)
+    INCLUDE (categoria_emocional_id, puntuacion_sentimiento);
+go
+
+-- id es la clave del índice clustered y ya viaja en el índice; se declara para que el
+-- anti-join por sucursal quede explícitamente cubierto (SQL Server no lo duplica)
+IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Reviews_SucursalId' AND object_id = OBJECT_ID('Reviews'))
+    DROP INDEX IX_Reviews_SucursalId ON Reviews;
+go
+
+CREATE INDEX IX_Reviews_SucursalId
+    ON Reviews(sucursal_id)
+    INCLUDE (id, fecha_extraccion);
+go
+
+-- Normativas por sucursal ordenadas por fecha (insertar_hechos, consultas por sucursal)
+CREATE INDEX IX_Normativas_Sucursal_Fecha
+    ON Normativas(sucursal_id, fecha)
+    INCLUDE (id_usuario, resultado_normativa);
+go
+
+-- Hechos es un heap sin índices: el refresco incremental de Resumen_Conformidad lo recorría completo
+CREATE INDEX IX_Hechos_Sucursal_Usuario_Fecha
+    ON Hechos_Conformidad_Sanitaria(sucursal_id, id_usuario, fecha)
+    INCLUDE (total_acciones_correctivas, total_acciones_correctivas_conformes, total_acciones_correctivas_noconformes);
+go
+
+-- Última calificación de una sucursal (reconciliación de la cola de trabajos del scraper)
+IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Calificaciones_SucursalId' AND object_id = OBJECT_ID('Calificaciones'))
+    DROP INDEX IX_Calificaciones_SucursalId ON Calificaciones;
+go
+
+CREATE INDEX IX_Calificaciones_SucursalId_Fecha
+    ON Calificaciones(sucursal_id, fecha_calificacion);
+go
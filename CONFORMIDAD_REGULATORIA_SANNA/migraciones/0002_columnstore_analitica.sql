@@ -0,0 +1,25 @@
+-- 0002: índices columnstore no clustered para los agregados del análisis
+--
+-- Distribución por categoría, puntaje promedio por sucursal y totales de conformidad leen
+-- pocas columnas de muchas filas: con columnstore se resuelven en modo batch sobre
+-- segmentos comprimidos en lugar de recorrer las tablas fila por fila.
+-- SQL Server mantiene los índices al insertar; el ETL comprime los rowgroups abiertos
+-- después de cada carga (compact_columnstore en Big-Data-Maps.py, insertar_hechos.py).
+-- texto (NVARCHAR(MAX)) no se incluye: los columnstore no clustered no lo admiten.
+
+CREATE NONCLUSTERED COLUMNSTORE INDEX NCCI_Reviews_Analitica
+    ON Reviews (id, sucursal_id, rating, cantidad_fotos, likes, fecha_extraccion);
+go
+
+CREATE NONCLUSTERED COLUMNSTORE INDEX NCCI_AnalisisSentimientos_Analitica
+    ON AnalisisSentimientos (id, review_id, categoria_emocional_id, puntuacion_sentimiento, confianza, fecha_analisis);
+go
+
+CREATE NONCLUSTERED COLUMNSTORE INDEX NCCI_Hechos_Analitica
+    ON Hechos_Conformidad_Sanitaria (
+        sucursal_id, id_usuario, id_normativa, fecha,
+        total_acciones_correctivas,
+        total_acciones_correctivas_conformes,
+        total_acciones_correctivas_noconformes
+    );
+go
@@ -0,0 +1,23 @@
+-- 0003: fecha aproximada de cada reseña
+--
+-- Google solo muestra fechas relativas ("Hace 7 meses", "Fecha de edición: Hace 6 años").
+-- El ETL las resuelve contra fecha_extraccion (relative_dates.py) y guarda la precisión
+-- (hora, día, semana, mes, año): "Hace 7 meses" solo asegura el mes.
+-- Las reseñas ya cargadas se completan con: python Big-Data-Maps.py --backfill-fechas
+
+ALTER TABLE Reviews ADD
+    fecha_review_aprox DATETIME NULL,
+    fecha_review_precision NVARCHAR(10) NULL;
+go
+
+-- Sentimiento por sucursal y período: búsqueda por rango en lugar de recorrer las reseñas
+CREATE INDEX IX_Reviews_Sucursal_FechaAprox
+    ON Reviews(sucursal_id, fecha_review_aprox)
+    INCLUDE (rating, fecha_review_precision);
+go
+
+-- Períodos de todas las sucursales
+CREATE INDEX IX_Reviews_FechaAprox
+    ON Reviews(fecha_review_aprox)
+    INCLUDE (sucursal_id, rating);
+go
@@ -0,0 +1,27 @@
+-- 0004: horarios de atención como intervalos en minutos de la semana
+--
+-- Horarios guarda el texto de Google ('8 a. m.–1 p. m., 3–8 p. m.') y obligaba a parsear cada
+-- fila para saber qué sucursales atienden a una hora dada. El ETL lo convierte al cargar
+-- (opening_hours.py): lunes 0:00 = 0 ... domingo 23:59 = 10079; cada turno es una fila,
+-- "Abierto las 24 horas" todos los días queda como un solo intervalo [0, 10080).
+-- Las sucursales ya cargadas se completan con: python Big-Data-Maps.py --rebuild-horarios
+
+CREATE TABLE HorariosIntervalos(
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    sucursal_id INT NOT NULL,
+    minuto_inicio SMALLINT NOT NULL,
+    minuto_fin SMALLINT NOT NULL,
+    FOREIGN KEY (sucursal_id) REFERENCES Sucursales(id) ON DELETE CASCADE,
+    CHECK (minuto_inicio >= 0 AND minuto_inicio < minuto_fin AND minuto_fin <= 10080)
+);
+go
+
+-- Abiertas en @m: WHERE minuto_inicio <= @m AND minuto_fin > @m (búsqueda por rango sobre minuto_inicio)
+CREATE INDEX IX_HorariosIntervalos_Inicio
+    ON HorariosIntervalos(minuto_inicio, minuto_fin)
+    INCLUDE (sucursal_id);
+go
+
+CREATE INDEX IX_HorariosIntervalos_SucursalId
+    ON HorariosIntervalos(sucursal_id);
+go
@@ -0,0 +1,34 @@
+-- 0005: léxico versionado e índice invertido de reseñas
+--
+-- Cada análisis guarda la versión del léxico (hash de PalabrasClave, modo y reglas) con que
+-- se calculó. VersionesLexico conserva el contenido de cada versión para saber qué palabras
+-- cambiaron, y ReviewTokens (token -> reseña) permite encontrar solo las reseñas que las
+-- contienen: python Big-Data-Maps.py --reanalizar-cambios
+
+ALTER TABLE AnalisisSentimientos ADD version_lexico CHAR(16) NULL;
+go
+
+CREATE TABLE VersionesLexico(
+    version CHAR(16) PRIMARY KEY,
+    modo NVARCHAR(20) NOT NULL,
+    contenido NVARCHAR(MAX) NOT NULL,
+    fecha_registro DATETIME DEFAULT GETDATE()
+);
+go
+
+-- Clave (token, review_id): la búsqueda por palabra cambiada es un seek por token
+CREATE TABLE ReviewTokens(
+    token NVARCHAR(100) NOT NULL,
+    review_id INT NOT NULL,
+    PRIMARY KEY (token, review_id),
+    FOREIGN KEY (review_id) REFERENCES Reviews(id) ON DELETE CASCADE
+);
+go
+
+CREATE INDEX IX_ReviewTokens_ReviewId ON ReviewTokens(review_id);
+go
+
+CREATE INDEX IX_AnalisisSentimientos_VersionLexico
+    ON AnalisisSentimientos(version_lexico)
+    INCLUDE (review_id);
+go
@@ -0,0 +1,8 @@
+-- 0006: texto normalizado de cada reseña
+--
+-- El ETL guarda al cargar el resultado de limpiar_review (normalizacion.py), el mismo texto
+-- que usa el análisis de sentimientos: minúsculas, solo letras, dígitos y . , ! ? ;
+-- Las reseñas cargadas antes quedan en NULL y se normalizan al analizarse.
+
+ALTER TABLE Reviews ADD texto_normalizado NVARCHAR(MAX) NULL;
+go
@@ -0,0 +1,31 @@
+-- 0007: búsqueda de texto completo en las reseñas
+--
+-- Buscar "estacionamiento", "demora" o el nombre de un médico con LIKE '%...%' recorre todo
+-- Reviews.texto. El índice de texto completo guarda las palabras de cada reseña (sin tildes:
+-- ACCENT_SENSITIVITY = OFF) y CONTAINSTABLE devuelve las coincidencias con su RANK
+-- (search_reviews en MAPS/review_search.py, python Big-Data-Maps.py --buscar).
+-- CHANGE_TRACKING AUTO: SQL Server actualiza el índice en segundo plano con cada insert, update
+-- o delete del ETL (escritor masivo, --deduplicar), sin pasos extra en el cargador.
+-- Requiere el componente Full-Text Search de SQL Server; si no está instalado no se crea nada.
+-- migracion: sin transaccion
+
+IF FULLTEXTSERVICEPROPERTY('IsFullTextInstalled') = 0
+    PRINT 'Full-Text Search no está instalado: se omite el índice de texto completo de Reviews';
+go
+
+IF FULLTEXTSERVICEPROPERTY('IsFullTextInstalled') = 1
+   AND NOT EXISTS (SELECT 1 FROM sys.fulltext_catalogs WHERE name = 'CatalogoReviews')
+    CREATE FULLTEXT CATALOG CatalogoReviews WITH ACCENT_SENSITIVITY = OFF;
+go
+
+-- La clave del índice es la PRIMARY KEY de Reviews (su nombre lo genera SQL Server)
+DECLARE @clave SYSNAME = (
+    SELECT name FROM sys.indexes WHERE object_id = OBJECT_ID('Reviews') AND is_primary_key = 1
+);
+DECLARE @sql NVARCHAR(MAX) = N'CREATE FULLTEXT INDEX ON Reviews (texto LANGUAGE 3082)
+    KEY INDEX ' + QUOTENAME(@clave) + N' ON CatalogoReviews
+    WITH CHANGE_TRACKING = AUTO, STOPLIST = SYSTEM';
+IF FULLTEXTSERVICEPROPERTY('IsFullTextInstalled') = 1
+   AND NOT EXISTS (SELECT 1 FROM sys.fulltext_indexes WHERE object_id = OBJECT_ID('Reviews'))
+    EXEC sp_executesql @sql;
+go
@@ -0,0 +1,69 @@
+-- 0008: historial compacto de calificaciones
+--
+-- Cada carga insertaba una fila en Calificaciones aunque rating_global y total_reviews no
+-- hubieran cambiado, así que la tabla crecía con el número de ejecuciones. Ahora el ETL
+-- (MAPS/rating_history.py) solo inserta en Calificaciones cuando los valores cambian y lleva
+-- HistorialCalificaciones: un tramo por valor con su vigencia [valid_from, valid_to); el tramo
+-- vigente tiene valid_to NULL y ultima_verificacion es la última carga que lo vio igual.
+-- Tendencias y deltas por sucursal: python Big-Data-Maps.py --tendencia
+-- Las filas ya cargadas se compactan aquí: primero se arma el historial con todas, después se
+-- borran de Calificaciones las que repiten los valores de la anterior de su sucursal.
+
+CREATE TABLE HistorialCalificaciones(
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    sucursal_id INT NOT NULL,
+    rating_global DECIMAL(3,2),
+    total_reviews INT,
+    valid_from DATETIME NOT NULL,
+    valid_to DATETIME NULL,
+    ultima_verificacion DATETIME NOT NULL,
+    FOREIGN KEY (sucursal_id) REFERENCES Sucursales(id) ON DELETE CASCADE,
+    CHECK (valid_to IS NULL OR valid_to >= valid_from)
+);
+go
+
+-- Un solo tramo vigente por sucursal; es el que lee cada carga para comparar
+CREATE UNIQUE INDEX UX_HistorialCalificaciones_Vigente
+    ON HistorialCalificaciones(sucursal_id)
+    INCLUDE (rating_global, total_reviews, valid_from)
+    WHERE valid_to IS NULL;
+go
+
+CREATE INDEX IX_HistorialCalificaciones_SucursalId_Desde
+    ON HistorialCalificaciones(sucursal_id, valid_from)
+    INCLUDE (valid_to, rating_global, total_reviews);
+go
+
+-- Islas de filas consecutivas (por sucursal y fecha) con los mismos valores -> un tramo
+WITH marcadas AS (
+    SELECT sucursal_id, rating_global, total_reviews, fecha_calificacion, id,
+           CASE WHEN LAG(ISNULL(rating_global, -1)) OVER (PARTITION BY sucursal_id ORDER BY fecha_calificacion, id) = ISNULL(rating_global, -1)
+                 AND LAG(ISNULL(total_reviews, -1)) OVER (PARTITION BY sucursal_id ORDER BY fecha_calificacion, id) = ISNULL(total_reviews, -1)
+                THEN 0 ELSE 1 END AS cambio
+    FROM Calificaciones
+    WHERE fecha_calificacion IS NOT NULL
+), islas AS (
+    SELECT *, SUM(cambio) OVER (PARTITION BY sucursal_id ORDER BY fecha_calificacion, id ROWS UNBOUNDED PRECEDING) AS isla
+    FROM marcadas
+), tramos AS (
+    SELECT sucursal_id, isla, MIN(rating_global) AS rating_global, MIN(total_reviews) AS total_reviews,
+           MIN(fecha_calificacion) AS valid_from, MAX(fecha_calificacion) AS ultima_verificacion
+    FROM islas
+    GROUP BY sucursal_id, isla
+)
+INSERT INTO HistorialCalificaciones (sucursal_id, rating_global, total_reviews, valid_from, valid_to, ultima_verificacion)
+SELECT sucursal_id, rating_global, total_reviews, valid_from,
+       LEAD(valid_from) OVER (PARTITION BY sucursal_id ORDER BY isla),
+       ultima_verificacion
+FROM tramos;
+go
+
+WITH marcadas AS (
+    SELECT CASE WHEN LAG(ISNULL(rating_global, -1)) OVER (PARTITION BY sucursal_id ORDER BY fecha_calificacion, id) = ISNULL(rating_global, -1)
+                 AND LAG(ISNULL(total_reviews, -1)) OVER (PARTITION BY sucursal_id ORDER BY fecha_calificacion, id) = ISNULL(total_reviews, -1)
+                THEN 0 ELSE 1 END AS cambio
+    FROM Calificaciones
+    WHERE fecha_calificacion IS NOT NULL
+)
+DELETE FROM marcadas WHERE cambio = 0;
+go
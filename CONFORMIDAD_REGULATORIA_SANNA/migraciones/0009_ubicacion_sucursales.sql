@@ -0,0 +1,24 @@
+-- 0009: latitud/longitud de las sucursales e índice espacial
+--
+-- Sucursales.referencia es el Plus Code que muestra Google ("W25X+WQ La Molina"), guardado como
+-- texto. El ETL lo decodifica al cargar, sin red (MAPS/plus_codes.py: el código corto se completa
+-- con el punto de referencia de la localidad), y guarda el centro de la celda (~14 m).
+-- geo es geography (SRID 4326) calculada desde latitud/longitud; el índice espacial resuelve
+-- "las N más cercanas" (ORDER BY geo.STDistance(@p)) y "a menos de X km" (STDistance(@p) <= X).
+-- Las sucursales ya cargadas se completan con: python Big-Data-Maps.py --rebuild-ubicaciones
+
+ALTER TABLE Sucursales ADD
+    latitud DECIMAL(9,6) NULL,
+    longitud DECIMAL(9,6) NULL;
+go
+
+ALTER TABLE Sucursales ADD geo AS (
+    CASE WHEN latitud IS NOT NULL AND longitud IS NOT NULL
+         THEN geography::Point(latitud, longitud, 4326) END
+) PERSISTED;
+go
+
+CREATE SPATIAL INDEX SIX_Sucursales_Geo
+    ON Sucursales(geo)
+    USING GEOGRAPHY_AUTO_GRID;
+go
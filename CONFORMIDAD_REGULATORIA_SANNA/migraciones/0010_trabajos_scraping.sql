@@ -0,0 +1,29 @@
+-- 0010: cola compartida de URLs para scrapear desde varias máquinas
+--
+-- scrape_jobs.db (job_queue.py) es local a una máquina. TrabajosScraping vive en la misma BD que
+-- las sucursales y cualquier número de procesos (python Big-Data-Maps.py --trabajador) toma URLs
+-- con UPDLOCK, READPAST: cada uno salta las filas que otro está tomando en ese momento y marca las
+-- suyas con su nombre y un lease (lease_hasta) que renueva con latidos mientras scrapea y guarda.
+-- Si un trabajador muere, su lease vence y otro retoma la URL (cuenta como un intento más).
+-- Ver MAPS/job_leases.py; las URLs se encolan con: python Big-Data-Maps.py --encolar
+
+CREATE TABLE TrabajosScraping(
+    url NVARCHAR(450) PRIMARY KEY,
+    estado NVARCHAR(20) NOT NULL DEFAULT 'pendiente',
+    intentos INT NOT NULL DEFAULT 0,
+    proximo_intento DATETIME NOT NULL DEFAULT GETDATE(),
+    trabajador NVARCHAR(100) NULL,
+    lease_hasta DATETIME NULL,
+    ultimo_latido DATETIME NULL,
+    ultimo_exito DATETIME NULL,
+    ultimo_error NVARCHAR(500) NULL,
+    sucursal_id INT NULL,
+    CHECK (estado IN ('pendiente', 'en_proceso', 'completado', 'fallido'))
+);
+go
+
+-- La búsqueda de trabajo filtra por estado y ordena por proximo_intento
+CREATE INDEX IX_TrabajosScraping_Estado
+    ON TrabajosScraping(estado, proximo_intento)
+    INCLUDE (intentos, lease_hasta);
+go
@@ -0,0 +1,37 @@
+-- 0011: un hecho por normativa en Hechos_Conformidad_Sanitaria
+--
+-- insertar_hechos.py insertaba un hecho por cada fila de Normativas en cada ejecución, así que
+-- volver a correr la etapa duplicaba todos los hechos y los totales de Resumen_Conformidad.
+-- Ahora los carga con un MERGE por id_normativa (solo inserta las nuevas y actualiza las que
+-- cambiaron). Aquí se quitan los hechos repetidos ya cargados, se reconstruye el resumen con
+-- los hechos que quedan y un índice único impide que se vuelvan a duplicar.
+
+WITH repetidos AS (
+    SELECT ROW_NUMBER() OVER (PARTITION BY id_normativa ORDER BY fecha) AS n
+    FROM Hechos_Conformidad_Sanitaria
+)
+DELETE FROM repetidos WHERE n > 1;
+go
+
+DELETE FROM Resumen_Conformidad;
+go
+
+INSERT INTO Resumen_Conformidad (
+    sucursal_id, año_mes, id_usuario,
+    total_acciones_correctivas,
+    total_acciones_correctivas_conformes,
+    total_acciones_correctivas_noconformes
+)
+SELECT h.sucursal_id, RTRIM(t.año_mes), h.id_usuario,
+       SUM(h.total_acciones_correctivas),
+       SUM(h.total_acciones_correctivas_conformes),
+       SUM(h.total_acciones_correctivas_noconformes)
+FROM Hechos_Conformidad_Sanitaria h
+INNER JOIN Tiempo t ON h.fecha = t.fecha
+GROUP BY h.sucursal_id, RTRIM(t.año_mes), h.id_usuario;
+go
+
+-- El MERGE de insertar_hechos.py busca cada hecho por id_normativa
+CREATE UNIQUE INDEX UX_Hechos_Normativa
+    ON Hechos_Conformidad_Sanitaria(id_normativa);
+go
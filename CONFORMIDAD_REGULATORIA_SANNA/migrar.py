@@ -0,0 +1,169 @@
+import os
+import re
+import glob
+import time
+import hashlib
+import argparse
+import pyodbc
+
+# Configuración
+DB_CONFIG = {
+    'server': 'DESKTOP-5B78EO8\\SQL2022',
+    'database': 'SannaIConformidadRegulatoria',
+    'trusted_connection': 'yes',
+    'driver': '{ODBC Driver 17 for SQL Server}'
+}
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MIGRACIONES_DIR = os.path.join(BASE_DIR, 'migraciones')
+
+# Archivos NNNN_descripcion.sql; los lotes se separan con "go" como en Conformidad_Regulatoria_Final.sql
+RE_ARCHIVO = re.compile(r"^(\d{4})_(\w+)\.sql$")
+RE_GO = re.compile(r"^\s*go\s*;?\s*$", re.IGNORECASE | re.MULTILINE)
+# Migraciones con operaciones que SQL Server no admite dentro de una transacción
+MARCA_SIN_TRANSACCION = '-- migracion: sin transaccion'
+
+
+def conectar(config):
+    return pyodbc.connect(
+        f"DRIVER={config['driver']};"
+        f"SERVER={config['server']};"
+        f"DATABASE={config['database']};"
+        f"Trusted_Connection=yes;"
+    )
+
+
+def listar_migraciones(carpeta=MIGRACIONES_DIR):
+    """[(version, nombre, ruta, sql, checksum)] ordenadas por versión"""
+    migraciones = []
+    for ruta in sorted(glob.glob(os.path.join(carpeta, '*.sql'))):
+        match = RE_ARCHIVO.match(os.path.basename(ruta))
+        if not match:
+            print(f"⚠️ Archivo ignorado (se espera NNNN_nombre.sql): {os.path.basename(ruta)}")
+            continue
+        with open(ruta, 'r', encoding='utf-8') as f:
+            sql = f.read()
+        checksum = hashlib.sha256(sql.encode('utf-8')).hexdigest()
+        migraciones.append((match.group(1), match.group(2), ruta, sql, checksum))
+    return migraciones
+
+
+def lotes(sql):
+    return [lote.strip() for lote in RE_GO.split(sql) if lote.strip()]
+
+
+def asegurar_tabla_control(cursor):
+    cursor.execute("""
+        IF OBJECT_ID('dbo.SchemaMigraciones') IS NULL
+        CREATE TABLE dbo.SchemaMigraciones(
+            version NCHAR(4) PRIMARY KEY NOT NULL,
+            nombre NVARCHAR(200) NOT NULL,
+            checksum CHAR(64) NOT NULL,
+            duracion_ms INT NOT NULL,
+            fecha_aplicacion DATETIME NOT NULL DEFAULT GETDATE()
+        )
+    """)
+
+
+def aplicadas(cursor):
+    cursor.execute("SELECT version, nombre, checksum, fecha_aplicacion FROM SchemaMigraciones")
+    return {row.version: row for row in cursor.fetchall()}
+
+
+def aplicar(conn, migracion):
+    """Ejecuta los lotes de una migración y la registra; todo o nada salvo que se marque sin transacción"""
+    version, nombre, ruta, sql, checksum = migracion
+    transaccional = MARCA_SIN_TRANSACCION not in sql
+    conn.autocommit = not transaccional
+    cursor = conn.cursor()
+    inicio = time.perf_counter()
+    try:
+        for lote in lotes(sql):
+            cursor.execute(lote)
+            # Consumir todos los resultados para que los errores de lotes largos no se pierdan
+            while cursor.nextset():
+                pass
+        duracion_ms = int((time.perf_counter() - inicio) * 1000)
+        cursor.execute(
+            "INSERT INTO SchemaMigraciones (version, nombre, checksum, duracion_ms) VALUES (?, ?, ?, ?)",
+            (version, nombre, checksum, duracion_ms)
+        )
+        if transaccional:
+            conn.commit()
+        print(f"✅ {version}_{nombre} aplicada en {duracion_ms} ms")
+        return True
+    except Exception as e:
+        if transaccional:
+            conn.rollback()
+        print(f"❌ Error en {version}_{nombre}: {e}")
+        return False
+    finally:
+        conn.autocommit = False
+
+
+def migrar(config=DB_CONFIG, hasta=None, carpeta=MIGRACIONES_DIR):
+    """Aplica en orden las migraciones pendientes (hasta la versión indicada, inclusive)"""
+    conn = conectar(config)
+    try:
+        cursor = conn.cursor()
+        asegurar_tabla_control(cursor)
+        conn.commit()
+        hechas = aplicadas(cursor)
+
+        pendientes = []
+        for migracion in listar_migraciones(carpeta):
+            version, nombre, _, _, checksum = migracion
+            if hasta and version > hasta:
+                break
+            if version in hechas:
+                if hechas[version].checksum != checksum:
+                    print(f"⚠️ {version}_{nombre} cambió después de aplicarse; crea una migración nueva en lugar de editarla")
+                continue
+            pendientes.append(migracion)
+
+        if not pendientes:
+            print("✅ La base de datos ya está al día")
+            return True
+
+        print(f"🔄 {len(pendientes)} migraciones pendientes")
+        for migracion in pendientes:
+            if not aplicar(conn, migracion):
+                print("🛑 Migración detenida; las siguientes no se aplicaron")
+                return False
+        print("🎉 Migraciones aplicadas")
+        return True
+    finally:
+        conn.close()
+
+
+def estado(config=DB_CONFIG, carpeta=MIGRACIONES_DIR):
+    conn = conectar(config)
+    try:
+        cursor = conn.cursor()
+        asegurar_tabla_control(cursor)
+        conn.commit()
+        hechas = aplicadas(cursor)
+        for version, nombre, _, _, checksum in listar_migraciones(carpeta):
+            fila = hechas.get(version)
+            if fila is None:
+                print(f"⏳ {version}_{nombre}: pendiente")
+            elif fila.checksum != checksum:
+                print(f"⚠️ {version}_{nombre}: aplicada el {fila.fecha_aplicacion:%Y-%m-%d %H:%M} (archivo modificado)")
+            else:
+                print(f"✅ {version}_{nombre}: aplicada el {fila.fecha_aplicacion:%Y-%m-%d %H:%M}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aplica las migraciones versionadas de migraciones/")
+    parser.add_argument('--estado', action='store_true', help="Solo mostrar qué migraciones están aplicadas")
+    parser.add_argument('--hasta', default=None, metavar='VERSION', help="Aplicar hasta esta versión (p. ej. 0001)")
+    parser.add_argument('--database', default=DB_CONFIG['database'])
+    args = parser.parse_args()
+
+    config = dict(DB_CONFIG, database=args.database)
+    if args.estado:
+        estado(config)
+    else:
+        migrar(config, hasta=args.hasta)
@@ -0,0 +1,55 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+# Normalización de texto compartida por MAPS (reseñas) y NORMAS (nombres de sucursal).
+# Cada carácter se resuelve una sola vez y queda en la tabla; después el texto completo
+# se procesa con un solo str.translate en lugar de NFKD + varias expresiones regulares.
+
+SEPARADORES_NOMBRE = set("\\’'\"–-/()[]")
+RE_CONSERVAR_REVIEW = re.compile(r"[\w\s\.\,\!\?\;]")
+
+
+class _TablaPorCaracter(dict):
+    """Tabla para str.translate que calcula y guarda la traducción de cada carácter nuevo"""
+
+    def __init__(self, traducir):
+        super().__init__()
+        self.traducir = traducir
+
+    def __missing__(self, codigo):
+        valor = self.traducir(chr(codigo))
+        self[codigo] = valor
+        return valor
+
+
+def _caracter_nombre(c):
+    # Igual que NFKD + encode('ascii', 'ignore'): tildes fuera, no ASCII descartado
+    base = unicodedata.normalize("NFKD", c).encode("ascii", "ignore").decode("ascii")
+    return ''.join(' ' if x in SEPARADORES_NOMBRE or x.isspace() else x for x in base)
+
+
+def _caracter_review(c):
+    return c if RE_CONSERVAR_REVIEW.match(c) else ' '
+
+
+TABLA_NOMBRE = _TablaPorCaracter(_caracter_nombre)
+TABLA_REVIEW = _TablaPorCaracter(_caracter_review)
+
+
+def normalizar(texto):
+    """Minúsculas, sin tildes ni caracteres no ASCII, separadores como espacio, espacios simples"""
+    return ' '.join(texto.lower().translate(TABLA_NOMBRE).split())
+
+
+@lru_cache(maxsize=4096)
+def normalizar_nombre(texto):
+    """normalizar con memoria: para nombres cortos que se repiten (sucursales, firmantes)"""
+    return normalizar(texto)
+
+
+def limpiar_review(texto):
+    """Minúsculas, solo letras/dígitos/espacios y . , ! ? ; y espacios simples"""
+    if not texto:
+        return ""
+    return ' '.join(texto.lower().translate(TABLA_REVIEW).split())
@@ -172,6 +172,27 @@ go
 CREATE INDEX IX_MetricasEmocionales_SucursalId ON MetricasEmocionales(sucursal_id);
 go
 
+-- Tabla resumen: Resumen_Conformidad (sucursal x ao_mes x usuario)
+-- La refresca insertar_hechos.py de forma incremental (cubo_conformidad.py)
+CREATE TABLE Resumen_Conformidad(
+    sucursal_id INT NOT NULL,
+    ao_mes NCHAR(7) NOT NULL,
+    id_usuario NVARCHAR(8) NOT NULL,
+    total_acciones_correctivas INT NOT NULL,
+    total_acciones_correctivas_conformes INT NOT NULL,
+    total_acciones_correctivas_noconformes INT NOT NULL,
+    fecha_actualizacion DATETIME DEFAULT GETDATE(),
+    PRIMARY KEY (sucursal_id, ao_mes, id_usuario),
+    FOREIGN KEY (sucursal_id) REFERENCES Sucursales(id),
+    FOREIGN KEY (id_usuario) REFERENCES Usuarios(id_usuario)
+)
+go
+
+CREATE INDEX IX_Resumen_Conformidad_AnioMes ON Resumen_Conformidad(ao_mes);
+go
+CREATE INDEX IX_Resumen_Conformidad_Usuario ON Resumen_Conformidad(id_usuario);
+go
+
 
 
 select * from Sucursales;
@@ -179,4 +200,5 @@ select * from Normativas;
 select * from Usuarios;
 select * from Tiempo;
 select * from Hechos_Conformidad_Sanitaria;
+select * from Resumen_Conformidad;
 